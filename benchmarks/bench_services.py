@@ -0,0 +1,341 @@
+# bench_services.py
+"""서비스 인프로세스 벤치마크
+
+docker-compose 스택(Jaeger, Prometheus, Loki) 없이 각 서비스의 app.py를 직접 import하여
+Flask 테스트 클라이언트로 요청을 보내고 라우트별 처리량과 지연 시간을 측정합니다.
+
+- 업스트림 서비스는 로컬 스텁 HTTP 서버로 대체 (고정 응답, --upstream-delay로 지연 추가)
+- 트레이스는 Jaeger 대신 no-op 또는 메모리 exporter로 내보냄 (샘플링/배치 처리 경로는 그대로 사용)
+- 계측 계층(PrometheusMetrics, FlaskInstrumentor, RequestsInstrumentor)을 하나씩 켜고 끄며
+  계측하지 않은 상태(bare) 대비 각 계층이 요청 경로에 더하는 비용을 비교
+
+계층 구성마다 메트릭 레지스트리와 계측 상태가 섞이지 않도록 별도 프로세스에서 실행합니다.
+
+사용 예:
+    pip install -r services/gateway-service/requirements.txt
+    python benchmarks/bench_services.py
+    python benchmarks/bench_services.py --service order-service --iterations 5000 --threads 8
+    python benchmarks/bench_services.py --layers bare,all --exporter memory --output bench.json
+    python benchmarks/bench_services.py --env PRODUCT_CACHE_TTL=0 --service order-service
+"""
+import argparse
+import http.server
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import unquote
+
+SERVICES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "services")
+
+# 계층 구성 이름 -> 켤 계측 계층
+LAYER_CONFIGS = {
+    "bare": (),
+    "metrics": ("metrics",),
+    "flask": ("flask",),
+    "requests": ("requests",),
+    "all": ("metrics", "flask", "requests"),
+}
+
+ORDER_REQUEST = {"productId": "product1", "quantity": 1}
+
+# 서비스별 측정 라우트: (이름, 메서드, 경로, 본문)
+ROUTES = {
+    "gateway-service": [
+        ("proxy_request GET /api/products", "GET", "/api/products", None),
+        ("proxy_request GET /api/inventory/<id>", "GET", "/api/inventory/product1", None),
+        ("proxy_request POST /api/orders", "POST", "/api/orders", ORDER_REQUEST),
+        ("cached GET /api/products/<id>", "GET", "/api/products/product1", None),
+    ],
+    "order-service": [
+        ("create_order POST /orders", "POST", "/orders", ORDER_REQUEST),
+    ],
+    "inventory-service": [
+        ("check_inventory POST /inventory/check", "POST", "/inventory/check", ORDER_REQUEST),
+        ("get_product_inventory GET /inventory/<id>", "GET", "/inventory/product1", None),
+    ],
+    "product-service": [
+        ("get_product GET /products/<id>", "GET", "/products/product1", None),
+        ("get_products GET /products", "GET", "/products", None),
+    ],
+}
+
+# 스텁 업스트림 응답
+STUB_PRODUCTS = [
+    {"id": "product1", "name": "Laptop", "price": 1200.00},
+    {"id": "product2", "name": "Smartphone", "price": 800.00},
+    {"id": "product3", "name": "Headphones", "price": 150.00},
+]
+
+
+def stub_response(method, path, body=None):
+    """스텁 업스트림이 돌려줄 (상태 코드, 본문)"""
+    path, _, query = path.partition("?")
+    if method == "GET" and path == "/products" and query.startswith("ids="):
+        ids = unquote(query[len("ids="):]).split(",")
+        return 200, {"items": [dict(STUB_PRODUCTS[0], id=product_id) for product_id in ids], "missing": []}
+    if method == "GET" and path == "/products":
+        return 200, STUB_PRODUCTS
+    if method == "GET" and path.startswith("/products/"):
+        return 200, dict(STUB_PRODUCTS[0], id=path.rsplit("/", 1)[1])
+    if method == "GET" and path == "/inventory":
+        return 200, {product["id"]: 100 for product in STUB_PRODUCTS}
+    if method == "GET" and path.startswith("/inventory/"):
+        return 200, {"productId": path.rsplit("/", 1)[1], "quantity": 100}
+    if method == "POST" and path == "/inventory/reserve":
+        return 200, {"productId": "product1", "requested": 1, "reserved": True, "currentStock": 99}
+    if method == "POST" and path == "/inventory/reserve/batch":
+        items = [
+            {"productId": item["productId"], "requested": item["quantity"], "reserved": True, "currentStock": 99}
+            for item in (body or {}).get("items", [])
+        ]
+        return 200, {"reserved": bool(items), "items": items}
+    if method == "POST" and path == "/inventory/release":
+        return 200, {"released": True}
+    if method == "POST" and path == "/orders":
+        return 201, {"id": "order1", "productId": "product1", "quantity": 1, "status": "CREATED"}
+    if method == "GET" and path.startswith("/orders"):
+        return 200, []
+    return 404, {"error": "Not found"}
+
+
+def start_stub_upstream(delay):
+    """모든 업스트림을 대신하는 로컬 HTTP 서버 시작 (keep-alive 지원)"""
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # 헤더와 본문을 버퍼에 모아 한 번에 보내고(요청 처리 후 flush) TCP_NODELAY 설정
+        # (나눠 보내면 keep-alive 연결에서 Nagle + 지연 ACK로 응답마다 약 40ms가 더해짐)
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def _respond(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            request_body = json.loads(self.rfile.read(length)) if length else None
+            if delay:
+                time.sleep(delay)
+            status, body = stub_response(self.command, self.path, request_body)
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def disable_layers(enabled):
+    """app.py import 전에 꺼야 할 계측 계층을 환경 변수로 비활성화 (common/bootstrap.py)"""
+    os.environ["METRICS_ENABLED"] = "true" if "metrics" in enabled else "false"
+    os.environ["OTEL_PYTHON_DISABLED_INSTRUMENTATIONS"] = ",".join(
+        layer for layer in ("flask", "requests") if layer not in enabled
+    )
+
+
+def use_local_exporter(kind):
+    """Jaeger exporter를 no-op 또는 메모리 exporter로 교체"""
+    import common.tracing
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    class NoopSpanExporter(SpanExporter):
+        def export(self, spans):
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self):
+            pass
+
+    exporter = InMemorySpanExporter() if kind == "memory" else NoopSpanExporter()
+    common.tracing.create_span_exporter = lambda: exporter
+    return exporter
+
+
+def load_service(service):
+    service_dir = os.path.join(SERVICES_DIR, service)
+    sys.path[:0] = [SERVICES_DIR, service_dir]
+    spec = importlib.util.spec_from_file_location("app", os.path.join(service_dir, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["app"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def summarize(latencies, elapsed):
+    latencies.sort()
+    count = len(latencies)
+
+    def percentile(pct):
+        return latencies[min(count - 1, int(count * pct / 100))] * 1000
+
+    return {
+        "count": count,
+        "throughput": round(count / elapsed, 1),
+        "mean_ms": round(sum(latencies) / count * 1000, 4),
+        "p50_ms": round(percentile(50), 4),
+        "p99_ms": round(percentile(99), 4),
+        "max_ms": round(latencies[-1] * 1000, 4),
+    }
+
+
+def measure(client, method, path, body, iterations, threads):
+    """iterations개의 요청을 threads개 스레드로 나누어 보내고 지연 시간 요약 반환"""
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def run(count):
+        local = []
+        local_statuses = {}
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            response.get_data()
+            response.close()
+            local.append(time.perf_counter() - start)
+            local_statuses[response.status_code] = local_statuses.get(response.status_code, 0) + 1
+        with lock:
+            latencies.extend(local)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    per_thread = max(1, iterations // threads)
+    workers = [threading.Thread(target=run, args=(per_thread,)) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    result = summarize(latencies, elapsed)
+    result["statuses"] = {str(status): count for status, count in sorted(statuses.items())}
+    return result
+
+
+def run_worker(config):
+    """한 서비스를 한 계층 구성으로 측정 (별도 프로세스에서 실행)"""
+    os.environ["PRODUCT_SERVICE_URL"] = os.environ["INVENTORY_SERVICE_URL"] = \
+        os.environ["ORDER_SERVICE_URL"] = start_stub_upstream(config["upstream_delay"])
+    os.environ["PRODUCT_CACHE_INVALIDATE_URLS"] = ""
+    sys.path.insert(0, SERVICES_DIR)
+
+    import_start = time.perf_counter()
+    disable_layers(LAYER_CONFIGS[config["layers"]])
+    exporter = use_local_exporter(config["exporter"])
+    module = load_service(config["service"])
+    import_seconds = time.perf_counter() - import_start
+
+    client = module.app.test_client()
+    routes = {}
+    for name, method, path, body in ROUTES[config["service"]]:
+        measure(client, method, path, body, config["warmup"], 1)
+        if config["exporter"] == "memory":
+            exporter.clear()
+        routes[name] = measure(client, method, path, body, config["iterations"], config["threads"])
+
+    return {"import_seconds": round(import_seconds, 3), "routes": routes}
+
+
+def run_config(service, layers, args):
+    config = {
+        "service": service,
+        "layers": layers,
+        "exporter": args.exporter,
+        "iterations": args.iterations,
+        "warmup": args.warmup,
+        "threads": args.threads,
+        "upstream_delay": args.upstream_delay / 1000,
+    }
+    env = dict(os.environ)
+    # 단일 프로세스로 실행되므로 프리포크/멀티프로세스 설정은 제거
+    env.pop("WSGI_PREFORK", None)
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    env.setdefault("STORAGE_BACKEND", "memory")
+    for entry in args.env:
+        key, value = entry.split("=", 1)
+        env[key] = value
+
+    with tempfile.NamedTemporaryFile(suffix=".json") as result_file:
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", json.dumps(config), result_file.name],
+            env=env, check=True, stdout=subprocess.DEVNULL,
+        )
+        with open(result_file.name) as f:
+            return json.load(f)
+
+
+def print_report(results):
+    header = f"{'route':<44} {'layers':<9} {'rps':>9} {'mean':>9} {'p50':>9} {'p99':>9} {'+mean':>9}"
+    for service, configs in results.items():
+        print(f"\n[{service}]")
+        print(header)
+        print("-" * len(header))
+        baseline = configs.get("bare")
+        for route in ROUTES[service]:
+            name = route[0]
+            for layers, result in configs.items():
+                summary = result["routes"][name]
+                delta = ""
+                if baseline and layers != "bare":
+                    delta = f"{summary['mean_ms'] - baseline['routes'][name]['mean_ms']:+.3f}"
+                print(
+                    f"{name:<44} {layers:<9} {summary['throughput']:>9} {summary['mean_ms']:>9} "
+                    f"{summary['p50_ms']:>9} {summary['p99_ms']:>9} {delta:>9}"
+                )
+    print("\n(latency in ms; +mean is the added mean latency versus the bare configuration)")
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--worker":
+        result = run_worker(json.loads(sys.argv[2]))
+        with open(sys.argv[3], "w") as f:
+            json.dump(result, f)
+        return
+
+    parser = argparse.ArgumentParser(description="In-process service benchmarks with stubbed upstreams")
+    parser.add_argument("--service", action="append", choices=sorted(ROUTES),
+                        help="측정할 서비스 (여러 번 지정 가능, 기본: 전체)")
+    parser.add_argument("--layers", default=",".join(LAYER_CONFIGS),
+                        help=f"측정할 계층 구성 ({', '.join(LAYER_CONFIGS)})")
+    parser.add_argument("--exporter", choices=("noop", "memory"), default="noop")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--upstream-delay", type=float, default=0.0, help="스텁 업스트림 응답 지연(ms)")
+    parser.add_argument("--env", action="append", default=[], help="서비스에 전달할 환경 변수 (KEY=VALUE)")
+    parser.add_argument("--output", help="결과 JSON 파일 경로")
+    args = parser.parse_args()
+
+    layer_names = [name.strip() for name in args.layers.split(",")]
+    for name in layer_names:
+        if name not in LAYER_CONFIGS:
+            parser.error(f"unknown layer configuration: {name}")
+
+    results = {}
+    for service in args.service or sorted(ROUTES):
+        results[service] = {}
+        for layers in layer_names:
+            print(f"Benchmarking {service} [{layers}]...", file=sys.stderr)
+            results[service][layers] = run_config(service, layers, args)
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
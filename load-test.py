@@ -1,90 +1,388 @@
 # load-test.py
-import requests
+"""게이트웨이 부하 테스트 / 벤치마크 도구
+
+개방형(open-model) 부하 모델로 목표 요청률(RPS)에 맞춰 요청을 보냅니다.
+요청은 응답을 기다리지 않고 도착 일정에 따라 시작되며, 지연 시간은 실제 전송 시각이 아니라
+예정된 시작 시각부터 측정하므로 시스템이 느려져도 측정이 낙관적으로 왜곡되지 않습니다
+(coordinated omission 보정).
+
+사용 예:
+    python load-test.py --rate 50 --duration 60
+    python load-test.py --rate 200 --arrival constant --mix get_product=70,create_order=30
+    python load-test.py --record traffic.jsonl --duration 30
+    python load-test.py --replay traffic.jsonl --speed 2.0
+    python load-test.py --rate 50 --output results.json --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
 import random
+import sys
 import time
-import threading
-import logging
+
+import httpx
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # 엔드포인트 설정
 BASE_URL = "http://localhost:8080"
-PRODUCT_URL = f"{BASE_URL}/api/products"
-ORDER_URL = f"{BASE_URL}/api/orders"
-
-# 부하 테스트 설정
-NUM_USERS = 10  # 동시 사용자 수
-TEST_DURATION = 300  # 테스트 지속 시간(초)
-ERROR_RATE = 0.05  # 인위적 오류 발생 비율
-
-def simulate_user_behavior():
-    """사용자 행동 시뮬레이션"""
-    start_time = time.time()
-    request_count = 0
-    
-    while time.time() - start_time < TEST_DURATION:
-        try:
-            # 제품 목록 조회
-            response = requests.get(PRODUCT_URL)
-            response.raise_for_status()
-            products = response.json()
-            request_count += 1
-            
-            if not products:
-                logger.warning("No products found")
-                time.sleep(1)
+
+# 기본 시나리오 구성 (시나리오 이름=가중치)
+DEFAULT_MIX = "list_products=20,get_product=40,get_inventory=15,list_orders=5,create_order=15,missing_product=5"
+
+# 결과에 기록할 백분위수
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """HdrHistogram 방식의 로그-선형 지연 시간 히스토그램 (마이크로초 단위)
+
+    값의 상위 PRECISION_BITS 비트만 유지하므로 상대 오차는 약 1/64 이내이며,
+    메모리는 기록한 요청 수와 무관하게 값의 자릿수에만 비례합니다.
+    """
+
+    PRECISION_BITS = 7
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+
+    def _key(self, value):
+        if value < (1 << self.PRECISION_BITS):
+            return value
+        shift = value.bit_length() - self.PRECISION_BITS
+        return (shift << self.PRECISION_BITS) | (value >> shift)
+
+    def _value(self, key):
+        """버킷에 속하는 가장 큰 값"""
+        if key < (1 << self.PRECISION_BITS):
+            return key
+        shift = key >> self.PRECISION_BITS
+        mantissa = key & ((1 << self.PRECISION_BITS) - 1)
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, micros):
+        micros = max(0, int(micros))
+        key = self._key(micros)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.total += 1
+        self.sum += micros
+        self.max = max(self.max, micros)
+
+    def merge(self, other):
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def percentile(self, pct):
+        if not self.total:
+            return 0
+        target = max(1, round(self.total * pct / 100))
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen >= target:
+                return min(self._value(key), self.max)
+        return self.max
+
+    def summary(self):
+        """밀리초 단위 요약"""
+        result = {
+            f"p{pct:g}": round(self.percentile(pct) / 1000, 3) for pct in PERCENTILES
+        }
+        result["mean"] = round(self.sum / self.total / 1000, 3) if self.total else 0
+        result["max"] = round(self.max / 1000, 3)
+        return result
+
+
+class EndpointStats:
+    """엔드포인트별 결과 집계"""
+
+    def __init__(self):
+        # 예정 시각 기준(coordinated omission 보정)과 실제 전송 시각 기준 지연 시간
+        self.latency = LatencyHistogram()
+        self.service_time = LatencyHistogram()
+        self.statuses = {}
+        self.errors = 0
+
+    def record(self, status, latency_us, service_us):
+        self.latency.record(latency_us)
+        self.service_time.record(service_us)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status == "error" or (isinstance(status, int) and status >= 500):
+            self.errors += 1
+
+    def summary(self, elapsed):
+        return {
+            "count": self.latency.total,
+            "throughput": round(self.latency.total / elapsed, 2) if elapsed else 0,
+            "errors": self.errors,
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items(), key=str)},
+            "latency_ms": self.latency.summary(),
+            "service_time_ms": self.service_time.summary(),
+        }
+
+
+# 시나리오: (엔드포인트 이름, 요청 생성 함수)
+def scenario_requests(product_ids):
+    def pick():
+        return random.choice(product_ids)
+
+    return {
+        "list_products": lambda: ("GET", "/api/products", None),
+        "get_product": lambda: ("GET", f"/api/products/{pick()}", None),
+        "get_inventory": lambda: ("GET", f"/api/inventory/{pick()}", None),
+        "list_orders": lambda: ("GET", "/api/orders?limit=50", None),
+        "create_order": lambda: (
+            "POST", "/api/orders", {"productId": pick(), "quantity": random.randint(1, 5)}
+        ),
+        # 존재하지 않는 제품 ID로 요청하여 오류 발생
+        "missing_product": lambda: ("GET", "/api/products/999999", None),
+    }
+
+
+def parse_mix(value, scenarios):
+    mix = {}
+    for entry in value.split(","):
+        name, weight = entry.split("=")
+        name = name.strip()
+        if name not in scenarios:
+            raise ValueError(f"Unknown scenario: {name} (available: {', '.join(scenarios)})")
+        mix[name] = float(weight)
+    return mix
+
+
+# ID가 아닌 고정 경로 (/api/orders/batch 등은 {id}로 치환하지 않음)
+LITERAL_SEGMENTS = {"batch", "stats", "lookup"}
+
+
+def endpoint_name(method, path):
+    """통계용 엔드포인트 이름 (ID 부분은 템플릿으로 치환)"""
+    path = path.split("?", 1)[0]
+    parts = path.strip("/").split("/")
+    if len(parts) >= 3 and parts[0] == "api" and parts[2] not in LITERAL_SEGMENTS:
+        parts = parts[:2] + ["{id}"] + parts[3:]
+    return f"{method} /{'/'.join(parts)}"
+
+
+def arrival_offsets(rate, duration, arrival):
+    """시작 시점 기준 요청 도착 시각(초) 생성"""
+    offset = 0.0
+    while True:
+        if arrival == "poisson":
+            offset += random.expovariate(rate)
+        else:
+            offset += 1.0 / rate
+        if offset >= duration:
+            return
+        yield offset
+
+
+def load_replay(path, speed):
+    """기록된 트래픽(JSONL) 읽기: {"method", "path", "body"(선택), "offset"(선택, 초)}"""
+    entries = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
                 continue
-            
-            # 무작위로 제품 상세 조회
-            product_id = random.choice(products)['id']
-            response = requests.get(f"{PRODUCT_URL}/{product_id}")
-            response.raise_for_status()
-            request_count += 1
-            
-            # 일부 요청에서 인위적 오류 발생
-            if random.random() < ERROR_RATE:
-                # 존재하지 않는 제품 ID로 요청하여 오류 발생
-                requests.get(f"{PRODUCT_URL}/999999")
-                request_count += 1
-            
-            # 무작위로 주문 생성
-            if random.random() < 0.3:  # 30% 확률로 주문
-                order_data = {
-                    "productId": product_id,
-                    "quantity": random.randint(1, 5)
-                }
-                response = requests.post(ORDER_URL, json=order_data)
-                response.raise_for_status()
-                request_count += 1
-            
-            # 랜덤 지연
-            time.sleep(random.uniform(0.1, 2.0))
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request error: {e}")
-        
-        except Exception as e:
-            logger.error(f"Unexpected error: {e}")
-    
-    logger.info(f"User simulation completed. Total requests: {request_count}")
+            entry = json.loads(line)
+            if "path" not in entry:
+                logger.warning("Skipping replay line %s without a path", line_number)
+                continue
+            entries.append((
+                entry.get("offset"),
+                entry.get("method", "GET").upper(),
+                entry["path"],
+                entry.get("body"),
+            ))
+    if entries and all(offset is not None for offset, _, _, _ in entries):
+        return [(offset / speed, method, path, body) for offset, method, path, body in entries]
+    return [(None, method, path, body) for _, method, path, body in entries]
+
+
+async def fetch_product_ids(client):
+    response = await client.get("/api/products")
+    response.raise_for_status()
+    products = response.json()
+    if isinstance(products, dict):
+        products = products.get("items", [])
+    product_ids = [product["id"] for product in products]
+    if not product_ids:
+        raise RuntimeError("No products found")
+    return product_ids
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.max_inflight, max_keepalive_connections=args.max_inflight)
+    timeout = httpx.Timeout(args.timeout)
+    stats = {}
+    inflight = asyncio.Semaphore(args.max_inflight)
+    tasks = set()
+    recorded = [] if args.record else None
+    behind_schedule = 0
+
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+        # 요청 일정 구성: 재생 파일 또는 도착 과정 + 시나리오 구성
+        if args.replay:
+            replay = load_replay(args.replay, args.speed)
+            if replay and replay[0][0] is not None:
+                schedule = ((offset, (method, path, body)) for offset, method, path, body in replay)
+            else:
+                requests_iter = iter([(method, path, body) for _, method, path, body in replay])
+                schedule = zip(arrival_offsets(args.rate, args.duration, args.arrival), requests_iter)
+            logger.info("Replaying %s recorded requests from %s", len(replay), args.replay)
+        else:
+            scenarios = scenario_requests(await fetch_product_ids(client))
+            mix = parse_mix(args.mix, scenarios)
+            names = list(mix)
+            weights = [mix[name] for name in names]
+            schedule = (
+                (offset, scenarios[random.choices(names, weights)[0]]())
+                for offset in arrival_offsets(args.rate, args.duration, args.arrival)
+            )
+
+        async def send(intended, method, path, body):
+            # 동시 요청 한도로 기다린 시간도 지연 시간에 포함 (예정 시각 기준 측정)
+            async with inflight:
+                sent = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    logger.debug("Request error: %s", e)
+                    status = "error"
+                done = time.perf_counter()
+            name = endpoint_name(method, path)
+            stats.setdefault(name, EndpointStats()).record(
+                status, (done - intended) * 1e6, (done - sent) * 1e6
+            )
+
+        logger.info(
+            "Starting load test: rate=%s/s arrival=%s duration=%ss max_inflight=%s",
+            args.rate, args.arrival, args.duration, args.max_inflight
+        )
+        start = time.perf_counter()
+        for offset, (method, path, body) in schedule:
+            intended = start + offset
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -0.01:
+                behind_schedule += 1
+            if recorded is not None:
+                recorded.append({"offset": round(offset, 6), "method": method, "path": path, "body": body})
+            task = asyncio.create_task(send(intended, method, path, body))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    if recorded is not None:
+        with open(args.record, "w") as f:
+            for entry in recorded:
+                f.write(json.dumps(entry) + "\n")
+        logger.info("Recorded %s requests to %s", len(recorded), args.record)
+
+    total = EndpointStats()
+    for endpoint in stats.values():
+        total.latency.merge(endpoint.latency)
+        total.service_time.merge(endpoint.service_time)
+        total.errors += endpoint.errors
+        for status, count in endpoint.statuses.items():
+            total.statuses[status] = total.statuses.get(status, 0) + count
+
+    return {
+        "config": {
+            "base_url": args.base_url,
+            "rate": args.rate,
+            "arrival": args.arrival,
+            "duration": args.duration,
+            "mix": None if args.replay else args.mix,
+            "replay": args.replay,
+            "max_inflight": args.max_inflight,
+        },
+        "elapsed": round(elapsed, 3),
+        "scheduler_behind": behind_schedule,
+        "total": total.summary(elapsed),
+        "endpoints": {name: endpoint.summary(elapsed) for name, endpoint in sorted(stats.items())},
+    }
+
+
+def print_report(results):
+    header = f"{'endpoint':<32} {'count':>8} {'rps':>8} {'err':>6} {'p50':>9} {'p99':>9} {'p99.9':>9} {'max':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = list(results["endpoints"].items()) + [("TOTAL", results["total"])]
+    for name, summary in rows:
+        latency = summary["latency_ms"]
+        print(
+            f"{name:<32} {summary['count']:>8} {summary['throughput']:>8} {summary['errors']:>6} "
+            f"{latency['p50']:>9} {latency['p99']:>9} {latency['p99.9']:>9} {latency['max']:>9}"
+        )
+    print("(latency in ms, measured from scheduled start time)")
+
+
+def compare_with_baseline(results, baseline_path, threshold):
+    """기준 결과 대비 p99 지연 시간이 threshold 비율 이상 늘어난 엔드포인트 목록"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = []
+    for name, summary in list(results["endpoints"].items()) + [("TOTAL", results["total"])]:
+        base = baseline["total"] if name == "TOTAL" else baseline["endpoints"].get(name)
+        if not base or not base["latency_ms"]["p99"]:
+            continue
+        before = base["latency_ms"]["p99"]
+        after = summary["latency_ms"]["p99"]
+        change = (after - before) / before
+        if change > threshold:
+            regressions.append((name, before, after, change))
+    return regressions
+
 
 def main():
-    logger.info(f"Starting load test with {NUM_USERS} users for {TEST_DURATION} seconds")
-    
-    # 여러 사용자 시뮬레이션 스레드 시작
-    threads = []
-    for i in range(NUM_USERS):
-        thread = threading.Thread(target=simulate_user_behavior)
-        threads.append(thread)
-        thread.start()
-        logger.info(f"Started user thread {i+1}")
-    
-    # 모든 스레드가 완료될 때까지 대기
-    for thread in threads:
-        thread.join()
-    
+    parser = argparse.ArgumentParser(description="Open-model load generator for the gateway")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--rate", type=float, default=20.0, help="목표 요청률 (요청/초)")
+    parser.add_argument("--duration", type=float, default=60.0, help="테스트 지속 시간(초)")
+    parser.add_argument("--arrival", choices=("poisson", "constant"), default="poisson")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="시나리오=가중치 목록")
+    parser.add_argument("--max-inflight", type=int, default=256, help="동시에 진행할 최대 요청 수")
+    parser.add_argument("--timeout", type=float, default=10.0, help="요청 타임아웃(초)")
+    parser.add_argument("--replay", help="기록된 트래픽(JSONL) 재생")
+    parser.add_argument("--speed", type=float, default=1.0, help="재생 속도 배율")
+    parser.add_argument("--record", help="보낸 요청을 재생 가능한 JSONL로 기록")
+    parser.add_argument("--output", help="결과 JSON 파일 경로")
+    parser.add_argument("--baseline", help="비교할 기준 결과 JSON 파일")
+    parser.add_argument("--regression-threshold", type=float, default=0.10,
+                        help="p99 증가 허용 비율 (기본 10%%)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        logger.info("Results written to %s", args.output)
+
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.regression_threshold)
+        for name, before, after, change in regressions:
+            logger.error("p99 regression on %s: %sms -> %sms (+%.1f%%)", name, before, after, change * 100)
+        if regressions:
+            sys.exit(1)
+        logger.info("No p99 regressions against %s", args.baseline)
+
     logger.info("Load test completed")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
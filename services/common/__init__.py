@@ -0,0 +1 @@
+"""서비스 간 공유 모듈 패키지"""
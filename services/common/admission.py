@@ -0,0 +1,140 @@
+"""요청 수락 제어 (과부하 시 빠르게 거절)
+
+- RateLimiter: 키(클라이언트 + 라우트)별 토큰 버킷 요청률 제한
+- ConcurrencyLimiter: 업스트림별 동시 요청 수 제한, 초과 요청은 크기가 제한된 대기열에서
+  최대 queue_timeout 동안 기다리고 대기열이 가득 차거나 시간이 지나면 Overloaded로 거절
+
+제한 상태는 워커 프로세스마다 따로 유지됩니다.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+
+
+class Overloaded(Exception):
+    """동시 요청 한도와 대기열이 모두 찬 경우 (reason: queue_full, queue_timeout)"""
+
+    def __init__(self, name, reason):
+        super().__init__(f"{name} overloaded ({reason})")
+        self.reason = reason
+
+
+class RateLimiter:
+    """키별 토큰 버킷 (초당 rate개 충전, 최대 burst개), 최근 사용한 max_keys개 키만 유지"""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (토큰 수, 갱신 시각)
+        self._lock = threading.Lock()
+
+    def allow(self, key, rate, burst):
+        """요청 허용 여부와 다음 토큰까지 기다려야 하는 시간(초)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+
+class ConcurrencyLimiter:
+    """동시 요청 수 제한 + 크기가 제한된 대기열"""
+
+    def __init__(self, name, limit, queue_size, queue_timeout, admission):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+        self._inflight = admission.inflight.labels(upstream=name)
+        self._queued = admission.queue_depth.labels(upstream=name)
+        self._queue_wait = admission.queue_wait_seconds.labels(upstream=name)
+        self._shed = admission.shed
+
+    def acquire(self):
+        with self._cond:
+            if self._active < self.limit:
+                self._take()
+                return
+            if self._waiting >= self.queue_size:
+                self._reject("queue_full")
+
+            start = time.monotonic()
+            deadline = start + self.queue_timeout
+            self._waiting += 1
+            self._queued.set(self._waiting)
+            try:
+                while self._active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._reject("queue_timeout")
+                    self._cond.wait(remaining)
+                self._take()
+            finally:
+                self._waiting -= 1
+                self._queued.set(self._waiting)
+                self._queue_wait.observe(time.monotonic() - start)
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._inflight.set(self._active)
+            self._cond.notify()
+
+    def _take(self):
+        # 호출자가 잠금을 보유한 상태에서 호출
+        self._active += 1
+        self._inflight.set(self._active)
+
+    def _reject(self, reason):
+        self._shed.labels(upstream=self.name, reason=reason).inc()
+        raise Overloaded(self.name, reason)
+
+
+class AdmissionControl:
+    """요청률 제한기, 업스트림별 동시성 제한기와 관련 메트릭 관리"""
+
+    def __init__(self, registry=REGISTRY, max_keys=10000):
+        self.rate_limiter = RateLimiter(max_keys)
+        self._limiters = {}
+
+        self.rate_limited = Counter(
+            'gateway_rate_limited_total', 'Requests rejected by the per-client rate limit',
+            ['route'], registry=registry
+        )
+        self.shed = Counter(
+            'gateway_shed_total', 'Requests shed by the upstream concurrency limiter',
+            ['upstream', 'reason'], registry=registry
+        )
+        self.inflight = Gauge(
+            'gateway_upstream_inflight', 'Requests currently admitted per upstream',
+            ['upstream'], registry=registry, multiprocess_mode='livesum'
+        )
+        self.queue_depth = Gauge(
+            'gateway_upstream_queue_depth', 'Requests waiting for an upstream concurrency slot',
+            ['upstream'], registry=registry, multiprocess_mode='livesum'
+        )
+        self.queue_wait_seconds = Histogram(
+            'gateway_upstream_queue_wait_seconds', 'Time spent queued for an upstream concurrency slot',
+            ['upstream'], registry=registry,
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+        )
+
+    def add(self, name, limit, queue_size, queue_timeout):
+        limiter = ConcurrencyLimiter(name, limit, queue_size, queue_timeout, self)
+        self._limiters[name] = limiter
+        return limiter
+
+    def get(self, name):
+        return self._limiters[name]
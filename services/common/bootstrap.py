@@ -0,0 +1,103 @@
+"""서비스 공통 계측 초기화
+
+각 서비스의 app.py가 공유하는 Prometheus 메트릭, OpenTelemetry 트레이스, Flask/Requests 계측 설정입니다.
+
+- 계측 라이브러리는 사용할 때만 import (꺼진 계측은 import 비용도 없음)
+- Jaeger exporter는 첫 스팬 전송 시점에 생성 (common/tracing.py의 LazySpanExporter)
+- 환경 변수로 개별 계측 비활성화
+    METRICS_ENABLED=false                           Prometheus 메트릭 (PrometheusMetrics)
+    OTEL_SDK_DISABLED=true                          트레이스 전체 (TracerProvider 미설정)
+    OTEL_PYTHON_DISABLED_INSTRUMENTATIONS=flask,requests  개별 계측 (쉼표로 구분)
+- 단계별 초기화 시간을 로그와 service_startup_seconds{phase} 메트릭으로 보고
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Gauge
+
+logger = logging.getLogger(__name__)
+
+STARTUP_SECONDS = Gauge(
+    'service_startup_seconds', 'Time spent in each startup phase of the current process',
+    ['phase'], multiprocess_mode='max'
+)
+
+
+def metrics_enabled():
+    return os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+
+def tracing_enabled():
+    return os.getenv("OTEL_SDK_DISABLED", "false").lower() != "true"
+
+
+def instrumentation_enabled(name):
+    """OTEL_PYTHON_DISABLED_INSTRUMENTATIONS에 없는 계측인지 여부"""
+    disabled = os.getenv("OTEL_PYTHON_DISABLED_INSTRUMENTATIONS", "")
+    return tracing_enabled() and name not in {entry.strip() for entry in disabled.split(",")}
+
+
+class Startup:
+    """단계별 초기화 시간 기록"""
+
+    def __init__(self, service_name):
+        self.service_name = service_name
+        self.phases = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            STARTUP_SECONDS.labels(phase=name).set(self.phases[name])
+
+    def done(self):
+        """bootstrap 이후 app.py의 나머지(저장소, 라우트 등)까지 포함한 시간 기록"""
+        total = time.perf_counter() - self._start
+        STARTUP_SECONDS.labels(phase="total").set(total)
+        logger.info(
+            "%s started in %.1f ms (%s)", self.service_name, total * 1000,
+            ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.phases.items())
+        )
+
+
+def bootstrap(app, service_name, version="1.0.0", instrument_requests=False):
+    """Flask 앱에 메트릭/트레이스/계측 설정 후 Startup 반환 (app.py 마지막에 startup.done() 호출)
+
+    트레이스 초기화(BatchSpanProcessor의 내보내기 스레드)는 프리포크 서버에서 워커 fork 이후에 실행됩니다.
+    """
+    startup = Startup(service_name)
+
+    if metrics_enabled():
+        with startup.phase("metrics"):
+            from common.serving import create_metrics
+            metrics = create_metrics(app)
+            metrics.info('app_info', service_name, version=version)
+
+    if tracing_enabled():
+        from common.serving import run_after_fork
+
+        def init():
+            with startup.phase("tracing"):
+                from common.tracing import init_tracing
+                init_tracing(service_name)
+
+        run_after_fork(init)
+
+    if instrumentation_enabled("flask"):
+        with startup.phase("flask_instrumentation"):
+            from opentelemetry.instrumentation.flask import FlaskInstrumentor
+            FlaskInstrumentor().instrument_app(app)
+
+    if instrument_requests and instrumentation_enabled("requests"):
+        with startup.phase("requests_instrumentation"):
+            from opentelemetry.instrumentation.requests import RequestsInstrumentor
+            RequestsInstrumentor().instrument()
+
+    return startup
@@ -0,0 +1,176 @@
+"""크기 제한(LRU)과 만료 시간(TTL)이 있는 인프로세스 캐시
+
+캐시별 적중/미스/제거 횟수와 항목 수를 Prometheus 메트릭으로 노출합니다.
+
+항목은 프로세스(gunicorn 워커)마다 따로 저장되므로, 무효화는 같은 호스트의 워커가 공유하는
+버전 파일(`CACHE_SHARED_DIR`)로 전달합니다. 키는 해시로 버전 슬롯(`CACHE_SHARED_SLOTS`개) 중 하나에
+대응하며, 항목은 저장할 때의 슬롯 버전을 함께 기록합니다. 키를 무효화하면 그 슬롯의 버전만 올리므로
+다른 워커는 해당 키(와 같은 슬롯을 쓰는 드문 키)의 항목만 다음 접근 때 버리고 나머지는 유지합니다.
+clear()는 캐시 전체 버전을 올려 모든 항목을 버립니다.
+`CACHE_SHARED_DIR`를 빈 문자열로 설정하면 무효화는 요청을 받은 워커에만 적용됩니다.
+"""
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from prometheus_client import REGISTRY, Counter, Gauge
+
+CACHE_DEFAULT_SIZE = int(os.getenv("CACHE_DEFAULT_SIZE", "10000"))
+CACHE_DEFAULT_TTL = float(os.getenv("CACHE_DEFAULT_TTL", "60"))
+CACHE_SHARED_DIR = os.getenv("CACHE_SHARED_DIR", tempfile.gettempdir())
+CACHE_SHARED_SLOTS = int(os.getenv("CACHE_SHARED_SLOTS", "4096"))
+
+# 캐시에 없음을 나타내는 값 (None도 캐시할 수 있도록 별도 객체 사용)
+MISSING = object()
+
+_VERSION = struct.Struct("Q")
+
+
+class SharedVersions:
+    """같은 호스트의 프로세스가 공유하는 버전 번호 배열 (파일을 mmap으로 매핑하므로 읽기는 메모리 읽기)
+
+    0번은 캐시 전체 버전, 1번부터는 키 해시로 고르는 슬롯 버전입니다.
+    """
+
+    def __init__(self, path, slots=CACHE_SHARED_SLOTS):
+        self.path = path
+        self.slots = slots
+        size = _VERSION.size * (slots + 1)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+    def slot(self, key):
+        # 프로세스마다 값이 다른 hash() 대신 고정된 해시 사용
+        return 1 + zlib.crc32(str(key).encode()) % self.slots
+
+    def value(self, slot=0):
+        return _VERSION.unpack_from(self._map, slot * _VERSION.size)[0]
+
+    def versions(self, key):
+        """키 항목의 유효성을 판단하는 (캐시 전체 버전, 키 슬롯 버전)"""
+        return self.value(0), self.value(self.slot(key))
+
+    def bump(self, slot=0):
+        # 프로세스 간 증가가 겹치지 않도록 매번 새로 연 파일에 flock (fork로 물려받은 fd는 잠금을 공유)
+        with open(self.path, "rb") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                _VERSION.pack_into(self._map, slot * _VERSION.size, (self.value(slot) + 1) % 2**64)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class TTLCache:
+    """LRU + TTL 캐시 (스레드 안전)
+
+    versions(SharedVersions)를 주면 invalidate는 키의 슬롯 버전을, clear는 캐시 전체 버전을 올려
+    모든 워커에서 해당 항목을 무효화합니다.
+    """
+
+    def __init__(self, name, caches, maxsize=CACHE_DEFAULT_SIZE, ttl=CACHE_DEFAULT_TTL, versions=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (만료 시각, 값, 저장할 때의 버전)
+        self._lock = threading.Lock()
+        self._versions = versions
+
+        self._hits = caches.requests.labels(cache=name, result="hit")
+        self._misses = caches.requests.labels(cache=name, result="miss")
+        self._evictions = caches.evictions
+        self._entries = caches.entries.labels(cache=name)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                reason = None
+                if entry[0] <= time.monotonic():
+                    reason = "expired"
+                elif self._versions is not None and entry[2] != self._versions.versions(key):
+                    # 다른 워커가 이 키(또는 캐시 전체)를 무효화함
+                    reason = "invalidated"
+                if reason:
+                    del self._data[key]
+                    self._evict(reason)
+                    entry = None
+            if entry is None:
+                self._misses.inc()
+                return MISSING
+            self._data.move_to_end(key)
+            self._hits.inc()
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            versions = self._versions.versions(key) if self._versions is not None else None
+            self._data[key] = (time.monotonic() + self.ttl, value, versions)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evict("size")
+            self._entries.set(len(self._data))
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._versions is not None:
+                self._versions.bump(self._versions.slot(key))
+            if self._data.pop(key, None) is not None:
+                self._evict("invalidated")
+
+    def clear(self):
+        with self._lock:
+            if self._versions is not None:
+                self._versions.bump()
+            count = len(self._data)
+            self._data.clear()
+            if count:
+                self._evictions.labels(cache=self.name, reason="invalidated").inc(count)
+            self._entries.set(0)
+
+    def _evict(self, reason):
+        # 호출자가 잠금을 보유한 상태에서 호출
+        self._evictions.labels(cache=self.name, reason=reason).inc()
+        self._entries.set(len(self._data))
+
+
+class Caches:
+    """이름별 캐시와 캐시 메트릭 관리"""
+
+    def __init__(self, registry=REGISTRY):
+        self._caches = {}
+
+        self.requests = Counter(
+            'cache_requests_total', 'Cache lookups by result',
+            ['cache', 'result'], registry=registry
+        )
+        self.evictions = Counter(
+            'cache_evictions_total', 'Cache entries removed by reason',
+            ['cache', 'reason'], registry=registry
+        )
+        self.entries = Gauge(
+            'cache_entries', 'Current number of cache entries',
+            ['cache'], registry=registry, multiprocess_mode='livesum'
+        )
+
+    def add(self, name, maxsize=CACHE_DEFAULT_SIZE, ttl=CACHE_DEFAULT_TTL, shared_dir=CACHE_SHARED_DIR):
+        versions = None
+        if shared_dir:
+            versions = SharedVersions(os.path.join(shared_dir, f"cache-{name}.versions"))
+        cache = TTLCache(name, self, maxsize=maxsize, ttl=ttl, versions=versions)
+        self._caches[name] = cache
+        return cache
+
+    def get(self, name):
+        return self._caches[name]
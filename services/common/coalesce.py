@@ -0,0 +1,51 @@
+"""동일한 요청 합치기 (singleflight)
+
+같은 키로 동시에 들어온 호출 중 첫 호출(leader)만 fn()을 실행하고,
+실행 중에 들어온 나머지 호출은 그 결과(또는 예외)를 함께 받습니다.
+결과를 저장하지 않으므로 leader의 호출이 끝난 뒤의 호출은 다시 fn()을 실행합니다.
+"""
+import threading
+from concurrent.futures import Future
+
+from prometheus_client import Counter
+
+SINGLEFLIGHT_CALLS = Counter(
+    'singleflight_calls_total', 'Calls by whether they ran or joined an in-flight call',
+    ['group', 'result']
+)
+
+
+class SingleFlight:
+    """키별 진행 중인 호출 관리 (스레드 안전)"""
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}  # key -> Future
+        self._lock = threading.Lock()
+        self._leaders = SINGLEFLIGHT_CALLS.labels(group=name, result="leader")
+        self._coalesced = SINGLEFLIGHT_CALLS.labels(group=name, result="coalesced")
+
+    def do(self, key, fn):
+        """(결과, 다른 호출의 결과를 공유했는지 여부) 반환, 결과는 호출자끼리 공유되므로 변경하지 말 것"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            self._coalesced.inc()
+            return future.result(), True
+
+        self._leaders.inc()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
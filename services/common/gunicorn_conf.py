@@ -0,0 +1,82 @@
+"""서비스 공통 gunicorn 설정
+
+실행:
+    gunicorn -c common/gunicorn_conf.py app:app
+
+환경 변수:
+    PORT                  바인딩 포트
+    WEB_CONCURRENCY       워커 프로세스 수 (기본: CPU 수 * 2 + 1, memory 저장소는 1)
+    GUNICORN_THREADS      워커당 스레드 수 (기본 4)
+    GUNICORN_KEEPALIVE    keep-alive 연결 유지 시간(초)
+    GUNICORN_TIMEOUT      응답 없는 워커를 재시작하기까지의 시간(초)
+    GUNICORN_PRELOAD      마스터에서 앱을 미리 import할지 여부 (기본 true)
+    PROMETHEUS_MULTIPROC_DIR  워커별 메트릭 파일 디렉토리
+
+워커는 SIGHUP으로 무중단 재시작됩니다 (kill -HUP <master pid>).
+memory 저장소를 쓰는 서비스(SERVICE_STATEFUL=1)는 워커 재시작 시 데이터가 사라지므로
+요청 수에 따른 워커 교체와 응답 없는 워커 재시작을 사용하지 않습니다.
+"""
+import glob
+import logging
+import multiprocessing
+import os
+
+logger = logging.getLogger("gunicorn.error")
+
+# 마스터에서 import되는 앱이 트레이스 초기화를 fork 이후로 미루도록 표시
+os.environ.setdefault("WSGI_PREFORK", "1")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+
+# memory 저장소는 워커마다 데이터가 따로 존재하므로 워커 하나에 스레드로만 확장
+memory_state = os.getenv("STORAGE_BACKEND", "memory") == "memory" and os.getenv("SERVICE_STATEFUL") == "1"
+if "WEB_CONCURRENCY" in os.environ:
+    workers = int(os.environ["WEB_CONCURRENCY"])
+elif memory_state:
+    workers = 1
+else:
+    workers = multiprocessing.cpu_count() * 2 + 1
+
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# 메모리 단편화 누적을 막기 위해 일정 요청 수마다 워커 교체 (동시 재시작 방지용 지터)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+
+# 워커 재시작은 memory 저장소의 데이터를 모두 지우므로 교체하지 않음 (timeout 0은 무제한)
+if memory_state:
+    max_requests = 0
+    max_requests_jitter = 0
+    timeout = 0
+
+accesslog = None
+errorlog = "-"
+
+
+def on_starting(server):
+    # 이전 실행에서 남은 워커별 메트릭 파일 정리
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(multiproc_dir, "*.db")):
+            os.remove(path)
+    logger.info("Starting with %s workers x %s threads", workers, threads)
+    if memory_state:
+        logger.info("Memory storage: worker recycling (max_requests, timeout) disabled")
+
+
+def post_fork(server, worker):
+    from common.serving import run_post_fork_hooks
+    run_post_fork_hooks()
+
+
+def child_exit(server, worker):
+    # 종료된 워커의 gauge 값이 합산에서 빠지도록 표시
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_flask_exporter.multiprocess import GunicornInternalPrometheusMetrics
+        GunicornInternalPrometheusMetrics.mark_process_dead_on_child_exit(worker.pid)
@@ -0,0 +1,108 @@
+"""목록 조회 엔드포인트용 페이지네이션 및 NDJSON 스트리밍 응답
+
+쿼리 파라미터:
+    limit   한 번에 반환할 최대 레코드 수
+    cursor  이전 응답의 nextCursor 값 (마지막으로 받은 레코드의 삽입 순번, 그 다음부터 이어서 조회)
+    format  'ndjson'이면 레코드를 한 줄에 하나씩 스트리밍
+
+파라미터가 하나도 없으면 기존과 같이 전체 컬렉션을 JSON으로 반환합니다.
+
+여러 ID 일괄 조회(lookup_response)는 ?ids=a,b,c 또는 POST 본문 {"ids": [...]}로 요청하며,
+찾은 레코드는 items에, 없는 ID는 요청을 실패시키지 않고 missing에 담아 반환합니다.
+"""
+import json
+import os
+from itertools import islice
+
+from flask import Response, jsonify, request
+
+LIST_DEFAULT_LIMIT = int(os.getenv("LIST_DEFAULT_LIMIT", "100"))
+LIST_MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", "1000"))
+NDJSON_MIMETYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def list_response(records, serialize, legacy=None):
+    """삽입 순서대로 저장된 컬렉션을 요청 파라미터에 맞게 응답으로 변환
+
+    records   삽입 순서로 순회 가능한 컬렉션 (저장소의 values()/items()/find() 등,
+              page(after, limit)로 순번이 after보다 큰 (순번, 레코드)를 조회할 수 있으면 키셋 조회,
+              그 외에는 앞에서부터의 위치를 순번으로 사용)
+    serialize 레코드 하나를 JSON 직렬화 가능한 dict로 변환하는 함수
+    legacy    파라미터가 없을 때 반환할 기존 형식의 본문을 만드는 함수
+    """
+    args = request.args
+    ndjson = args.get("format") == "ndjson"
+    if not ndjson and "limit" not in args and "cursor" not in args:
+        body = legacy() if legacy else [serialize(record) for record in records]
+        return jsonify(body)
+
+    try:
+        after = int(args.get("cursor", 0))
+        # NDJSON은 limit이 없으면 커서 이후 전체를 스트리밍
+        limit = int(args["limit"]) if "limit" in args else (None if ndjson else LIST_DEFAULT_LIMIT)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor or limit"}), 400
+    if after < 0 or (limit is not None and limit <= 0):
+        return jsonify({"error": "Invalid cursor or limit"}), 400
+
+    # JSON 페이지는 한 번에 메모리에 올리므로 크기 제한
+    if limit is not None and not ndjson:
+        limit = min(limit, LIST_MAX_LIMIT)
+    # limit이 있으면 레코드만 먼저 읽어 두고 직렬화는 지연 (스트리밍 중 저장소 변경에 안전),
+    # limit이 없으면(NDJSON) 저장소가 청크 단위로 읽어 차례로 반환하므로 전체를 메모리에 올리지 않음
+    if hasattr(records, "page"):
+        page = records.page(after, limit)
+    else:
+        end = after + limit if limit is not None else None
+        page = islice(enumerate(records, 1), after, end)
+    if limit is not None:
+        page = list(page)
+    next_cursor = str(page[-1][0]) if limit is not None and len(page) == limit else None
+
+    if ndjson:
+        def generate():
+            for _, record in page:
+                yield json.dumps(serialize(record)) + "\n"
+
+        response = Response(generate(), mimetype=NDJSON_MIMETYPE)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return response
+
+    response = jsonify({
+        "items": [serialize(record) for _, record in page],
+        "nextCursor": next_cursor
+    })
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
+
+
+def requested_ids():
+    """?ids=a,b,c 또는 POST 본문 {"ids": [...]}의 ID 목록 (순서 유지, 중복 제거), 잘못된 경우 None"""
+    if request.method == "POST":
+        data = request.get_json(silent=True)
+        ids = data.get("ids") if isinstance(data, dict) else None
+        if not isinstance(ids, list) or not all(isinstance(key, str) for key in ids):
+            return None
+    else:
+        ids = request.args.get("ids", "").split(",")
+    ids = list(dict.fromkeys(key for key in ids if key))
+    if not ids or len(ids) > LIST_MAX_LIMIT:
+        return None
+    return ids
+
+
+def lookup_response(store, ids, serialize):
+    """요청한 ID의 레코드만 한 번에 조회 (ids는 requested_ids()의 결과)
+
+    serialize는 (키, 레코드)를 JSON 직렬화 가능한 dict로 변환하는 함수입니다.
+    """
+    if ids is None:
+        return jsonify({"error": f"Between 1 and {LIST_MAX_LIMIT} ids are required"}), 400
+    found = store.get_many(ids)
+    return jsonify({
+        "items": [serialize(key, found[key]) for key in ids if key in found],
+        "missing": [key for key in ids if key not in found]
+    })
@@ -0,0 +1,161 @@
+"""서비스 공통 로깅 설정
+
+- 요청 스레드에서는 레코드를 큐에 넣기만 하고, 포맷과 출력은 백그라운드 리스너 스레드에서 수행
+- JSON 한 줄 형식으로 출력하며 현재 OpenTelemetry 스팬의 trace_id/span_id를 포함 (Loki에서 트레이스와 연결)
+- 로거별 INFO 이하 로그 샘플링 (LOG_SAMPLE_RATES="app=0.1,common.upstream=0.5")
+- 큐 깊이와 드롭된 레코드 수를 Prometheus 메트릭으로 노출
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+from prometheus_client import Counter, Gauge
+from opentelemetry import trace
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+TEXT_FORMAT = '%(asctime)s [%(levelname)s] %(message)s'
+
+LOG_QUEUE_DEPTH = Gauge(
+    'log_queue_depth', 'Log records waiting to be written',
+    multiprocess_mode='livesum'
+)
+LOG_RECORDS_DROPPED = Counter(
+    'log_records_dropped_total', 'Log records dropped before being written',
+    ['reason']
+)
+
+
+def parse_sample_rates(value):
+    """"logger=비율,..." 형식을 {logger: 비율}로 변환"""
+    rates = {}
+    for entry in value.split(","):
+        if "=" not in entry:
+            continue
+        name, rate = entry.split("=", 1)
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+class TraceContextFilter(logging.Filter):
+    """현재 스팬의 trace_id/span_id를 레코드에 추가 (요청 스레드에서 실행되어야 함)"""
+
+    def filter(self, record):
+        span_context = trace.get_current_span().get_span_context()
+        if span_context.is_valid:
+            record.trace_id = format(span_context.trace_id, "032x")
+            record.span_id = format(span_context.span_id, "016x")
+        else:
+            record.trace_id = None
+            record.span_id = None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """로거별 비율에 따라 INFO 이하 레코드를 일부만 통과 (WARNING 이상은 항상 통과)"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self._rates = rates
+
+    def _rate(self, name):
+        # 가장 구체적인 로거 이름부터 상위 로거 순으로 설정 검색
+        while name:
+            if name in self._rates:
+                return self._rates[name]
+            name = name.rpartition(".")[0]
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno > logging.INFO:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        LOG_RECORDS_DROPPED.labels(reason="sampled").inc()
+        return False
+
+
+class JsonFormatter(logging.Formatter):
+    """JSON 한 줄 형식 포맷터"""
+
+    def __init__(self, service_name):
+        super().__init__()
+        self._service_name = service_name
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "service": self._service_name,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+            entry["span_id"] = record.span_id
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """큐가 가득 차면 요청 스레드를 막지 않고 레코드를 버리는 QueueHandler"""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(reason="queue_full").inc()
+        LOG_QUEUE_DEPTH.set(self.queue.qsize())
+
+    def prepare(self, record):
+        # 메시지 인자는 그대로 두고 출력 스레드에서 포맷 (기본 구현은 요청 스레드에서 포맷함)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener = None
+
+
+def setup_logging(service_name):
+    """루트 로거를 비동기 큐 기반으로 설정"""
+    output = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter(service_name))
+    else:
+        output.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(parse_sample_rates(LOG_SAMPLE_RATES)))
+    handler.addFilter(TraceContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)
+
+    def start_listener():
+        global _listener
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+        _listener.start()
+
+    start_listener()
+    # 종료 시 큐에 남은 레코드 출력
+    atexit.register(lambda: _listener.stop())
+    # 프리포크 워커는 부모의 리스너 스레드를 물려받지 못하므로 새로 시작
+    os.register_at_fork(after_in_child=start_listener)
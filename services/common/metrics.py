@@ -0,0 +1,66 @@
+"""Prometheus 메트릭 공통 설정
+
+- 메트릭 노출 경로 (observability/prometheus/prometheus.yml의 metrics_path와 일치)
+- HTTP 요청 메트릭을 요청 경로 대신 라우트 템플릿(/orders/<order_id>)으로 구분
+- 라벨 값 종류 수 제한: 한도를 넘는 새 값은 하나의 overflow 값으로 합쳐 시계열 수를 고정
+- 용도별로 조정한 히스토그램 버킷
+"""
+import os
+import threading
+
+from prometheus_client import Counter
+
+METRICS_PATH = os.getenv("METRICS_PATH", "/actuator/prometheus")
+METRICS_MAX_LABEL_VALUES = int(os.getenv("METRICS_MAX_LABEL_VALUES", "100"))
+
+# 한도를 넘은 라벨 값과 라우트가 없는 요청(404 등)에 쓰는 값
+OVERFLOW_LABEL_VALUE = "__overflow__"
+UNMATCHED_ROUTE = "__unmatched__"
+
+# 서비스 내부 처리 시간 (대부분 수 ms ~ 수백 ms)
+HTTP_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# 업스트림 호출 시간 (같은 네트워크 안의 호출, 읽기 타임아웃 기본값 5초까지)
+UPSTREAM_LATENCY_BUCKETS = (0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+LABEL_OVERFLOW = Counter(
+    'metrics_label_overflow_total', 'Label values folded into the overflow value by the cardinality limit',
+    ['label']
+)
+
+
+class BoundedLabel:
+    """처음 본 max_values개의 값만 그대로 쓰고 이후 새 값은 OVERFLOW_LABEL_VALUE로 대체"""
+
+    def __init__(self, name, max_values=METRICS_MAX_LABEL_VALUES):
+        self.name = name
+        self.max_values = max_values
+        self._values = set()
+        self._lock = threading.Lock()
+        self._overflow = LABEL_OVERFLOW.labels(label=name)
+
+    def __call__(self, value):
+        if value in self._values:
+            return value
+        with self._lock:
+            if value in self._values:
+                return value
+            if len(self._values) < self.max_values:
+                self._values.add(value)
+                return value
+        self._overflow.inc()
+        return OVERFLOW_LABEL_VALUE
+
+
+_route_label = BoundedLabel("route")
+
+
+def route(request):
+    """HTTP 메트릭의 route 라벨 (PrometheusMetrics group_by용, 함수 이름이 라벨 이름)"""
+    if request.url_rule is None:
+        return UNMATCHED_ROUTE
+    return _route_label(request.url_rule.rule)
+
+
+def status_class(status_code):
+    """상태 코드를 2xx/4xx/5xx 같은 범주로 묶은 라벨 값"""
+    return f"{status_code // 100}xx"
@@ -0,0 +1,267 @@
+"""아웃박스 + 로컬 큐 기반 비동기 이벤트 처리
+
+요청 경로에서는 이벤트를 저장소(아웃박스)에 기록하고 프로세스 내 큐에 넣은 뒤 바로 반환하며,
+백그라운드 스레드가 큐에서 이벤트를 모아 handler(events)를 배치 단위로 호출합니다.
+
+- 처리에 성공한 이벤트는 아웃박스에서 삭제
+- handler가 RetryLater(또는 예상하지 못한 예외)를 던지면 지수 백오프 후 같은 배치를 다시 처리하고,
+  max_attempts번 실패하면 on_give_up(events, error) 호출 후 삭제
+- 이벤트에 발행 시점의 트레이스 컨텍스트를 함께 저장하여, 배치 처리 스팬은 각 이벤트의 스팬에
+  링크되고 handler는 event.context로 원래 트레이스의 자식 스팬을 만들 수 있음
+- 기록된 지 lease가 지났는데 이 프로세스가 처리 중이지 않은 이벤트(이전 실행이나 다른 프로세스가 남긴 이벤트)는
+  유휴 시간에 가져와 다시 처리
+- 배치를 처리하기 전(재시도마다)에 claim 시각을 원자적으로 갱신하고, 그사이 lease가 지나 다른 프로세스가
+  가져간 이벤트는 처리하지 않음. 처리가 끝나면 아직 이 프로세스가 가진 이벤트만 삭제
+  (갱신 뒤 handler가 lease보다 오래 걸리면 같은 이벤트가 두 번 처리될 수 있으므로 handler는 멱등이어야 함)
+
+SQLite 저장소를 쓰면 재시작 후에도 처리하지 못한 이벤트가 남아 있습니다 (at-least-once 처리).
+"""
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+
+from opentelemetry import propagate, trace
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class RetryLater(Exception):
+    """일시적인 오류로 배치를 나중에 다시 처리해야 하는 경우"""
+
+
+class Event:
+    """아웃박스 이벤트 (id, 발행 시각, 처리 데이터, 발행 시점의 트레이스 컨텍스트)"""
+
+    __slots__ = ("id", "published_at", "payload", "context")
+
+    def __init__(self, event_id, record):
+        self.id = event_id
+        self.published_at = record["publishedAt"]
+        self.payload = record["payload"]
+        self.context = propagate.extract(record.get("trace") or {})
+
+
+class Outbox:
+    """아웃박스 저장소 하나와 이를 처리하는 백그라운드 스레드"""
+
+    def __init__(self, name, store, handler, on_give_up=None, batch_size=50, batch_wait=0.01,
+                 max_attempts=5, retry_backoff=0.1, lease=60.0, registry=REGISTRY):
+        self.name = name
+        self.store = store
+        self.handler = handler
+        self.on_give_up = on_give_up
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.lease = lease
+        self.owner = None
+        self._queue = queue.Queue()
+        self._thread = None
+        # 큐에 있거나 처리 중인 이벤트 ID (lease가 지나도 다시 가져오지 않음)
+        self._inflight = set()
+        self._inflight_lock = threading.Lock()
+
+        self._depth = Gauge(
+            'outbox_queue_depth', 'Events waiting in the local queue',
+            ['outbox'], registry=registry, multiprocess_mode='livesum'
+        ).labels(outbox=name)
+        self._lag = Histogram(
+            'outbox_lag_seconds', 'Time from publishing an event to the start of its processing',
+            ['outbox'], registry=registry,
+            buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+        ).labels(outbox=name)
+        self._processing = Histogram(
+            'outbox_processing_seconds', 'Time spent handling one batch of events',
+            ['outbox'], registry=registry,
+            buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+        ).labels(outbox=name)
+        self._batch_events = Histogram(
+            'outbox_batch_events', 'Events handled per batch',
+            ['outbox'], registry=registry, buckets=(1, 2, 5, 10, 25, 50, 100, 250)
+        ).labels(outbox=name)
+        self._events = Counter(
+            'outbox_events_total', 'Outbox events by outcome',
+            ['outbox', 'result'], registry=registry
+        )
+
+    def publish(self, event_id, payload):
+        """이벤트를 아웃박스에 기록하고 큐에 넣음 (현재 트레이스 컨텍스트를 함께 저장)"""
+        carrier = {}
+        propagate.inject(carrier)
+        now = time.time()
+        record = {
+            "payload": payload,
+            "trace": carrier,
+            "publishedAt": now,
+            "claimedBy": self.owner,
+            "claimedAt": now,
+        }
+        self.store.put(event_id, record)
+        self._enqueue(Event(event_id, record))
+
+    def start(self):
+        """처리 스레드 시작 (프리포크 서버에서는 워커 fork 이후에 호출)
+
+        컨테이너가 재시작되면 호스트 이름과 PID가 같을 수 있으므로 실행마다 임의의 ID를 붙임
+        """
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+        self._thread = threading.Thread(target=self._run, name=f"outbox-{self.name}", daemon=True)
+        self._thread.start()
+
+    def _enqueue(self, event):
+        with self._inflight_lock:
+            self._inflight.add(event.id)
+        self._queue.put(event)
+        self._depth.inc()
+
+    def _done(self, batch):
+        with self._inflight_lock:
+            self._inflight.difference_update(event.id for event in batch)
+
+    def _run(self):
+        self._recover()
+        last_recovery = time.monotonic()
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.lease / 2)]
+            except queue.Empty:
+                batch = []
+            # 잠시 기다리며 이어서 들어온 이벤트를 한 배치로 모음
+            try:
+                while batch and len(batch) < self.batch_size:
+                    batch.append(self._queue.get(timeout=self.batch_wait))
+            except queue.Empty:
+                pass
+            self._depth.dec(len(batch))
+
+            if batch:
+                try:
+                    self._process(batch)
+                except Exception:
+                    # on_give_up 또는 삭제가 실패한 경우: 이벤트는 저장소에 남으므로 lease가 지난 뒤 다시 처리
+                    logger.exception("Unexpected error processing %s outbox batch", self.name)
+                finally:
+                    self._done(batch)
+            if time.monotonic() - last_recovery >= self.lease:
+                self._recover()
+                last_recovery = time.monotonic()
+
+    def _process(self, batch):
+        batch = self._renew(batch)
+        if not batch:
+            return
+        now = time.time()
+        for event in batch:
+            self._lag.observe(max(0.0, now - event.published_at))
+        self._batch_events.observe(len(batch))
+
+        tracer = trace.get_tracer(__name__)
+        links = [
+            trace.Link(span_context)
+            for span_context in (trace.get_current_span(event.context).get_span_context() for event in batch)
+            if span_context.is_valid
+        ]
+        attempt = 1
+        while True:
+            start = time.perf_counter()
+            with tracer.start_as_current_span(f"process_{self.name}_batch", links=links) as span:
+                span.set_attribute("outbox.events", len(batch))
+                span.set_attribute("outbox.attempt", attempt)
+                try:
+                    self.handler(batch)
+                    error = None
+                except RetryLater as e:
+                    error = e
+                    span.set_attribute("outbox.retry", True)
+                except Exception as e:
+                    # 예상하지 못한 오류도 재시도 대상 (재시도 횟수를 넘기면 on_give_up)
+                    logger.exception("Unexpected error handling %s %s events", len(batch), self.name)
+                    error = e
+                    span.record_exception(e)
+                    span.set_attribute("outbox.retry", True)
+            self._processing.observe(time.perf_counter() - start)
+
+            if error is None:
+                self._events.labels(outbox=self.name, result="processed").inc(len(batch))
+                break
+            if attempt >= self.max_attempts:
+                logger.error("Giving up on %s %s events after %s attempts: %s",
+                             len(batch), self.name, attempt, error)
+                self._events.labels(outbox=self.name, result="failed").inc(len(batch))
+                if self.on_give_up is not None:
+                    self.on_give_up(batch, error)
+                break
+            logger.warning("Retrying %s %s events (attempt %s): %s", len(batch), self.name, attempt, error)
+            self._events.labels(outbox=self.name, result="retried").inc(len(batch))
+            time.sleep(self.retry_backoff * (2 ** (attempt - 1)))
+            attempt += 1
+            batch = self._renew(batch)
+            if not batch:
+                return
+
+        self._delete_owned(batch)
+
+    def _renew(self, batch):
+        """배치 이벤트의 claim 시각을 원자적으로 갱신하고, 아직 이 프로세스가 가진 이벤트만 반환
+
+        처리가 밀려 lease가 지난 사이 다른 프로세스가 _recover로 가져간(또는 이미 처리해 삭제한) 이벤트는 제외합니다.
+        """
+        def renew(current):
+            now = time.time()
+            changes = {
+                event_id: {**record, "claimedAt": now}
+                for event_id, record in current.items()
+                if record is not None and record["claimedBy"] == self.owner
+            }
+            return changes, changes
+
+        owned = self.store.update([event.id for event in batch], renew)
+        if len(owned) < len(batch):
+            lost = len(batch) - len(owned)
+            logger.warning("Skipping %s %s events claimed by another process", lost, self.name)
+            self._events.labels(outbox=self.name, result="skipped").inc(lost)
+        return [event for event in batch if event.id in owned]
+
+    def _delete_owned(self, batch):
+        """처리를 마친 이벤트 중 아직 이 프로세스가 가진 이벤트만 삭제"""
+        def delete(current):
+            return {
+                event_id: None for event_id, record in current.items()
+                if record is not None and record["claimedBy"] == self.owner
+            }, None
+
+        self.store.update([event.id for event in batch], delete)
+
+    def _recover(self):
+        """lease가 지났고 이 프로세스가 처리 중이지 않은 이벤트를 원자적으로 가져와 큐에 넣음"""
+        expired_before = time.time() - self.lease
+        with self._inflight_lock:
+            inflight = set(self._inflight)
+        stale = [
+            event_id for event_id, record in self.store.items()
+            if event_id not in inflight and record["claimedAt"] < expired_before
+        ]
+        if not stale:
+            return
+
+        def claim(current):
+            now = time.time()
+            changes = {
+                event_id: {**record, "claimedBy": self.owner, "claimedAt": now}
+                for event_id, record in current.items()
+                if record is not None and record["claimedAt"] < expired_before
+            }
+            return changes, changes
+
+        claimed = self.store.update(stale, claim)
+        for event_id, record in claimed.items():
+            self._enqueue(Event(event_id, record))
+        if claimed:
+            logger.info("Recovered %s pending %s events", len(claimed), self.name)
+            self._events.labels(outbox=self.name, result="recovered").inc(len(claimed))
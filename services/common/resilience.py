@@ -0,0 +1,162 @@
+"""업스트림 호출 복원력 구성 요소
+
+- CircuitBreaker: 연속 실패가 임계값을 넘으면 호출을 즉시 거절(open)하고,
+  일정 시간 뒤 소수의 시험 요청(half-open)으로 회복 여부를 확인
+- RetryBudget: 재시도가 전체 요청 대비 일정 비율을 넘지 않도록 제한하는 토큰 버킷
+- LatencyTracker: 최근 응답 시간 분포 (헤지 요청을 보낼 지연 기준 계산)
+
+UpstreamClient(common/upstream.py)가 업스트림마다 하나씩 만들어 사용합니다.
+"""
+import threading
+import time
+from collections import deque
+
+import requests
+
+# 회로 상태 (메트릭 값으로도 사용)
+CLOSED = 0
+HALF_OPEN = 1
+OPEN = 2
+
+STATE_NAMES = {CLOSED: "closed", HALF_OPEN: "half_open", OPEN: "open"}
+
+
+class CircuitOpen(requests.exceptions.RequestException):
+    """회로가 열려 있어 업스트림을 호출하지 않고 거절한 경우"""
+
+
+class CircuitBreaker:
+    """연속 실패 횟수 기반 회로 차단기 (스레드 안전)
+
+    closed    모든 호출 허용, 연속 실패가 failure_threshold에 도달하면 open
+    open      reset_timeout 동안 모든 호출을 CircuitOpen으로 거절한 뒤 half_open
+    half_open 동시에 half_open_probes개의 시험 호출만 허용, 성공하면 closed, 실패하면 다시 open
+    """
+
+    def __init__(self, name, failure_threshold, reset_timeout, half_open_probes,
+                 state_gauge, transitions, rejected):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+        self._state_gauge = state_gauge
+        self._transitions = transitions
+        self._rejected = rejected
+        self._state_gauge.set(CLOSED)
+
+    @property
+    def state(self):
+        return STATE_NAMES[self._state]
+
+    def allow(self):
+        """호출 허용 여부 확인 (거절 시 CircuitOpen), 허용되면 결과를 반드시 record_*로 알려야 함"""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._transition(HALF_OPEN)
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return
+        self._rejected.inc()
+        raise CircuitOpen(f"Circuit for {self.name} is open")
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                self._open()
+                return
+            self._failures += 1
+            if self._state == CLOSED and self._failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._transition(OPEN)
+
+    def _transition(self, state):
+        # 호출자가 잠금을 보유한 상태에서 호출
+        if state == self._state:
+            return
+        self._state = state
+        self._failures = 0
+        self._probes = 0
+        self._state_gauge.set(state)
+        self._transitions.labels(upstream=self.name, state=STATE_NAMES[state]).inc()
+
+
+class RetryBudget:
+    """재시도 예산 (토큰 버킷)
+
+    요청마다 ratio개, 시간에 따라 초당 min_per_second개의 토큰이 쌓이고 재시도 1회에 토큰 1개를 씁니다.
+    업스트림 전체가 실패할 때 재시도가 부하를 몇 배로 키우지 않도록 재시도 비율을 제한합니다.
+    """
+
+    def __init__(self, ratio, min_per_second):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max(1.0, min_per_second * 10)
+        self._tokens = self.max_tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, amount):
+        now = time.monotonic()
+        amount += (now - self._updated) * self.min_per_second
+        self._updated = now
+        self._tokens = min(self.max_tokens, self._tokens + amount)
+
+    def deposit(self):
+        with self._lock:
+            self._refill(self.ratio)
+
+    def withdraw(self):
+        """토큰이 있으면 하나 쓰고 True"""
+        with self._lock:
+            self._refill(0)
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class LatencyTracker:
+    """최근 window개 응답 시간의 백분위수 (min_samples개가 모이기 전에는 None)"""
+
+    # 정렬된 표본을 다시 계산하는 주기 (기록 횟수)
+    REFRESH_INTERVAL = 50
+
+    def __init__(self, window, min_samples=100):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._sorted = []
+        self._since_refresh = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self._since_refresh += 1
+            if self._since_refresh >= self.REFRESH_INTERVAL:
+                self._sorted = sorted(self._samples)
+                self._since_refresh = 0
+
+    def percentile(self, pct):
+        samples = self._sorted
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
@@ -0,0 +1,55 @@
+"""WSGI 서버(gunicorn) 실행 지원
+
+- 프리포크 워커에서 fork 이후에 실행해야 하는 초기화(트레이스 내보내기 스레드 등) 등록
+- Prometheus 멀티프로세스 모드에서 워커별 메트릭을 합산하는 PrometheusMetrics 생성
+"""
+import os
+
+from prometheus_flask_exporter import PrometheusMetrics
+
+from common.metrics import HTTP_LATENCY_BUCKETS, METRICS_PATH, route
+
+# gunicorn 설정 파일(gunicorn_conf.py)이 마스터 프로세스에서 설정하는 환경 변수
+PREFORK_ENV = "WSGI_PREFORK"
+
+_post_fork_hooks = []
+_forked = False
+
+
+def run_after_fork(fn):
+    """프리포크 서버에서는 워커 fork 이후에, 그 외에는 즉시 fn 실행
+
+    preload_app으로 마스터에서 앱을 import하면 fn은 각 워커의 post_fork 훅에서 실행되고,
+    워커에서 앱을 import하면 이미 fork된 상태이므로 바로 실행됩니다.
+    """
+    if os.getenv(PREFORK_ENV) and not _forked:
+        _post_fork_hooks.append(fn)
+    else:
+        fn()
+
+
+def run_post_fork_hooks():
+    """gunicorn post_fork 훅에서 호출"""
+    global _forked
+    _forked = True
+    for fn in _post_fork_hooks:
+        fn()
+
+
+def create_metrics(app, **kwargs):
+    """PrometheusMetrics 생성 (PROMETHEUS_MULTIPROC_DIR이 있으면 워커 메트릭 합산)
+
+    메트릭은 METRICS_PATH(기본 /actuator/prometheus)에서 제공하고, HTTP 요청 메트릭은
+    요청 경로 대신 라우트 템플릿으로 구분합니다 (경로의 ID마다 시계열이 생기지 않도록).
+
+    멀티프로세스 모드에서 직접 정의한 메트릭은 기본 레지스트리에 등록해야
+    워커별 파일로 기록되어 메트릭 경로에서 합산됩니다.
+    """
+    kwargs.setdefault("path", METRICS_PATH)
+    kwargs.setdefault("group_by", route)
+    kwargs.setdefault("buckets", HTTP_LATENCY_BUCKETS)
+    kwargs.setdefault("excluded_paths", ["^/health$", f"^{METRICS_PATH}$"])
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_flask_exporter.multiprocess import GunicornInternalPrometheusMetrics
+        return GunicornInternalPrometheusMetrics(app, **kwargs)
+    return PrometheusMetrics(app, **kwargs)
@@ -0,0 +1,165 @@
+"""일관된 해싱(consistent hashing) 기반 샤드 라우팅
+
+키(제품 ID)를 해시 링 위의 샤드에 배정합니다. 샤드마다 가상 노드를 여러 개 두어 키를 고르게 나누고,
+샤드를 추가하거나 제거하면 그 샤드가 맡는(맡던) 구간의 키(약 1/N)만 소유 샤드가 바뀝니다.
+
+샤드 목록은 "이름=URL,이름=URL" 형식이며 이름을 생략하면 URL의 host:port를 이름으로 씁니다.
+배정은 샤드 이름으로만 결정되므로 같은 목록을 설정한 서비스(게이트웨이, order-service,
+inventory-service)는 모두 같은 키를 같은 샤드로 보냅니다.
+"""
+import hashlib
+import os
+import threading
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from opentelemetry import context
+
+SHARD_VIRTUAL_NODES = int(os.getenv("SHARD_VIRTUAL_NODES", "128"))
+SHARD_SCATTER_WORKERS = int(os.getenv("SHARD_SCATTER_WORKERS", "32"))
+
+
+def parse_shards(value):
+    """"이름=URL,..." 형식을 [(이름, URL)]로 변환 (빈 문자열이면 빈 목록)"""
+    shards = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, url = entry.rpartition("=")
+        url = url.strip().rstrip("/")
+        shards.append((name.strip() or urlsplit(url).netloc, url))
+    names = [name for name, _ in shards]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate shard names: {value}")
+    return shards
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """샤드 이름으로 만든 해시 링 (키의 해시 다음에 오는 가상 노드의 샤드가 소유)"""
+
+    def __init__(self, names, vnodes=SHARD_VIRTUAL_NODES):
+        if not names:
+            raise ValueError("A hash ring needs at least one shard")
+        self.names = list(names)
+        points = sorted((_hash(f"{name}#{index}"), name) for name in self.names for index in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [name for _, name in points]
+
+    def owner(self, key):
+        index = bisect_right(self._hashes, _hash(key))
+        return self._owners[index % len(self._owners)]
+
+    def group(self, items, key=None):
+        """{샤드 이름: [항목]} (key(항목)으로 소유 샤드 결정, 샤드 안에서는 입력 순서 유지)"""
+        groups = {}
+        for item in items:
+            groups.setdefault(self.owner(key(item) if key else item), []).append(item)
+        return groups
+
+
+class ShardedUpstream:
+    """샤드별 UpstreamClient와 키의 소유 샤드 조회
+
+    클라이언트 이름은 샤드 이름이므로 업스트림 메트릭과 회로 차단기는 샤드별로 분리됩니다.
+    """
+
+    def __init__(self, pools, shards, vnodes=SHARD_VIRTUAL_NODES):
+        self.clients = {name: pools.add(name, url) for name, url in shards}
+        self.ring = HashRing(list(self.clients), vnodes)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.clients)
+
+    def client(self, key):
+        return self.clients[self.ring.owner(key)]
+
+    def group(self, items, key=None):
+        """{UpstreamClient: [항목]}"""
+        return {self.clients[name]: group for name, group in self.ring.group(items, key).items()}
+
+    def scatter(self, fn, groups):
+        """{클라이언트: 인자}마다 fn(클라이언트, 인자)를 동시에 호출해 ({클라이언트: 결과}, {클라이언트: 예외}) 반환
+
+        호출은 현재 트레이스 컨텍스트에서 실행되며, 대상이 하나면 호출한 스레드에서 바로 실행합니다.
+        """
+        results = {}
+        errors = {}
+        if len(groups) == 1:
+            [(client, arg)] = groups.items()
+            try:
+                results[client] = fn(client, arg)
+            except Exception as e:
+                errors[client] = e
+            return results, errors
+
+        parent_context = context.get_current()
+        futures = {
+            client: self.executor().submit(_call_in_context, parent_context, fn, client, arg)
+            for client, arg in groups.items()
+        }
+        for client, future in futures.items():
+            try:
+                results[client] = future.result()
+            except Exception as e:
+                errors[client] = e
+        return results, errors
+
+    def executor(self):
+        """샤드 동시 호출용 스레드 풀 (프리포크 워커에서 스레드를 만들도록 처음 사용할 때 생성)"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=SHARD_SCATTER_WORKERS, thread_name_prefix="shard-scatter"
+                    )
+        return self._executor
+
+
+def _call_in_context(parent_context, fn, client, arg):
+    token = context.attach(parent_context)
+    try:
+        return fn(client, arg)
+    finally:
+        context.detach(token)
+
+
+def shard_cursor(name, after):
+    """샤드를 이어서 순회하는 목록 조회의 커서 ("샤드 이름:샤드 안의 키셋 커서")
+
+    샤드 안의 커서는 그 샤드가 돌려준 nextCursor(마지막 레코드의 삽입 순번)이므로,
+    다른 샤드나 같은 샤드의 앞쪽 레코드가 바뀌어도 이어서 조회할 위치가 밀리지 않습니다.
+    """
+    return f"{name}:{after}"
+
+
+def parse_shard_cursor(cursor, names):
+    """shard_cursor 값을 (샤드 순서, 샤드 안의 커서)로 변환 (없으면 첫 샤드의 처음부터), 잘못된 값은 ValueError"""
+    if not cursor:
+        return 0, 0
+    name, _, after = cursor.rpartition(":")
+    if name not in names:
+        raise ValueError(f"Unknown shard in cursor: {cursor}")
+    after = int(after)
+    if after < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return names.index(name), after
+
+
+def merge_lookups(ids, pages, id_field):
+    """샤드별 일괄 조회 응답({"items": [...]})을 요청한 ID 순서의 {"items", "missing"}으로 합침"""
+    found = {}
+    for page in pages:
+        for item in page["items"]:
+            found[item[id_field]] = item
+    return {
+        "items": [found[key] for key in ids if key in found],
+        "missing": [key for key in ids if key not in found],
+    }
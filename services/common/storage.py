@@ -0,0 +1,578 @@
+"""서비스 저장소 계층
+
+키-값 컬렉션 하나를 저장소 하나로 다루며, 삽입 순서를 유지합니다.
+STORAGE_BACKEND 환경 변수로 백엔드를 선택합니다.
+
+    memory  프로세스 메모리 (기본값, 재시작 시 데이터 유실)
+    sqlite  SQLite WAL 모드 파일 (SQLITE_PATH), 여러 워커 프로세스가 같은 데이터를 공유
+
+SQLite 백엔드는 모든 쓰기를 프로세스당 하나의 쓰기 스레드로 보내고,
+대기 중인 쓰기를 한 트랜잭션으로 묶어 커밋합니다 (그룹 커밋).
+읽기는 스레드별 연결에서 바로 수행하므로 시작 시 전체 데이터를 메모리에 올리지 않습니다.
+
+open_store(indexes=..., range_indexes=...)로 레코드 필드에 보조 색인을 두면 find()로
+전체를 순회하지 않고 필드 값이 같은(또는 범위 안의) 레코드만 조회합니다.
+"""
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from bisect import bisect_left, insort
+from concurrent.futures import Future
+from itertools import count, islice
+from operator import attrgetter, itemgetter
+
+logger = logging.getLogger(__name__)
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memory")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "data.db")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_WRITE_BATCH_SIZE = int(os.getenv("SQLITE_WRITE_BATCH_SIZE", "256"))
+SQLITE_WRITE_BATCH_WAIT = float(os.getenv("SQLITE_WRITE_BATCH_WAIT", "0.002"))
+MEMORY_LOCK_STRIPES = int(os.getenv("MEMORY_LOCK_STRIPES", "64"))
+
+# IN (...) 절 하나에 넣을 최대 키 수
+SQLITE_MAX_KEYS_PER_QUERY = 500
+# 끝까지 순회할 때 한 번에 읽을 행 수
+SQLITE_SCAN_CHUNK_SIZE = 1000
+
+
+class StoreView:
+    """저장소의 값 또는 (키, 값) 목록 (순회 및 페이지 조회 지원)
+
+    페이지 조회는 삽입 순번(seq) 기준 키셋 방식입니다. page(after, limit)는 순번이 after보다 큰
+    (순번, 레코드)를 순번 순서로 반환하므로 다음 페이지는 마지막 순번부터 색인으로 바로 찾아가며,
+    앞쪽 레코드가 추가/삭제되어도 이미 본 레코드를 건너뛰거나 다시 반환하지 않습니다.
+    """
+
+    def __init__(self, store, items):
+        self._store = store
+        self._items = items
+
+    def __iter__(self):
+        return self._store._iter(self._items)
+
+    def __len__(self):
+        return len(self._store)
+
+    def page(self, after, limit):
+        """순번이 after보다 큰 (순번, 레코드) limit개 목록 (limit이 None이면 끝까지 순회하는 iterable)"""
+        return self._store._page(after, limit, self._items)
+
+
+class QueryView:
+    """find() 결과 (순회 및 StoreView와 같은 키셋 페이지 조회 지원)"""
+
+    def __init__(self, fetch):
+        self._fetch = fetch
+
+    def __iter__(self):
+        return (record for _, record in self._fetch(0, None))
+
+    def page(self, after, limit):
+        return self._fetch(after, limit)
+
+
+class MemoryIndexes:
+    """MemoryStore의 보조 색인
+
+    equal: 필드 값 -> {키: None} (값이 같은 키를 색인에 들어온 순서로 유지)
+    range: 필드별 (값, 키)의 정렬된 목록 (범위 조회용)
+    값이 None인 레코드는 색인하지 않습니다.
+    """
+
+    def __init__(self, getters, equal_fields, range_fields):
+        self._getters = getters
+        self._equal = {field: {} for field in equal_fields}
+        self._range = {field: [] for field in range_fields}
+        self._lock = threading.Lock()
+
+    def replace(self, key, old, new):
+        with self._lock:
+            for field, buckets in self._equal.items():
+                before = self._value(old, field)
+                after = self._value(new, field)
+                if before == after:
+                    continue
+                if before is not None:
+                    bucket = buckets.get(before)
+                    bucket.pop(key, None)
+                    if not bucket:
+                        del buckets[before]
+                if after is not None:
+                    buckets.setdefault(after, {})[key] = None
+            for field, entries in self._range.items():
+                before = self._value(old, field)
+                after = self._value(new, field)
+                if before == after:
+                    continue
+                if before is not None:
+                    index = bisect_left(entries, (before, key))
+                    if index < len(entries) and entries[index] == (before, key):
+                        del entries[index]
+                if after is not None:
+                    # 값이 증가하는 순서로 들어오면 목록 끝에 추가되므로 O(log n)
+                    insort(entries, (after, key))
+
+    def _value(self, record, field):
+        return None if record is None else self._getters[field](record)
+
+    def candidates(self, equals, between):
+        """조건을 만족할 수 있는 키 중 가장 적은 후보 목록"""
+        options = []
+        with self._lock:
+            for field, value in equals.items():
+                options.append(list(self._equal[field].get(value, ())))
+            if between is not None:
+                field, low, high = between
+                entries = self._range[field]
+                start = 0 if low is None else bisect_left(entries, (low,))
+                end = len(entries) if high is None else bisect_left(entries, (high,))
+                options.append([key for _, key in entries[start:end]])
+        return min(options, key=len)
+
+    def matches(self, record, equals, between):
+        if any(self._getters[field](record) != value for field, value in equals.items()):
+            return False
+        if between is not None:
+            field, low, high = between
+            value = self._getters[field](record)
+            if value is None or (low is not None and value < low) or (high is not None and value >= high):
+                return False
+        return True
+
+
+class MemoryStore:
+    """프로세스 메모리 저장소 (키 해시로 나눈 잠금으로 원자적 갱신 지원)
+
+    잠금은 키마다 만들지 않고 고정된 개수(lock_stripes)를 두어 hash(키) % 개수로 고르므로
+    키가 늘어나도 잠금 수는 늘지 않습니다.
+    키마다 SQLiteStore의 seq와 같은 삽입 순번을 두며, 삭제 후 다시 넣은 키는 새 순번을 받습니다.
+    (순번, 키) 목록을 순번 순서로 유지해 페이지 조회 시 이분 탐색으로 시작 위치를 찾습니다.
+    삭제된 항목은 목록에 남겨 두었다가 절반 이상이 되면 한 번에 정리합니다.
+    """
+
+    def __init__(self, name, seed=None, getters=None, indexes=(), range_indexes=(),
+                 lock_stripes=MEMORY_LOCK_STRIPES):
+        self.name = name
+        self._data = dict(seed or {})
+        self._seqs = {}  # key -> 삽입 순번
+        self._next_seq = count(1)
+        self._order = []  # (순번, key), 순번 순서
+        self._stale = 0  # _order에 남은 삭제된 항목 수
+        self._order_lock = threading.Lock()
+        for key in self._data:
+            self._seqs[key] = next(self._next_seq)
+            self._order.append((self._seqs[key], key))
+        self._locks = [threading.Lock() for _ in range(lock_stripes)]
+        self._indexes = None
+        if indexes or range_indexes:
+            self._indexes = MemoryIndexes(getters, indexes, range_indexes)
+            for key, value in self._data.items():
+                self._indexes.replace(key, None, value)
+
+    def _stripe(self, key):
+        return hash(key) % len(self._locks)
+
+    def _lock(self, key):
+        return self._locks[self._stripe(key)]
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key):
+        return self._data.get(key)
+
+    def get_many(self, keys):
+        return {key: self._data[key] for key in keys if key in self._data}
+
+    def put(self, key, value):
+        with self._lock(key):
+            self._store(key, value)
+
+    def put_many(self, items):
+        for key, value in items:
+            self.put(key, value)
+
+    def delete_many(self, keys):
+        for key in keys:
+            with self._lock(key):
+                self._store(key, None)
+
+    def update(self, keys, fn):
+        """keys의 현재 값으로 fn(current)를 호출해 원자적으로 갱신
+
+        fn은 {키: 현재 값 또는 None}을 받아 (변경할 {키: 값}, 반환값)을 돌려줍니다.
+        변경할 값이 None인 키는 삭제합니다.
+        """
+        # 교착 상태를 피하기 위해 항상 잠금 번호 순서로, 같은 잠금은 한 번만 획득
+        locks = [self._locks[stripe] for stripe in sorted({self._stripe(key) for key in keys})]
+        for lock in locks:
+            lock.acquire()
+        try:
+            current = {key: self._data.get(key) for key in keys}
+            changes, result = fn(current)
+            for key, value in changes.items():
+                self._store(key, value)
+            return result
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def _store(self, key, value):
+        # 호출자가 키의 잠금을 보유한 상태에서 호출 (value가 None이면 삭제)
+        old = self._data.get(key)
+        if value is None:
+            if old is None:
+                return
+            del self._data[key]
+            with self._order_lock:
+                self._seqs.pop(key, None)
+                self._stale += 1
+                if self._stale * 2 > len(self._order):
+                    # 순회 중인 페이지 조회는 이전 목록을 계속 사용하도록 새 목록으로 교체
+                    self._order = [(seq, k) for seq, k in self._order if self._seqs.get(k) == seq]
+                    self._stale = 0
+        else:
+            if old is None:
+                # 순번 발급과 목록 추가를 함께 잠가 목록이 항상 순번 순서가 되도록 함
+                with self._order_lock:
+                    seq = next(self._next_seq)
+                    self._seqs[key] = seq
+                    self._order.append((seq, key))
+            self._data[key] = value
+        if self._indexes is not None:
+            self._indexes.replace(key, old, value)
+
+    def values(self):
+        return StoreView(self, items=False)
+
+    def items(self):
+        return StoreView(self, items=True)
+
+    def find(self, equals=None, between=None):
+        """색인된 필드 값이 equals와 같고 between=(필드, 이상, 미만) 범위 안인 값 목록 (삽입 순서)
+
+        가장 후보가 적은 색인 하나로 후보를 고른 뒤 나머지 조건을 확인하므로
+        비용은 전체 레코드 수가 아닌 후보 수에 비례합니다.
+        범위 색인의 후보는 필드 값 순서이므로 SQLiteStore(ORDER BY seq)와 같도록 삽입 순번으로 정렬합니다.
+        """
+        equals = equals or {}
+        if not equals and between is None:
+            return self.values()
+
+        def fetch(after, limit):
+            found = []
+            for key in self._indexes.candidates(equals, between):
+                record = self._data.get(key)
+                seq = self._seqs.get(key)
+                if (record is not None and seq is not None and seq > after
+                        and self._indexes.matches(record, equals, between)):
+                    found.append((seq, record))
+            found.sort(key=itemgetter(0))
+            return found if limit is None else found[:limit]
+
+        return QueryView(fetch)
+
+    def _iter(self, items):
+        return (record for _, record in self._rows(0, items))
+
+    def _page(self, after, limit, items):
+        rows = self._rows(after, items)
+        return rows if limit is None else list(islice(rows, limit))
+
+    def _rows(self, after, items):
+        # 목록은 추가만 되거나 새 목록으로 교체되므로 잠금 없이 순회
+        order = self._order
+        for seq, key in islice(order, bisect_left(order, (after + 1,)), None):
+            record = self._data.get(key)
+            if record is not None and self._seqs.get(key) == seq:
+                yield seq, ((key, record) if items else record)
+
+
+class _WriteOp:
+    """쓰기 스레드에서 실행할 작업과 결과"""
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.future = Future()
+
+
+class SQLiteStore:
+    """SQLite(WAL) 저장소
+
+    테이블 구조: seq(삽입 순서), key(고유), value(encode된 텍스트)
+    """
+
+    def __init__(self, name, path=SQLITE_PATH, encode=json.dumps, decode=json.loads,
+                 seed=None, batch_size=SQLITE_WRITE_BATCH_SIZE, batch_wait=SQLITE_WRITE_BATCH_WAIT,
+                 json_paths=None, indexes=(), range_indexes=()):
+        self.name = name
+        self.path = path
+        self.encode = encode
+        self.decode = decode
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._local = threading.local()
+
+        # 테이블 이름은 코드에서만 지정되므로 SQL에 직접 넣어도 안전
+        self._sql_get = f"SELECT value FROM {name} WHERE key = ?"
+        self._sql_contains = f"SELECT 1 FROM {name} WHERE key = ?"
+        self._sql_count = f"SELECT COUNT(*) FROM {name}"
+        self._sql_page = f"SELECT seq, key, value FROM {name} WHERE seq > ? ORDER BY seq LIMIT ?"
+        self._sql_delete = f"DELETE FROM {name} WHERE key = ?"
+        self._sql_upsert = (
+            f"INSERT INTO {name} (key, value) VALUES (?, ?) "
+            f"ON CONFLICT(key) DO UPDATE SET value = excluded.value"
+        )
+
+        conn = self._connection()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} ("
+            f"seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            f"key TEXT NOT NULL UNIQUE, "
+            f"value TEXT NOT NULL)"
+        )
+        # 보조 색인: 저장된 JSON의 필드 위치(json_paths)에 대한 표현식 색인
+        self._field_sql = {
+            field: f"json_extract(value, '{json_paths[field]}')"
+            for field in (*indexes, *range_indexes)
+        }
+        for field, expression in self._field_sql.items():
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_{field} ON {name} ({expression})")
+        if seed:
+            # 이미 데이터가 있으면 초기 데이터를 덮어쓰지 않음
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                f"INSERT OR IGNORE INTO {name} (key, value) VALUES (?, ?)",
+                [(key, encode(value)) for key, value in seed.items()]
+            )
+            conn.execute("COMMIT")
+
+        self._start_writer()
+        # 프리포크 워커에서는 부모의 연결과 쓰기 스레드를 물려받지 않도록 재설정
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _start_writer(self):
+        self._writes = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._write_loop, name=f"sqlite-writer-{self.name}", daemon=True
+        )
+        self._writer.start()
+
+    def _after_fork(self):
+        self._local = threading.local()
+        self._start_writer()
+
+    def _connection(self):
+        # sqlite3 연결은 스레드 간 공유하지 않고 스레드별로 생성
+        # (연결마다 준비된 문장이 캐시되어 같은 SQL은 다시 파싱하지 않음)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+                isolation_level=None,
+                cached_statements=256,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            self._local.conn = conn
+        return conn
+
+    # 읽기
+
+    def __len__(self):
+        return self._connection().execute(self._sql_count).fetchone()[0]
+
+    def __contains__(self, key):
+        return self._connection().execute(self._sql_contains, (key,)).fetchone() is not None
+
+    def get(self, key):
+        row = self._connection().execute(self._sql_get, (key,)).fetchone()
+        return self.decode(row[0]) if row else None
+
+    def get_many(self, keys):
+        return self._select_many(self._connection(), keys)
+
+    def _select_many(self, conn, keys):
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        for start in range(0, len(keys), SQLITE_MAX_KEYS_PER_QUERY):
+            chunk = keys[start:start + SQLITE_MAX_KEYS_PER_QUERY]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT key, value FROM {self.name} WHERE key IN ({placeholders})", chunk
+            )
+            for key, value in rows:
+                found[key] = self.decode(value)
+        return found
+
+    def values(self):
+        return StoreView(self, items=False)
+
+    def items(self):
+        return StoreView(self, items=True)
+
+    def find(self, equals=None, between=None):
+        """색인된 필드 값이 equals와 같고 between=(필드, 이상, 미만) 범위 안인 값 목록 (MemoryStore.find와 동일)"""
+        equals = equals or {}
+        if not equals and between is None:
+            return self.values()
+
+        # 필드 이름은 코드에서 지정한 색인 필드만 허용되므로 SQL에 직접 넣어도 안전
+        conditions = [f"{self._field_sql[field]} = ?" for field in equals]
+        params = list(equals.values())
+        if between is not None:
+            field, low, high = between
+            conditions.append(f"{self._field_sql[field]} IS NOT NULL")
+            if low is not None:
+                conditions.append(f"{self._field_sql[field]} >= ?")
+                params.append(low)
+            if high is not None:
+                conditions.append(f"{self._field_sql[field]} < ?")
+                params.append(high)
+        conditions.append("seq > ?")
+        sql = f"SELECT seq, value FROM {self.name} WHERE {' AND '.join(conditions)} ORDER BY seq LIMIT ?"
+
+        def fetch(after, limit):
+            if limit is None:
+                return ((seq, self.decode(value)) for seq, value in self._scan(sql, params, after))
+            rows = self._connection().execute(sql, (*params, after, limit))
+            return [(seq, self.decode(value)) for seq, value in rows]
+
+        return QueryView(fetch)
+
+    def _iter(self, items):
+        return (record for _, record in self._page(0, None, items))
+
+    def _page(self, after, limit, items):
+        if limit is None:
+            # 결과 전체를 한 번에 읽지 않고 청크 단위로 읽으며 디코딩한 레코드를 차례로 반환
+            rows = self._scan(self._sql_page, (), after)
+        else:
+            rows = self._connection().execute(self._sql_page, (after, limit)).fetchall()
+        if items:
+            decoded = ((seq, (key, self.decode(value))) for seq, key, value in rows)
+        else:
+            decoded = ((seq, self.decode(value)) for seq, _, value in rows)
+        return decoded if limit is None else list(decoded)
+
+    def _scan(self, sql, params, after, chunk_size=SQLITE_SCAN_CHUNK_SIZE):
+        """sql(... seq > ? ORDER BY seq LIMIT ?)을 마지막 seq부터 chunk_size행씩 이어서 실행하며 행을 차례로 반환"""
+        conn = self._connection()
+        while True:
+            rows = conn.execute(sql, (*params, after, chunk_size)).fetchall()
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            after = rows[-1][0]
+
+    # 쓰기 (쓰기 스레드에서 그룹 커밋)
+
+    def put(self, key, value):
+        self.put_many([(key, value)])
+
+    def put_many(self, items):
+        rows = [(key, self.encode(value)) for key, value in items]
+        self._submit(lambda conn: conn.executemany(self._sql_upsert, rows))
+
+    def delete_many(self, keys):
+        rows = [(key,) for key in keys]
+        self._submit(lambda conn: conn.executemany(self._sql_delete, rows))
+
+    def update(self, keys, fn):
+        """keys의 현재 값으로 fn(current)를 호출해 원자적으로 갱신 (MemoryStore.update와 동일)"""
+        def apply(conn):
+            found = self._select_many(conn, keys)
+            current = {key: found.get(key) for key in keys}
+            changes, result = fn(current)
+            upserts = [(key, self.encode(value)) for key, value in changes.items() if value is not None]
+            deletes = [(key,) for key, value in changes.items() if value is None]
+            if upserts:
+                conn.executemany(self._sql_upsert, upserts)
+            if deletes:
+                conn.executemany(self._sql_delete, deletes)
+            return result
+
+        return self._submit(apply)
+
+    def _submit(self, fn):
+        op = _WriteOp(fn)
+        self._writes.put(op)
+        return op.future.result()
+
+    def _write_loop(self):
+        conn = self._connection()
+        while True:
+            batch = [self._writes.get()]
+            # 잠시 기다리며 동시에 들어온 쓰기를 모아 한 번에 커밋
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._writes.get(timeout=self.batch_wait))
+            except queue.Empty:
+                pass
+            self._commit_batch(conn, batch)
+
+    def _commit_batch(self, conn, batch):
+        results = []
+        try:
+            # BEGIN IMMEDIATE로 쓰기 잠금을 먼저 잡아 다른 프로세스와의 갱신 경합 방지
+            conn.execute("BEGIN IMMEDIATE")
+            for op in batch:
+                # 작업별 SAVEPOINT로 한 작업의 실패가 배치 전체를 되돌리지 않도록 함
+                conn.execute("SAVEPOINT op")
+                try:
+                    results.append((op, op.fn(conn), None))
+                    conn.execute("RELEASE op")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO op")
+                    conn.execute("RELEASE op")
+                    results.append((op, None, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            logger.error("SQLite batch commit failed for %s: %s", self.name, e)
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for op in batch:
+                op.future.set_exception(e)
+            return
+
+        # 커밋이 끝난 뒤에 결과를 알림
+        for op, result, error in results:
+            if error is not None:
+                op.future.set_exception(error)
+            else:
+                op.future.set_result(result)
+
+
+def open_store(name, record_type=None, seed=None, indexes=(), range_indexes=()):
+    """STORAGE_BACKEND 설정에 맞는 저장소 생성
+
+    record_type(namedtuple)을 지정하면 SQLite 백엔드에서 레코드를 필드 이름 없이
+    JSON 배열로 저장하고 읽을 때 다시 record_type으로 변환합니다.
+    seed는 저장소가 비어 있을 때 넣을 초기 데이터입니다.
+    indexes(같은 값 조회)와 range_indexes(범위 조회)는 find()에 쓸 record_type 필드 이름입니다.
+    """
+    fields = (*indexes, *range_indexes)
+    if fields and record_type is None:
+        raise ValueError("Secondary indexes require a record_type")
+
+    if STORAGE_BACKEND == "sqlite":
+        encode, decode = json.dumps, json.loads
+        if record_type is not None:
+            decode = lambda text: record_type(*json.loads(text))
+        json_paths = {field: f"$[{record_type._fields.index(field)}]" for field in fields}
+        logger.info("Opening SQLite store '%s' at %s", name, SQLITE_PATH)
+        return SQLiteStore(name, path=SQLITE_PATH, encode=encode, decode=decode, seed=seed,
+                           json_paths=json_paths, indexes=indexes, range_indexes=range_indexes)
+    if STORAGE_BACKEND != "memory":
+        raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+    getters = {field: attrgetter(field) for field in fields}
+    return MemoryStore(name, seed=seed, getters=getters, indexes=indexes, range_indexes=range_indexes)
@@ -0,0 +1,267 @@
+"""서비스 공통 OpenTelemetry 트레이스 설정
+
+- 부모 기반 비율 샘플링 (TRACE_SAMPLE_RATIO)
+- 샘플링되지 않은 트레이스도 기록만 해 두었다가, 오류가 있거나 느린 요청이면
+  프로세스 내 루트 스팬이 끝날 때 트레이스 전체를 내보냄 (TRACE_TAIL_SAMPLING)
+- BatchSpanProcessor 배치 크기/큐 크기/전송 주기 조정 (표준 OTEL_BSP_* 환경 변수)
+- 드롭된 스팬 수와 내보내기 지연 시간을 Prometheus 메트릭으로 노출
+- Jaeger exporter는 첫 내보내기 시점에 (내보내기 스레드에서) 생성하므로
+  exporter 설정 오류가 서비스 시작을 막지 않음
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from prometheus_client import Counter, Histogram
+from opentelemetry import trace
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import (
+    Decision,
+    ParentBased,
+    Sampler,
+    SamplingResult,
+    TraceIdRatioBased,
+)
+from opentelemetry.trace import SpanContext, StatusCode, TraceFlags
+
+logger = logging.getLogger(__name__)
+
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", "1.0"))
+TRACE_TAIL_SAMPLING = os.getenv("TRACE_TAIL_SAMPLING", "true").lower() == "true"
+TRACE_SLOW_THRESHOLD_MS = float(os.getenv("TRACE_SLOW_THRESHOLD_MS", "500"))
+TRACE_TAIL_MAX_TRACES = int(os.getenv("TRACE_TAIL_MAX_TRACES", "10000"))
+
+# BatchSpanProcessor 설정 (OpenTelemetry 표준 환경 변수 이름 사용)
+OTEL_BSP_MAX_QUEUE_SIZE = int(os.getenv("OTEL_BSP_MAX_QUEUE_SIZE", "8192"))
+OTEL_BSP_SCHEDULE_DELAY = int(os.getenv("OTEL_BSP_SCHEDULE_DELAY", "2000"))
+OTEL_BSP_MAX_EXPORT_BATCH_SIZE = int(os.getenv("OTEL_BSP_MAX_EXPORT_BATCH_SIZE", "512"))
+OTEL_BSP_EXPORT_TIMEOUT = int(os.getenv("OTEL_BSP_EXPORT_TIMEOUT", "30000"))
+
+SPANS_DROPPED = Counter(
+    'otel_spans_dropped_total', 'Spans dropped before export',
+    ['reason']
+)
+SPANS_EXPORTED = Counter(
+    'otel_spans_exported_total', 'Spans handed to the exporter by result',
+    ['result']
+)
+EXPORT_DURATION = Histogram(
+    'otel_export_duration_seconds', 'Time spent exporting one span batch',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+TAIL_DECISIONS = Counter(
+    'otel_tail_sampling_decisions_total', 'Tail sampling decisions for unsampled traces',
+    ['decision']
+)
+
+
+class RecordUnsampledSampler(Sampler):
+    """샘플링되지 않은 스팬을 버리지 않고 기록만 하도록 (RECORD_ONLY) 바꾸는 샘플러"""
+
+    def __init__(self, delegate):
+        self._delegate = delegate
+
+    def should_sample(self, parent_context, trace_id, name, kind=None,
+                      attributes=None, links=None, trace_state=None):
+        result = self._delegate.should_sample(
+            parent_context, trace_id, name, kind, attributes, links, trace_state
+        )
+        if result.decision == Decision.DROP:
+            return SamplingResult(Decision.RECORD_ONLY, result.attributes, result.trace_state)
+        return result
+
+    def get_description(self):
+        return f"RecordUnsampled{{{self._delegate.get_description()}}}"
+
+
+class MeteredSpanExporter(SpanExporter):
+    """내보내기 지연 시간과 결과를 메트릭으로 기록하는 exporter 래퍼"""
+
+    def __init__(self, delegate):
+        self._delegate = delegate
+
+    def export(self, spans):
+        start = time.perf_counter()
+        try:
+            result = self._delegate.export(spans)
+        except Exception:
+            SPANS_EXPORTED.labels(result="failure").inc(len(spans))
+            raise
+        finally:
+            EXPORT_DURATION.observe(time.perf_counter() - start)
+        label = "success" if result == SpanExportResult.SUCCESS else "failure"
+        SPANS_EXPORTED.labels(result=label).inc(len(spans))
+        return result
+
+    def shutdown(self):
+        self._delegate.shutdown()
+
+    def force_flush(self, timeout_millis=30000):
+        return self._delegate.force_flush(timeout_millis)
+
+
+class LazySpanExporter(SpanExporter):
+    """첫 export 호출 시 factory()로 실제 exporter를 만드는 래퍼 (생성 실패 시 다음 배치에서 재시도)"""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._delegate = None
+        self._lock = threading.Lock()
+
+    def _exporter(self):
+        if self._delegate is None:
+            with self._lock:
+                if self._delegate is None:
+                    self._delegate = self._factory()
+        return self._delegate
+
+    def export(self, spans):
+        try:
+            exporter = self._exporter()
+        except Exception:
+            logger.exception("Failed to create span exporter")
+            return SpanExportResult.FAILURE
+        return exporter.export(spans)
+
+    def shutdown(self):
+        if self._delegate is not None:
+            self._delegate.shutdown()
+
+    def force_flush(self, timeout_millis=30000):
+        if self._delegate is None:
+            return True
+        return self._delegate.force_flush(timeout_millis)
+
+
+def create_span_exporter():
+    """Jaeger(Thrift/UDP) exporter 생성 (thrift 관련 import도 이때 수행)"""
+    from opentelemetry.exporter.jaeger.thrift import JaegerExporter
+    return JaegerExporter(
+        agent_host_name=os.getenv("JAEGER_HOST", "jaeger"),
+        agent_port=int(os.getenv("JAEGER_PORT", "6831")),
+    )
+
+
+class MeteredBatchSpanProcessor(BatchSpanProcessor):
+    """큐가 가득 차서 버려지는 스팬 수를 기록하는 BatchSpanProcessor"""
+
+    def on_end(self, span):
+        if span.context.trace_flags.sampled and len(self.queue) >= self.max_queue_size:
+            SPANS_DROPPED.labels(reason="queue_full").inc()
+        super().on_end(span)
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    """샘플링되지 않은 트레이스 중 오류/느린 요청만 골라 내보내는 프로세서
+
+    RECORD_ONLY 스팬을 트레이스별로 모아 두었다가 이 프로세스의 루트 스팬
+    (부모가 없거나 원격인 스팬)이 끝나면 트레이스 전체를 내보낼지 결정합니다.
+    """
+
+    def __init__(self, delegate, slow_threshold_ms=TRACE_SLOW_THRESHOLD_MS,
+                 max_traces=TRACE_TAIL_MAX_TRACES):
+        self._delegate = delegate
+        self._slow_threshold_ns = slow_threshold_ms * 1e6
+        self._max_traces = max_traces
+        self._pending = OrderedDict()  # trace_id -> [span, ...]
+        self._lock = threading.Lock()
+
+    def on_start(self, span, parent_context=None):
+        self._delegate.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span):
+        if span.context.trace_flags.sampled:
+            self._delegate.on_end(span)
+            return
+
+        trace_id = span.context.trace_id
+        is_local_root = span.parent is None or span.parent.is_remote
+        with self._lock:
+            spans = self._pending.get(trace_id)
+            if spans is None:
+                spans = self._pending[trace_id] = []
+                if len(self._pending) > self._max_traces:
+                    _, evicted = self._pending.popitem(last=False)
+                    SPANS_DROPPED.labels(reason="tail_buffer_full").inc(len(evicted))
+            spans.append(span)
+            if not is_local_root:
+                return
+            spans = self._pending.pop(trace_id)
+
+        decision = self._decide(span, spans)
+        TAIL_DECISIONS.labels(decision=decision).inc()
+        if decision != "dropped":
+            for pending in spans:
+                self._delegate.on_end(_as_sampled(pending))
+
+    def _decide(self, root, spans):
+        if any(span.status.status_code == StatusCode.ERROR for span in spans):
+            return "kept_error"
+        if root.end_time - root.start_time >= self._slow_threshold_ns:
+            return "kept_slow"
+        return "dropped"
+
+    def shutdown(self):
+        self._delegate.shutdown()
+
+    def force_flush(self, timeout_millis=30000):
+        return self._delegate.force_flush(timeout_millis)
+
+
+def _as_sampled(span):
+    """내보내기 프로세서가 처리하도록 sampled 플래그를 켠 읽기 전용 스팬 사본"""
+    context = span.context
+    sampled_context = SpanContext(
+        trace_id=context.trace_id,
+        span_id=context.span_id,
+        is_remote=context.is_remote,
+        trace_flags=TraceFlags(context.trace_flags | TraceFlags.SAMPLED),
+        trace_state=context.trace_state,
+    )
+    return ReadableSpan(
+        name=span.name,
+        context=sampled_context,
+        parent=span.parent,
+        resource=span.resource,
+        attributes=span.attributes,
+        events=span.events,
+        links=span.links,
+        kind=span.kind,
+        status=span.status,
+        start_time=span.start_time,
+        end_time=span.end_time,
+        instrumentation_scope=span.instrumentation_scope,
+    )
+
+
+def init_tracing(service_name):
+    """서비스의 TracerProvider 설정 (프리포크 서버에서는 fork 이후에 호출)"""
+    sampler = ParentBased(TraceIdRatioBased(TRACE_SAMPLE_RATIO))
+    if TRACE_TAIL_SAMPLING:
+        sampler = RecordUnsampledSampler(sampler)
+
+    provider = TracerProvider(
+        resource=Resource(attributes={SERVICE_NAME: service_name}),
+        sampler=sampler,
+    )
+    processor = MeteredBatchSpanProcessor(
+        MeteredSpanExporter(LazySpanExporter(create_span_exporter)),
+        max_queue_size=OTEL_BSP_MAX_QUEUE_SIZE,
+        schedule_delay_millis=OTEL_BSP_SCHEDULE_DELAY,
+        max_export_batch_size=OTEL_BSP_MAX_EXPORT_BATCH_SIZE,
+        export_timeout_millis=OTEL_BSP_EXPORT_TIMEOUT,
+    )
+    if TRACE_TAIL_SAMPLING:
+        processor = TailSamplingSpanProcessor(processor)
+    provider.add_span_processor(processor)
+    trace.set_tracer_provider(provider)
+
+    logger.info(
+        "Tracing initialized for %s: sample_ratio=%s, tail_sampling=%s",
+        service_name, TRACE_SAMPLE_RATIO, TRACE_TAIL_SAMPLING
+    )
+    return provider
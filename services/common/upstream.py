@@ -0,0 +1,371 @@
+"""업스트림 서비스 호출용 커넥션 풀 클라이언트
+
+업스트림 서비스(URL)마다 keep-alive 세션과 크기가 제한된 커넥션 풀을 하나씩 두고,
+풀 점유율과 커넥션 대기 시간을 Prometheus 메트릭으로 노출합니다.
+
+모든 호출에는 업스트림별 연결/읽기 타임아웃과 회로 차단기가 적용되며,
+멱등 요청(GET)은 재시도 예산 안에서 재시도하고, 설정하면 느린 응답에 헤지 요청을 보냅니다
+(common/resilience.py).
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from opentelemetry import context
+
+from common.metrics import UPSTREAM_LATENCY_BUCKETS, status_class
+from common.resilience import CircuitBreaker, CircuitOpen, LatencyTracker, RetryBudget
+
+# 풀 설정 (환경 변수로 조정 가능)
+UPSTREAM_POOL_SIZE = int(os.getenv("UPSTREAM_POOL_SIZE", "20"))
+UPSTREAM_POOL_WAIT_TIMEOUT = float(os.getenv("UPSTREAM_POOL_WAIT_TIMEOUT", "2.0"))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "1.0"))
+UPSTREAM_READ_TIMEOUT = float(os.getenv("UPSTREAM_READ_TIMEOUT", "5.0"))
+
+# 회로 차단기 설정
+UPSTREAM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("UPSTREAM_BREAKER_FAILURE_THRESHOLD", "5"))
+UPSTREAM_BREAKER_RESET_TIMEOUT = float(os.getenv("UPSTREAM_BREAKER_RESET_TIMEOUT", "10"))
+UPSTREAM_BREAKER_HALF_OPEN_PROBES = int(os.getenv("UPSTREAM_BREAKER_HALF_OPEN_PROBES", "1"))
+
+# 재시도 설정 (멱등 요청만)
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "2"))
+UPSTREAM_RETRY_BACKOFF = float(os.getenv("UPSTREAM_RETRY_BACKOFF", "0.05"))
+UPSTREAM_RETRY_BUDGET_RATIO = float(os.getenv("UPSTREAM_RETRY_BUDGET_RATIO", "0.1"))
+UPSTREAM_RETRY_MIN_PER_SECOND = float(os.getenv("UPSTREAM_RETRY_MIN_PER_SECOND", "1.0"))
+
+# 헤지 요청 설정 (UPSTREAM_HEDGE_PERCENTILE이 0이면 사용 안 함)
+UPSTREAM_HEDGE_PERCENTILE = float(os.getenv("UPSTREAM_HEDGE_PERCENTILE", "0"))
+UPSTREAM_HEDGE_MIN_DELAY = float(os.getenv("UPSTREAM_HEDGE_MIN_DELAY", "0.01"))
+UPSTREAM_HEDGE_WINDOW = int(os.getenv("UPSTREAM_HEDGE_WINDOW", "1000"))
+UPSTREAM_HEDGE_WORKERS = int(os.getenv("UPSTREAM_HEDGE_WORKERS", "32"))
+
+IDEMPOTENT_METHODS = ("GET", "HEAD")
+# 재시도할 업스트림 응답 상태 코드
+RETRY_STATUSES = (502, 503, 504)
+
+
+def upstream_setting(name, key, default):
+    """업스트림별 설정 (예: UPSTREAM_PRODUCT_SERVICE_READ_TIMEOUT), 없으면 default"""
+    value = os.getenv(f"UPSTREAM_{name.upper().replace('-', '_')}_{key}")
+    return float(value) if value is not None else default
+
+
+class PoolTimeout(requests.exceptions.RequestException):
+    """풀에서 커넥션을 제한 시간 안에 얻지 못한 경우"""
+
+
+class UpstreamClient:
+    """단일 업스트림 서비스에 대한 풀링된 HTTP 클라이언트"""
+
+    def __init__(self, name, base_url, pools):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pools.pool_size
+        self.wait_timeout = pools.wait_timeout
+        self.timeout = (
+            upstream_setting(name, "CONNECT_TIMEOUT", pools.connect_timeout),
+            upstream_setting(name, "READ_TIMEOUT", pools.read_timeout),
+        )
+        self.max_retries = pools.max_retries
+        self.hedge_percentile = pools.hedge_percentile
+        self._pools = pools
+
+        # 풀이 가득 차면 새 커넥션을 만들지 않고 반환을 기다리도록 pool_block=True
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            pool_block=True,
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # urllib3 풀은 점유 상태를 노출하지 않으므로 같은 크기의 세마포어로 추적
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._in_use = pools.in_use.labels(upstream=name)
+        self._wait = pools.wait_seconds.labels(upstream=name)
+        pools.size.labels(upstream=name).set(self.pool_size)
+
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=pools.breaker_failure_threshold,
+            reset_timeout=pools.breaker_reset_timeout,
+            half_open_probes=pools.breaker_half_open_probes,
+            state_gauge=pools.circuit_state.labels(upstream=name),
+            transitions=pools.circuit_transitions,
+            rejected=pools.circuit_rejected.labels(upstream=name),
+        )
+        self.retry_budget = RetryBudget(pools.retry_budget_ratio, pools.retry_min_per_second)
+        self.latency = LatencyTracker(UPSTREAM_HEDGE_WINDOW)
+        self._retries = pools.retries
+        self._budget_exhausted = pools.retry_budget_exhausted.labels(upstream=name)
+        self._hedges = pools.hedges
+        self._duration = pools.request_duration
+
+    def _acquire(self):
+        start = time.perf_counter()
+        acquired = self._slots.acquire(timeout=self.wait_timeout)
+        self._wait.observe(time.perf_counter() - start)
+        if not acquired:
+            raise PoolTimeout(f"Connection pool for {self.name} exhausted")
+        self._in_use.inc()
+
+    def _release(self):
+        self._in_use.dec()
+        self._slots.release()
+
+    def request(self, method, path, **kwargs):
+        return self._call(method, path, False, kwargs)
+
+    def stream(self, method, path, **kwargs):
+        """본문을 읽지 않은 채 응답을 반환 (커넥션은 response.close() 시 풀로 반환)"""
+        return self._call(method, path, True, kwargs)
+
+    def _call(self, method, path, stream, kwargs):
+        """재시도 예산 안에서 멱등 요청을 재시도 (비멱등 요청은 한 번만 시도)"""
+        kwargs.setdefault("timeout", self.timeout)
+        idempotent = method in IDEMPOTENT_METHODS
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                if idempotent and self.hedge_percentile:
+                    response = self._hedged(method, path, stream, kwargs)
+                else:
+                    response = self._attempt(method, path, stream, kwargs)
+            except (CircuitOpen, PoolTimeout):
+                # 업스트림에 보내지 않은 요청은 재시도해도 결과가 같으므로 바로 실패
+                raise
+            except requests.exceptions.RequestException:
+                if not (idempotent and self._can_retry(attempt, "error")):
+                    raise
+            else:
+                if not (idempotent and response.status_code in RETRY_STATUSES
+                        and self._can_retry(attempt, "status")):
+                    return response
+                response.close()
+            attempt += 1
+            # 지수 백오프 + 지터 (재시도가 한꺼번에 몰리지 않도록)
+            time.sleep(UPSTREAM_RETRY_BACKOFF * (2 ** (attempt - 1)) * random.uniform(0.5, 1.0))
+
+    def _can_retry(self, attempt, reason):
+        if attempt >= self.max_retries:
+            return False
+        if not self.retry_budget.withdraw():
+            self._budget_exhausted.inc()
+            return False
+        self._retries.labels(upstream=self.name, reason=reason).inc()
+        return True
+
+    def _attempt(self, method, path, stream, kwargs):
+        """회로 차단기와 커넥션 풀을 거쳐 요청 한 번 전송"""
+        self._acquire()
+        try:
+            self.breaker.allow()
+        except CircuitOpen:
+            self._release()
+            raise
+
+        start = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, f"{self.base_url}{path}", stream=stream, **kwargs
+            )
+        except BaseException:
+            self.breaker.record_failure()
+            self._release()
+            self._duration.labels(upstream=self.name, method=method, status="error").observe(
+                time.perf_counter() - start
+            )
+            raise
+
+        elapsed = time.perf_counter() - start
+        self._duration.labels(
+            upstream=self.name, method=method, status=status_class(response.status_code)
+        ).observe(elapsed)
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        if method in IDEMPOTENT_METHODS:
+            self.latency.record(elapsed)
+
+        if not stream:
+            self._release()
+            return response
+
+        close = response.close
+        release_once = threading.Lock()
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if release_once.acquire(blocking=False):
+                    self._release()
+
+        response.close = close_and_release
+        return response
+
+    def _hedged(self, method, path, stream, kwargs):
+        """응답이 최근 지연 시간 백분위수보다 늦으면 같은 요청을 한 번 더 보내 먼저 성공한 응답 사용"""
+        delay = self.latency.percentile(self.hedge_percentile)
+        if delay is None:
+            return self._attempt(method, path, stream, kwargs)
+
+        executor = self._pools.hedge_executor()
+        parent_context = context.get_current()
+        primary = executor.submit(self._attempt_in_context, parent_context, method, path, stream, kwargs)
+        done, _ = wait([primary], timeout=max(delay, UPSTREAM_HEDGE_MIN_DELAY))
+        if done:
+            return primary.result()
+        # 헤지 요청도 추가 부하이므로 재시도 예산에서 차감
+        if not self.retry_budget.withdraw():
+            self._budget_exhausted.inc()
+            return primary.result()
+        hedge = executor.submit(self._attempt_in_context, parent_context, method, path, stream, kwargs)
+
+        winner = None
+        error = None
+        pending = {primary, hedge}
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.exceptions.RequestException as e:
+                    error = e
+                    continue
+                if winner is None:
+                    winner = response
+                    self._hedges.labels(upstream=self.name, winner="hedge" if future is hedge else "primary").inc()
+                else:
+                    response.close()
+        # 늦게 끝나는 쪽의 응답은 커넥션 반환을 위해 닫음
+        for future in pending:
+            future.add_done_callback(_close_response)
+        if winner is None:
+            self._hedges.labels(upstream=self.name, winner="none").inc()
+            raise error
+        return winner
+
+    def _attempt_in_context(self, parent_context, method, path, stream, kwargs):
+        token = context.attach(parent_context)
+        try:
+            return self._attempt(method, path, stream, kwargs)
+        finally:
+            context.detach(token)
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class UpstreamPools:
+    """업스트림별 클라이언트와 풀/복원력 메트릭 관리"""
+
+    def __init__(self, registry=REGISTRY, pool_size=UPSTREAM_POOL_SIZE,
+                 wait_timeout=UPSTREAM_POOL_WAIT_TIMEOUT,
+                 connect_timeout=UPSTREAM_CONNECT_TIMEOUT,
+                 read_timeout=UPSTREAM_READ_TIMEOUT,
+                 breaker_failure_threshold=UPSTREAM_BREAKER_FAILURE_THRESHOLD,
+                 breaker_reset_timeout=UPSTREAM_BREAKER_RESET_TIMEOUT,
+                 breaker_half_open_probes=UPSTREAM_BREAKER_HALF_OPEN_PROBES,
+                 max_retries=UPSTREAM_MAX_RETRIES,
+                 retry_budget_ratio=UPSTREAM_RETRY_BUDGET_RATIO,
+                 retry_min_per_second=UPSTREAM_RETRY_MIN_PER_SECOND,
+                 hedge_percentile=UPSTREAM_HEDGE_PERCENTILE):
+        self.pool_size = pool_size
+        self.wait_timeout = wait_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.breaker_failure_threshold = breaker_failure_threshold
+        self.breaker_reset_timeout = breaker_reset_timeout
+        self.breaker_half_open_probes = breaker_half_open_probes
+        self.max_retries = max_retries
+        self.retry_budget_ratio = retry_budget_ratio
+        self.retry_min_per_second = retry_min_per_second
+        self.hedge_percentile = hedge_percentile
+        self._clients = {}
+        self._hedge_executor = None
+        self._hedge_executor_lock = threading.Lock()
+
+        self.size = Gauge(
+            'upstream_pool_size', 'Maximum connections per upstream pool',
+            ['upstream'], registry=registry, multiprocess_mode='max'
+        )
+        self.in_use = Gauge(
+            'upstream_pool_in_use', 'Connections currently checked out of the upstream pool',
+            ['upstream'], registry=registry, multiprocess_mode='livesum'
+        )
+        self.wait_seconds = Histogram(
+            'upstream_pool_wait_seconds', 'Time spent waiting for an upstream pool connection',
+            ['upstream'], registry=registry,
+            buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+        )
+        # 응답 헤더 수신까지의 시간 (스트리밍 응답의 본문 전송 시간은 제외)
+        self.request_duration = Histogram(
+            'upstream_request_duration_seconds', 'Upstream call latency per attempt',
+            ['upstream', 'method', 'status'], registry=registry,
+            buckets=UPSTREAM_LATENCY_BUCKETS
+        )
+        self.circuit_state = Gauge(
+            'upstream_circuit_state', 'Circuit breaker state (0=closed, 1=half-open, 2=open)',
+            ['upstream'], registry=registry, multiprocess_mode='max'
+        )
+        self.circuit_transitions = Counter(
+            'upstream_circuit_transitions_total', 'Circuit breaker state transitions',
+            ['upstream', 'state'], registry=registry
+        )
+        self.circuit_rejected = Counter(
+            'upstream_circuit_rejected_total', 'Calls rejected because the circuit was open',
+            ['upstream'], registry=registry
+        )
+        self.retries = Counter(
+            'upstream_retries_total', 'Retried upstream calls by cause',
+            ['upstream', 'reason'], registry=registry
+        )
+        self.retry_budget_exhausted = Counter(
+            'upstream_retry_budget_exhausted_total', 'Retries or hedges skipped because the retry budget was empty',
+            ['upstream'], registry=registry
+        )
+        self.hedges = Counter(
+            'upstream_hedged_requests_total', 'Hedged requests by which attempt answered first',
+            ['upstream', 'winner'], registry=registry
+        )
+
+    def add(self, name, base_url):
+        client = UpstreamClient(name, base_url, self)
+        self._clients[name] = client
+        return client
+
+    def get(self, name):
+        return self._clients[name]
+
+    def hedge_executor(self):
+        """헤지 요청용 스레드 풀 (프리포크 워커에서 스레드를 만들도록 처음 사용할 때 생성)"""
+        if self._hedge_executor is None:
+            with self._hedge_executor_lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(
+                        max_workers=UPSTREAM_HEDGE_WORKERS, thread_name_prefix="upstream-hedge"
+                    )
+        return self._hedge_executor
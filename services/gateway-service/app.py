@@ -1,125 +1,485 @@
 from flask import Flask, jsonify, request, Response
+import gzip
+import hashlib
+import ipaddress
+import json
 import os
 import requests
-from prometheus_flask_exporter import PrometheusMetrics
+from prometheus_client import Counter
 from opentelemetry import trace
-from opentelemetry.instrumentation.flask import FlaskInstrumentor
-from opentelemetry.instrumentation.requests import RequestsInstrumentor
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.jaeger.thrift import JaegerExporter
-from opentelemetry.sdk.resources import SERVICE_NAME, Resource
 import logging
 from flask_cors import CORS
+from common.admission import AdmissionControl, Overloaded
+from common.bootstrap import bootstrap
+from common.cache import MISSING, Caches
+from common.coalesce import SingleFlight
+from common.listing import LIST_DEFAULT_LIMIT, LIST_MAX_LIMIT, NDJSON_MIMETYPE, NEXT_CURSOR_HEADER, requested_ids
+from common.logs import setup_logging
+from common.sharding import ShardedUpstream, merge_lookups, parse_shard_cursor, parse_shards, shard_cursor
+from common.upstream import UpstreamPools, upstream_setting
 
-# 로깅 설정
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.StreamHandler()
-    ]
-)
+# 로깅 설정 (JSON 한 줄 형식, 백그라운드 스레드에서 출력)
+setup_logging("gateway-service")
 logger = logging.getLogger(__name__)
 
 # Flask 앱 생성
 app = Flask(__name__)
 CORS(app)  # CORS 활성화
 
-# Prometheus 메트릭 설정
-metrics = PrometheusMetrics(app)
-metrics.info('app_info', 'Gateway Service', version='1.0.0')
-
-# OpenTelemetry 설정
-resource = Resource(attributes={
-    SERVICE_NAME: "gateway-service"
-})
-
-trace.set_tracer_provider(TracerProvider(resource=resource))
-jaeger_exporter = JaegerExporter(
-    agent_host_name=os.getenv("JAEGER_HOST", "jaeger"),
-    agent_port=int(os.getenv("JAEGER_PORT", "6831")),
-)
-trace.get_tracer_provider().add_span_processor(
-    BatchSpanProcessor(jaeger_exporter)
-)
-
-# Flask와 Requests 계측
-FlaskInstrumentor().instrument_app(app)
-RequestsInstrumentor().instrument()
+# Prometheus 메트릭, OpenTelemetry 트레이스, Flask/Requests 계측 설정 (common/bootstrap.py)
+startup = bootstrap(app, "gateway-service", instrument_requests=True)
 
 # 서비스 URL 설정
 PRODUCT_SERVICE_URL = os.getenv("PRODUCT_SERVICE_URL", "http://product-service:8081")
 INVENTORY_SERVICE_URL = os.getenv("INVENTORY_SERVICE_URL", "http://inventory-service:8082")
 ORDER_SERVICE_URL = os.getenv("ORDER_SERVICE_URL", "http://order-service:8083")
+# 재고 샤드 목록 ("이름=URL,...", 제품 ID의 일관된 해시로 샤드 선택), 없으면 INVENTORY_SERVICE_URL 하나
+INVENTORY_SHARDS = parse_shards(os.getenv("INVENTORY_SHARDS", "")) or [("inventory-service", INVENTORY_SERVICE_URL)]
+
+# 업스트림별 커넥션 풀 (keep-alive 재사용)
+upstreams = UpstreamPools()
+product_service = upstreams.add("product-service", PRODUCT_SERVICE_URL)
+inventory_shards = ShardedUpstream(upstreams, INVENTORY_SHARDS)
+order_service = upstreams.add("order-service", ORDER_SERVICE_URL)
+# 샤드가 하나면 재고 목록/일괄 조회도 합치지 않고 그대로 전달
+inventory_service = inventory_shards.clients[INVENTORY_SHARDS[0][0]] if len(inventory_shards) == 1 else None
+
+# 제품 상세 응답 캐시 (GET /api/products/<id>)
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", "10000"))
+PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", "30"))
+caches = Caches()
+product_response_cache = caches.add("product_response", maxsize=PRODUCT_CACHE_SIZE, ttl=PRODUCT_CACHE_TTL)
+
+# 수락 제어 설정 (워커 프로세스별로 적용)
+GATEWAY_RATE_LIMIT = float(os.getenv("GATEWAY_RATE_LIMIT", "100"))
+GATEWAY_RATE_BURST = float(os.getenv("GATEWAY_RATE_BURST", "200"))
+# 라우트별 요청률 재정의 ("/api/orders=20:40,/api/orders/batch=2:5", 라우트=초당 요청 수:버스트)
+GATEWAY_RATE_LIMIT_ROUTES = os.getenv("GATEWAY_RATE_LIMIT_ROUTES", "")
+GATEWAY_CLIENT_ID_HEADER = os.getenv("GATEWAY_CLIENT_ID_HEADER", "X-Client-Id")
+# 클라이언트 식별 헤더와 X-Forwarded-For를 믿을 프록시 주소 (쉼표로 구분된 IP 또는 CIDR, 없으면 접속 주소만 사용)
+GATEWAY_TRUSTED_PROXIES = os.getenv("GATEWAY_TRUSTED_PROXIES", "")
+GATEWAY_UPSTREAM_CONCURRENCY = int(os.getenv("GATEWAY_UPSTREAM_CONCURRENCY", "64"))
+GATEWAY_UPSTREAM_QUEUE_SIZE = int(os.getenv("GATEWAY_UPSTREAM_QUEUE_SIZE", "128"))
+GATEWAY_UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("GATEWAY_UPSTREAM_QUEUE_TIMEOUT", "0.5"))
+
+def parse_route_rate_limits(value):
+    """"라우트=요청률:버스트,..." 형식을 {라우트: (요청률, 버스트)}로 변환"""
+    limits = {}
+    for entry in value.split(","):
+        if "=" not in entry:
+            continue
+        route, limit = entry.rsplit("=", 1)
+        rate, _, burst = limit.partition(":")
+        limits[route.strip()] = (float(rate), float(burst or rate))
+    return limits
+
+def parse_networks(value):
+    """"IP 또는 CIDR,..." 형식을 ip_network 목록으로 변환"""
+    return [ipaddress.ip_network(entry.strip(), strict=False) for entry in value.split(",") if entry.strip()]
+
+route_rate_limits = parse_route_rate_limits(GATEWAY_RATE_LIMIT_ROUTES)
+trusted_proxies = parse_networks(GATEWAY_TRUSTED_PROXIES)
+admission = AdmissionControl()
+for client in (product_service, *inventory_shards.clients.values(), order_service):
+    admission.add(
+        client.name,
+        limit=int(upstream_setting(client.name, "CONCURRENCY", GATEWAY_UPSTREAM_CONCURRENCY)),
+        queue_size=int(upstream_setting(client.name, "QUEUE_SIZE", GATEWAY_UPSTREAM_QUEUE_SIZE)),
+        queue_timeout=upstream_setting(client.name, "QUEUE_TIMEOUT", GATEWAY_UPSTREAM_QUEUE_TIMEOUT),
+    )
+
+def is_trusted_proxy(address):
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_proxies)
+
+def client_id():
+    """요청률 제한 키로 쓸 클라이언트 식별자
+
+    클라이언트가 보낸 헤더는 위조할 수 있으므로 접속 주소가 신뢰하는 프록시(GATEWAY_TRUSTED_PROXIES)일
+    때만 식별 헤더와 X-Forwarded-For를 사용합니다. X-Forwarded-For는 오른쪽(가까운 프록시)부터 보며
+    신뢰하는 프록시가 아닌 첫 주소를 클라이언트로 봅니다.
+    """
+    remote_addr = request.remote_addr or "unknown"
+    if not is_trusted_proxy(remote_addr):
+        return remote_addr
+    client = request.headers.get(GATEWAY_CLIENT_ID_HEADER)
+    if client:
+        return client
+    forwarded_for = request.headers.get("X-Forwarded-For", "")
+    for address in reversed([entry.strip() for entry in forwarded_for.split(",") if entry.strip()]):
+        if not is_trusted_proxy(address):
+            return address
+    return remote_addr
+
+@app.before_request
+def limit_request_rate():
+    """클라이언트·라우트별 요청률 제한 (초과 시 429)"""
+    if request.url_rule is None or not request.url_rule.rule.startswith("/api/"):
+        return None
+    route = request.url_rule.rule
+    rate, burst = route_rate_limits.get(route, (GATEWAY_RATE_LIMIT, GATEWAY_RATE_BURST))
+    if rate <= 0:
+        return None
+    allowed, retry_after = admission.rate_limiter.allow(f"{client_id()}|{route}", rate, burst)
+    if allowed:
+        return None
+    admission.rate_limited.labels(route=route).inc()
+    response = jsonify({"error": "Rate limit exceeded"})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(max(1, round(retry_after)))
+    return response
+
+def overloaded_response(e):
+    logger.warning("Shedding request: %s", e)
+    response = jsonify({"error": f"Service overloaded: {e.reason}"})
+    response.status_code = 503
+    response.headers["Retry-After"] = "1"
+    return response
 
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "UP"})
 
+# 업스트림 응답 본문을 전달할 때 사용할 청크 크기
+PROXY_CHUNK_SIZE = int(os.getenv("PROXY_CHUNK_SIZE", str(64 * 1024)))
+
+# 업스트림 응답에서 클라이언트로 전달할 헤더
+FORWARDED_HEADERS = ('X-Next-Cursor',)
+
 # 프록시 함수
-def proxy_request(service_url, path, method, json=None, params=None):
+def proxy_request(upstream, path, method, json=None, params=None):
     tracer = trace.get_tracer(__name__)
     with tracer.start_as_current_span(f"proxy_{method.lower()}_{path}"):
+        if method not in ('GET', 'POST', 'PUT', 'DELETE'):
+            return jsonify({"error": "Unsupported method"}), 400
+        
+        # 업스트림 동시 요청 한도 (본문 전송이 끝날 때까지 점유)
+        limiter = admission.get(upstream.name)
         try:
-            url = f"{service_url}{path}"
-            logger.info(f"Proxying {method} request to {url}")
-            
-            if method == 'GET':
-                response = requests.get(url, params=params)
-            elif method == 'POST':
-                response = requests.post(url, json=json)
-            elif method == 'PUT':
-                response = requests.put(url, json=json)
-            elif method == 'DELETE':
-                response = requests.delete(url)
-            else:
-                return jsonify({"error": "Unsupported method"}), 400
-            
-            return Response(
-                response.content,
-                status=response.status_code,
-                content_type=response.headers.get('Content-Type', 'application/json')
-            )
+            limiter.acquire()
+        except Overloaded as e:
+            return overloaded_response(e)
+        
+        try:
+            logger.info("Proxying %s request to %s%s", method, upstream.base_url, path)
+            response = upstream.stream(method, path, json=json, params=params)
+        except requests.exceptions.RequestException as e:
+            limiter.release()
+            logger.error("Proxy error: %s", e)
+            return jsonify({"error": f"Service unavailable: {str(e)}"}), 503
+        
+        # 본문을 버퍼링하지 않고 청크 단위로 그대로 전달
+        proxied = Response(
+            response.iter_content(chunk_size=PROXY_CHUNK_SIZE),
+            status=response.status_code,
+            content_type=response.headers.get('Content-Type', 'application/json')
+        )
+        for header in FORWARDED_HEADERS:
+            if header in response.headers:
+                proxied.headers[header] = response.headers[header]
+        proxied.call_on_close(response.close)
+        proxied.call_on_close(limiter.release)
+        return proxied
+
+# 이 크기 이상의 응답 본문은 클라이언트가 허용하면 gzip으로 압축
+GATEWAY_GZIP_MIN_SIZE = int(os.getenv("GATEWAY_GZIP_MIN_SIZE", "1024"))
+GATEWAY_GZIP_LEVEL = int(os.getenv("GATEWAY_GZIP_LEVEL", "5"))
+
+NOT_MODIFIED = Counter(
+    'gateway_not_modified_total', 'Conditional GETs answered with 304 Not Modified',
+    ['route']
+)
+GZIP_BYTES = Counter(
+    'gateway_gzip_bytes_total', 'Response body bytes before and after gzip compression',
+    ['stage']
+)
+
+# 동시에 들어온 같은 GET 요청은 업스트림 호출 하나로 합침
+inflight_gets = SingleFlight("gateway")
+
+class BufferedResponse:
+    """본문까지 읽은 업스트림 응답 (합쳐진 요청과 캐시가 공유하므로 변경하지 않음)
+
+    성공 응답은 본문 해시로 약한 ETag를 만들고, gzip 본문은 처음 필요할 때 한 번만 압축합니다.
+    """
+    __slots__ = ("status", "body", "content_type", "headers", "etag", "_gzipped")
+
+    def __init__(self, response):
+        self.status = response.status_code
+        self.body = response.content
+        self.content_type = response.headers.get('Content-Type', 'application/json')
+        self.headers = {
+            header: response.headers[header] for header in FORWARDED_HEADERS if header in response.headers
+        }
+        self.etag = hashlib.blake2b(self.body, digest_size=16).hexdigest() if self.status == 200 else None
+        self._gzipped = None
+
+    def gzipped(self):
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, GATEWAY_GZIP_LEVEL)
+        return self._gzipped
+
+def buffered_response(buffered):
+    """ETag(If-None-Match 일치 시 304)와 gzip 압축을 적용한 클라이언트 응답"""
+    response = Response(status=buffered.status, content_type=buffered.content_type, headers=buffered.headers)
+    if buffered.etag is not None:
+        # 압축 여부와 관계없이 같은 값을 쓰므로 약한 ETag
+        response.set_etag(buffered.etag, weak=True)
+        if request.if_none_match.contains_weak(buffered.etag):
+            NOT_MODIFIED.labels(route=request.url_rule.rule).inc()
+            response.status_code = 304
+            return response
+    
+    body = buffered.body
+    response.vary.add('Accept-Encoding')
+    if len(body) >= GATEWAY_GZIP_MIN_SIZE and request.accept_encodings['gzip']:
+        body = buffered.gzipped()
+        response.content_encoding = 'gzip'
+        GZIP_BYTES.labels(stage="original").inc(len(buffered.body))
+        GZIP_BYTES.labels(stage="compressed").inc(len(body))
+    response.set_data(body)
+    return response
+
+def fetch_buffered(upstream, path, params=None):
+    """동시 요청 한도 안에서 업스트림 GET 후 BufferedResponse 반환 (Overloaded, RequestException 전파)"""
+    limiter = admission.get(upstream.name)
+    limiter.acquire()
+    try:
+        logger.info("Proxying GET request to %s%s", upstream.base_url, path)
+        return BufferedResponse(upstream.get(path, params=params))
+    finally:
+        limiter.release()
+
+def coalesced_proxy_get(upstream, path, params=None, cache=None):
+    """같은 GET 요청을 업스트림 호출 하나로 합치는 프록시 (cache를 지정하면 성공 응답 캐시)"""
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span(f"proxy_get_{path}") as span:
+        query = tuple(sorted(params.items(multi=True))) if params else ()
+        
+        def load():
+            buffered = fetch_buffered(upstream, path, params)
+            if cache is not None and buffered.status == 200:
+                cache.set(path, buffered)
+            return buffered
+        
+        try:
+            buffered, coalesced = inflight_gets.do((upstream.name, path, query), load)
+        except Overloaded as e:
+            return overloaded_response(e)
         except requests.exceptions.RequestException as e:
-            logger.error(f"Proxy error: {str(e)}")
+            logger.error("Proxy error: %s", e)
             return jsonify({"error": f"Service unavailable: {str(e)}"}), 503
+        span.set_attribute("gateway.coalesced", coalesced)
+        return buffered_response(buffered)
+
+def cached_proxy_get(cache, upstream, path):
+    """성공(200) 응답만 캐시하는 GET 프록시 (캐시 미스는 요청 합치기를 거쳐 조회)"""
+    cached = cache.get(path)
+    if cached is not MISSING:
+        trace.get_current_span().set_attribute("gateway.cache_hit", True)
+        return buffered_response(cached)
+    return coalesced_proxy_get(upstream, path, cache=cache)
 
 # 제품 서비스 라우트
 @app.route('/api/products', methods=['GET', 'POST'])
 def handle_products():
     if request.method == 'GET':
-        return proxy_request(PRODUCT_SERVICE_URL, '/products', 'GET', params=request.args)
+        # NDJSON 스트리밍은 버퍼링하지 않고 그대로 전달
+        if request.args.get('format') == 'ndjson':
+            return proxy_request(product_service, '/products', 'GET', params=request.args)
+        return coalesced_proxy_get(product_service, '/products', params=request.args)
     else:  # POST
-        return proxy_request(PRODUCT_SERVICE_URL, '/products', 'POST', json=request.json)
+        return proxy_request(product_service, '/products', 'POST', json=request.json)
 
-@app.route('/api/products/<product_id>', methods=['GET'])
+@app.route('/api/products/<product_id>', methods=['GET', 'PUT'])
 def handle_product(product_id):
-    return proxy_request(PRODUCT_SERVICE_URL, f'/products/{product_id}', 'GET')
+    if request.method == 'GET':
+        return cached_proxy_get(product_response_cache, product_service, f'/products/{product_id}')
+    else:  # PUT
+        product_response_cache.invalidate(f'/products/{product_id}')
+        return proxy_request(product_service, f'/products/{product_id}', 'PUT', json=request.json)
+
+@app.route('/api/products/lookup', methods=['POST'])
+def handle_products_lookup():
+    return proxy_request(product_service, '/products/lookup', 'POST', json=request.json)
+
+# 제품 캐시 무효화 (product-service가 제품 수정 시 호출)
+@app.route('/cache/products/<product_id>', methods=['DELETE'])
+def invalidate_product_cache(product_id):
+    product_response_cache.invalidate(f'/products/{product_id}')
+    logger.info("Invalidated product response cache entry: %s", product_id)
+    return '', 204
+
+@app.route('/cache/products', methods=['DELETE'])
+def clear_product_cache():
+    product_response_cache.clear()
+    logger.info("Cleared product response cache")
+    return '', 204
+
+def shard_call(upstream, method, path, **kwargs):
+    """동시 요청 한도 안에서 샤드를 호출하고 JSON 본문 반환 (Overloaded, RequestException 전파)"""
+    limiter = admission.get(upstream.name)
+    limiter.acquire()
+    try:
+        logger.info("Calling shard %s: %s %s", upstream.name, method, path)
+        response = upstream.request(method, path, **kwargs)
+        response.raise_for_status()
+        return response.json()
+    finally:
+        limiter.release()
+
+def shard_error_response(e):
+    if isinstance(e, Overloaded):
+        return overloaded_response(e)
+    logger.error("Shard error: %s", e)
+    return jsonify({"error": f"Service unavailable: {str(e)}"}), 503
+
+def sharded_inventory_lookup():
+    """여러 제품 재고를 소유 샤드별로 동시에 조회해 요청 순서대로 합침"""
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("sharded_inventory_lookup") as span:
+        product_ids = requested_ids()
+        if product_ids is None:
+            return jsonify({"error": f"Between 1 and {LIST_MAX_LIMIT} ids are required"}), 400
+        groups = inventory_shards.group(product_ids)
+        span.set_attribute("inventory.shards", len(groups))
+        pages, errors = inventory_shards.scatter(
+            lambda client, ids: shard_call(client, 'POST', '/inventory/lookup', json={"ids": ids}), groups
+        )
+        if errors:
+            return shard_error_response(next(iter(errors.values())))
+        return jsonify(merge_lookups(product_ids, pages.values(), "productId"))
 
-# 인벤토리 서비스 라우트
+def sharded_inventory_list():
+    """모든 샤드의 재고 목록을 샤드 순서대로 이어서 조회
+
+    파라미터가 없으면 전체를 하나의 {제품 ID: 수량}으로 합치고, limit/cursor를 지정하면
+    "샤드 이름:샤드 안의 커서" 형식의 커서로 샤드를 넘어가며 페이지를 채웁니다.
+    """
+    args = request.args
+    ndjson = args.get("format") == "ndjson"
+    clients = inventory_shards.clients
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("sharded_inventory_list"):
+        if not ndjson and "limit" not in args and "cursor" not in args:
+            pages, errors = inventory_shards.scatter(
+                lambda client, _: shard_call(client, 'GET', '/inventory'), dict.fromkeys(clients.values())
+            )
+            if errors:
+                return shard_error_response(next(iter(errors.values())))
+            merged = {}
+            for client in clients.values():
+                merged.update(pages[client])
+            return jsonify(merged)
+        
+        names = list(clients)
+        try:
+            position, after = parse_shard_cursor(args.get("cursor"), names)
+            # NDJSON은 limit이 없으면 커서 이후 전체를 스트리밍
+            limit = int(args["limit"]) if "limit" in args else (None if ndjson else LIST_DEFAULT_LIMIT)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor or limit"}), 400
+        if limit is not None and limit <= 0:
+            return jsonify({"error": "Invalid cursor or limit"}), 400
+        if limit is None:
+            return Response(stream_inventory_shards(names[position:], after), mimetype=NDJSON_MIMETYPE)
+        if not ndjson:
+            limit = min(limit, LIST_MAX_LIMIT)
+        
+        items = []
+        next_cursor = None
+        try:
+            for name in names[position:]:
+                page = shard_call(
+                    clients[name], 'GET', '/inventory', params={"cursor": after, "limit": limit - len(items)}
+                )
+                items.extend(page["items"])
+                if page["nextCursor"]:
+                    next_cursor = shard_cursor(name, page["nextCursor"])
+                    break
+                after = 0
+        except (Overloaded, requests.exceptions.RequestException) as e:
+            return shard_error_response(e)
+        
+        if ndjson:
+            response = Response(
+                "".join(json.dumps(item) + "\n" for item in items), mimetype=NDJSON_MIMETYPE
+            )
+        else:
+            response = jsonify({"items": items, "nextCursor": next_cursor})
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return response
+
+def stream_inventory_shards(names, after):
+    """샤드별 NDJSON 응답을 차례로 이어서 전달 (중간에 실패하면 거기서 응답을 끝냄)"""
+    for name in names:
+        client = inventory_shards.clients[name]
+        limiter = admission.get(client.name)
+        try:
+            limiter.acquire()
+        except Overloaded as e:
+            logger.error("Stopped streaming inventory at shard %s: %s", name, e)
+            return
+        try:
+            response = client.stream('GET', '/inventory', params={"format": "ndjson", "cursor": after})
+            try:
+                response.raise_for_status()
+                yield from response.iter_content(chunk_size=PROXY_CHUNK_SIZE)
+            finally:
+                response.close()
+        except requests.exceptions.RequestException as e:
+            logger.error("Stopped streaming inventory at shard %s: %s", name, e)
+            return
+        finally:
+            limiter.release()
+        after = 0
+
+# 인벤토리 서비스 라우트 (제품별 요청은 제품을 소유한 샤드로, 목록/일괄 조회는 모든 샤드의 결과를 합침)
 @app.route('/api/inventory', methods=['GET'])
 def handle_inventory():
-    return proxy_request(INVENTORY_SERVICE_URL, '/inventory', 'GET', params=request.args)
+    if inventory_service is None:
+        return sharded_inventory_lookup() if "ids" in request.args else sharded_inventory_list()
+    return proxy_request(inventory_service, '/inventory', 'GET', params=request.args)
+
+@app.route('/api/inventory/lookup', methods=['POST'])
+def handle_inventory_lookup():
+    if inventory_service is None:
+        return sharded_inventory_lookup()
+    return proxy_request(inventory_service, '/inventory/lookup', 'POST', json=request.json)
 
 @app.route('/api/inventory/<product_id>', methods=['GET', 'PUT'])
 def handle_product_inventory(product_id):
+    shard = inventory_shards.client(product_id)
     if request.method == 'GET':
-        return proxy_request(INVENTORY_SERVICE_URL, f'/inventory/{product_id}', 'GET')
+        return proxy_request(shard, f'/inventory/{product_id}', 'GET')
     else:  # PUT
-        return proxy_request(INVENTORY_SERVICE_URL, f'/inventory/{product_id}', 'PUT', json=request.json)
+        return proxy_request(shard, f'/inventory/{product_id}', 'PUT', json=request.json)
 
 # 주문 서비스 라우트
 @app.route('/api/orders', methods=['GET', 'POST'])
 def handle_orders():
     if request.method == 'GET':
-        return proxy_request(ORDER_SERVICE_URL, '/orders', 'GET', params=request.args)
+        return proxy_request(order_service, '/orders', 'GET', params=request.args)
     else:  # POST
-        return proxy_request(ORDER_SERVICE_URL, '/orders', 'POST', json=request.json)
+        return proxy_request(order_service, '/orders', 'POST', json=request.json)
+
+@app.route('/api/orders/stats', methods=['GET'])
+def handle_order_stats():
+    return proxy_request(order_service, '/orders/stats', 'GET', params=request.args)
+
+@app.route('/api/orders/batch', methods=['POST'])
+def handle_orders_batch():
+    return proxy_request(order_service, '/orders/batch', 'POST', json=request.json)
 
 @app.route('/api/orders/<order_id>', methods=['GET'])
 def handle_order(order_id):
-    return proxy_request(ORDER_SERVICE_URL, f'/orders/{order_id}', 'GET')
+    return proxy_request(order_service, f'/orders/{order_id}', 'GET')
+
+startup.done()
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=int(os.getenv('PORT', 8080)))
\ No newline at end of file
@@ -0,0 +1,355 @@
+"""게이트웨이 서비스 비동기(ASGI) 진입점
+
+app.py와 같은 /api/products, /api/inventory, /api/orders 라우트를 asyncio 기반으로 제공합니다.
+업스트림 호출은 httpx.AsyncClient로 논블로킹 처리하고, 응답 본문은 버퍼링하지 않고 그대로 스트리밍합니다.
+
+실행:
+    uvicorn asgi:app --host 0.0.0.0 --port 8080
+"""
+import asyncio
+import json
+import os
+import logging
+from contextlib import asynccontextmanager
+
+import httpx
+from starlette.applications import Starlette
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from opentelemetry import trace
+from common.bootstrap import Startup, instrumentation_enabled, tracing_enabled
+from common.listing import LIST_DEFAULT_LIMIT, LIST_MAX_LIMIT, NDJSON_MIMETYPE, NEXT_CURSOR_HEADER
+from common.logs import setup_logging
+from common.metrics import METRICS_PATH
+from common.sharding import HashRing, merge_lookups, parse_shard_cursor, parse_shards, shard_cursor
+from common.upstream import (
+    UPSTREAM_POOL_SIZE,
+    UPSTREAM_POOL_WAIT_TIMEOUT,
+    UPSTREAM_CONNECT_TIMEOUT,
+    UPSTREAM_READ_TIMEOUT,
+)
+
+# 로깅 설정 (JSON 한 줄 형식, 백그라운드 스레드에서 출력)
+setup_logging("gateway-service")
+logger = logging.getLogger(__name__)
+
+startup = Startup("gateway-service")
+
+# OpenTelemetry 설정 (OTEL_SDK_DISABLED, OTEL_PYTHON_DISABLED_INSTRUMENTATIONS로 끌 수 있음)
+if tracing_enabled():
+    with startup.phase("tracing"):
+        from common.tracing import init_tracing
+        init_tracing("gateway-service")
+
+# httpx 계측 (RequestsInstrumentor와 동일하게 traceparent 헤더 전파)
+if instrumentation_enabled("httpx"):
+    with startup.phase("httpx_instrumentation"):
+        from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+        HTTPXClientInstrumentor().instrument()
+
+# 서비스 URL 설정
+PRODUCT_SERVICE_URL = os.getenv("PRODUCT_SERVICE_URL", "http://product-service:8081")
+INVENTORY_SERVICE_URL = os.getenv("INVENTORY_SERVICE_URL", "http://inventory-service:8082")
+ORDER_SERVICE_URL = os.getenv("ORDER_SERVICE_URL", "http://order-service:8083")
+# 재고 샤드 목록 (app.py와 같은 설정), 샤드가 하나면 목록/일괄 조회도 그대로 전달
+INVENTORY_SHARDS = parse_shards(os.getenv("INVENTORY_SHARDS", "")) or [("inventory-service", INVENTORY_SERVICE_URL)]
+inventory_ring = HashRing([name for name, _ in INVENTORY_SHARDS])
+SHARDED = len(INVENTORY_SHARDS) > 1
+
+# 업스트림별 비동기 클라이언트 (app.py의 커넥션 풀 설정을 그대로 사용)
+UPSTREAM_LIMITS = httpx.Limits(
+    max_connections=UPSTREAM_POOL_SIZE,
+    max_keepalive_connections=UPSTREAM_POOL_SIZE,
+)
+UPSTREAM_TIMEOUT = httpx.Timeout(
+    UPSTREAM_READ_TIMEOUT,
+    connect=UPSTREAM_CONNECT_TIMEOUT,
+    pool=UPSTREAM_POOL_WAIT_TIMEOUT,
+)
+upstreams = {}
+
+# 업스트림 응답에서 클라이언트로 전달할 헤더
+FORWARDED_HEADERS = ('content-type', 'content-encoding', 'x-next-cursor')
+
+
+@asynccontextmanager
+async def lifespan(app):
+    for name, url in (
+        ("product-service", PRODUCT_SERVICE_URL),
+        *INVENTORY_SHARDS,
+        ("order-service", ORDER_SERVICE_URL),
+    ):
+        upstreams[name] = httpx.AsyncClient(
+            base_url=url, limits=UPSTREAM_LIMITS, timeout=UPSTREAM_TIMEOUT
+        )
+    yield
+    for client in upstreams.values():
+        await client.aclose()
+    upstreams.clear()
+
+
+async def health_check(request):
+    return JSONResponse({"status": "UP"})
+
+
+async def metrics(request):
+    """Prometheus 메트릭 (Mount는 METRICS_PATH/로 리다이렉트하므로 정확한 경로의 Route로 응답)"""
+    return Response(generate_latest(REGISTRY), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+# 프록시 함수
+async def proxy_request(service, path, request):
+    tracer = trace.get_tracer(__name__)
+    method = request.method
+    # 스팬은 응답 본문을 모두 전달한 뒤 stream_upstream에서 끝냄
+    span = tracer.start_span(f"proxy_{method.lower()}_{path}")
+    with trace.use_span(span, end_on_exit=False):
+        client = upstreams[service]
+        try:
+            logger.info("Proxying %s request to %s%s", method, client.base_url, path)
+
+            content = None
+            headers = {}
+            if method in ('POST', 'PUT'):
+                content = await request.body()
+                headers['Content-Type'] = request.headers.get('content-type', 'application/json')
+
+            upstream_request = client.build_request(
+                method, path,
+                params=request.query_params,
+                content=content,
+                headers=headers,
+            )
+            response = await client.send(upstream_request, stream=True)
+        except httpx.HTTPError as e:
+            logger.error("Proxy error: %s", e)
+            span.record_exception(e)
+            span.end()
+            return JSONResponse({"error": f"Service unavailable: {str(e)}"}, status_code=503)
+        except BaseException:
+            span.end()
+            raise
+
+    response_headers = {
+        name: response.headers[name] for name in FORWARDED_HEADERS if name in response.headers
+    }
+    response_headers.setdefault('content-type', 'application/json')
+    return StreamingResponse(
+        stream_upstream(response, span),
+        status_code=response.status_code,
+        headers=response_headers,
+    )
+
+
+async def stream_upstream(response, span):
+    """업스트림 응답 본문을 그대로 전달하고, 끝나거나 중단되면 연결을 닫고 프록시 스팬을 끝냄"""
+    try:
+        async for chunk in response.aiter_raw():
+            yield chunk
+    except httpx.HTTPError as e:
+        logger.error("Proxy stream error: %s", e)
+        span.record_exception(e)
+    finally:
+        await response.aclose()
+        span.end()
+
+
+# 제품 서비스 라우트
+async def handle_products(request):
+    return await proxy_request("product-service", '/products', request)
+
+
+async def handle_product(request):
+    product_id = request.path_params['product_id']
+    return await proxy_request("product-service", f'/products/{product_id}', request)
+
+
+async def handle_products_lookup(request):
+    return await proxy_request("product-service", '/products/lookup', request)
+
+
+# 제품 캐시 무효화 (product-service가 제품 수정 시 호출)
+# ASGI 모드에는 제품 응답 캐시가 없으므로 PRODUCT_CACHE_INVALIDATE_URLS가 이 게이트웨이를 가리켜도 성공으로 응답
+async def invalidate_product_cache(request):
+    return Response(status_code=204)
+
+
+async def shard_call(name, method, path, **kwargs):
+    """샤드를 호출하고 JSON 본문 반환 (httpx.HTTPError 전파)"""
+    logger.info("Calling shard %s: %s %s", name, method, path)
+    response = await upstreams[name].request(method, path, **kwargs)
+    response.raise_for_status()
+    return response.json()
+
+
+def shard_error_response(e):
+    logger.error("Shard error: %s", e)
+    return JSONResponse({"error": f"Service unavailable: {str(e)}"}, status_code=503)
+
+
+async def requested_ids(request):
+    """?ids=a,b,c 또는 POST 본문 {"ids": [...]}의 ID 목록 (common/listing.py의 requested_ids와 같은 규칙)"""
+    if request.method == "POST":
+        try:
+            data = await request.json()
+        except ValueError:
+            return None
+        ids = data.get("ids") if isinstance(data, dict) else None
+        if not isinstance(ids, list) or not all(isinstance(key, str) for key in ids):
+            return None
+    else:
+        ids = request.query_params.get("ids", "").split(",")
+    ids = list(dict.fromkeys(key for key in ids if key))
+    if not ids or len(ids) > LIST_MAX_LIMIT:
+        return None
+    return ids
+
+
+async def sharded_inventory_lookup(request):
+    """여러 제품 재고를 소유 샤드별로 동시에 조회해 요청 순서대로 합침"""
+    product_ids = await requested_ids(request)
+    if product_ids is None:
+        return JSONResponse({"error": f"Between 1 and {LIST_MAX_LIMIT} ids are required"}, status_code=400)
+    groups = inventory_ring.group(product_ids)
+    try:
+        pages = await asyncio.gather(*(
+            shard_call(name, 'POST', '/inventory/lookup', json={"ids": ids}) for name, ids in groups.items()
+        ))
+    except httpx.HTTPError as e:
+        return shard_error_response(e)
+    return JSONResponse(merge_lookups(product_ids, pages, "productId"))
+
+
+async def sharded_inventory_list(request):
+    """모든 샤드의 재고 목록을 샤드 순서대로 이어서 조회 (app.py의 sharded_inventory_list와 같은 형식)"""
+    args = request.query_params
+    ndjson = args.get("format") == "ndjson"
+    names = list(inventory_ring.names)
+    if not ndjson and "limit" not in args and "cursor" not in args:
+        try:
+            pages = await asyncio.gather(*(shard_call(name, 'GET', '/inventory') for name in names))
+        except httpx.HTTPError as e:
+            return shard_error_response(e)
+        merged = {}
+        for page in pages:
+            merged.update(page)
+        return JSONResponse(merged)
+
+    try:
+        position, after = parse_shard_cursor(args.get("cursor"), names)
+        limit = int(args["limit"]) if "limit" in args else (None if ndjson else LIST_DEFAULT_LIMIT)
+    except ValueError:
+        return JSONResponse({"error": "Invalid cursor or limit"}, status_code=400)
+    if limit is not None and limit <= 0:
+        return JSONResponse({"error": "Invalid cursor or limit"}, status_code=400)
+    if limit is None:
+        return StreamingResponse(stream_inventory_shards(names[position:], after), media_type=NDJSON_MIMETYPE)
+    if not ndjson:
+        limit = min(limit, LIST_MAX_LIMIT)
+
+    items = []
+    next_cursor = None
+    try:
+        for name in names[position:]:
+            page = await shard_call(
+                name, 'GET', '/inventory', params={"cursor": after, "limit": limit - len(items)}
+            )
+            items.extend(page["items"])
+            if page["nextCursor"]:
+                next_cursor = shard_cursor(name, page["nextCursor"])
+                break
+            after = 0
+    except httpx.HTTPError as e:
+        return shard_error_response(e)
+
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    if ndjson:
+        body = "".join(json.dumps(item) + "\n" for item in items)
+        return Response(body, media_type=NDJSON_MIMETYPE, headers=headers)
+    return JSONResponse({"items": items, "nextCursor": next_cursor}, headers=headers)
+
+
+async def stream_inventory_shards(names, after):
+    """샤드별 NDJSON 응답을 차례로 이어서 전달 (중간에 실패하면 거기서 응답을 끝냄)"""
+    for name in names:
+        try:
+            async with upstreams[name].stream(
+                'GET', '/inventory', params={"format": "ndjson", "cursor": after}
+            ) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_raw():
+                    yield chunk
+        except httpx.HTTPError as e:
+            logger.error("Stopped streaming inventory at shard %s: %s", name, e)
+            return
+        after = 0
+
+
+# 인벤토리 서비스 라우트 (제품별 요청은 제품을 소유한 샤드로, 목록/일괄 조회는 모든 샤드의 결과를 합침)
+async def handle_inventory(request):
+    if SHARDED:
+        if "ids" in request.query_params:
+            return await sharded_inventory_lookup(request)
+        return await sharded_inventory_list(request)
+    return await proxy_request(inventory_ring.names[0], '/inventory', request)
+
+
+async def handle_product_inventory(request):
+    product_id = request.path_params['product_id']
+    return await proxy_request(inventory_ring.owner(product_id), f'/inventory/{product_id}', request)
+
+
+async def handle_inventory_lookup(request):
+    if SHARDED:
+        return await sharded_inventory_lookup(request)
+    return await proxy_request(inventory_ring.names[0], '/inventory/lookup', request)
+
+
+# 주문 서비스 라우트
+async def handle_orders(request):
+    return await proxy_request("order-service", '/orders', request)
+
+
+async def handle_orders_batch(request):
+    return await proxy_request("order-service", '/orders/batch', request)
+
+
+async def handle_order_stats(request):
+    return await proxy_request("order-service", '/orders/stats', request)
+
+
+async def handle_order(request):
+    order_id = request.path_params['order_id']
+    return await proxy_request("order-service", f'/orders/{order_id}', request)
+
+
+routes = [
+    Route('/health', health_check, methods=['GET']),
+    Route('/api/products', handle_products, methods=['GET', 'POST']),
+    Route('/api/products/lookup', handle_products_lookup, methods=['POST']),
+    Route('/api/products/{product_id}', handle_product, methods=['GET', 'PUT']),
+    Route('/cache/products/{product_id}', invalidate_product_cache, methods=['DELETE']),
+    Route('/cache/products', invalidate_product_cache, methods=['DELETE']),
+    Route('/api/inventory', handle_inventory, methods=['GET']),
+    Route('/api/inventory/lookup', handle_inventory_lookup, methods=['POST']),
+    Route('/api/inventory/{product_id}', handle_product_inventory, methods=['GET', 'PUT']),
+    Route('/api/orders', handle_orders, methods=['GET', 'POST']),
+    Route('/api/orders/batch', handle_orders_batch, methods=['POST']),
+    Route('/api/orders/stats', handle_order_stats, methods=['GET']),
+    Route('/api/orders/{order_id}', handle_order, methods=['GET']),
+    Route(METRICS_PATH, metrics, methods=['GET']),
+]
+
+starlette_app = Starlette(routes=routes, lifespan=lifespan)
+starlette_app.add_middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+
+# ASGI 계측 (들어오는 요청의 트레이스 컨텍스트 추출)
+if instrumentation_enabled("asgi"):
+    from opentelemetry.instrumentation.asgi import OpenTelemetryMiddleware
+    app = OpenTelemetryMiddleware(starlette_app)
+else:
+    app = starlette_app
+
+startup.done()
@@ -1,78 +1,275 @@
 from flask import Flask, jsonify, request
 import os
 import uuid
-from prometheus_flask_exporter import PrometheusMetrics
+import requests
 from opentelemetry import trace
-from opentelemetry.instrumentation.flask import FlaskInstrumentor
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.jaeger.thrift import JaegerExporter
-from opentelemetry.sdk.resources import SERVICE_NAME, Resource
 import logging
+from common.bootstrap import bootstrap
+from common.listing import list_response, lookup_response, requested_ids
+from common.logs import setup_logging
+from common.sharding import HashRing, parse_shards
+from common.storage import open_store
+from common.upstream import UpstreamPools
 
-# 로깅 설정
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.StreamHandler()
-    ]
-)
+# 로깅 설정 (JSON 한 줄 형식, 백그라운드 스레드에서 출력)
+setup_logging("inventory-service")
 logger = logging.getLogger(__name__)
 
 # Flask 앱 생성
 app = Flask(__name__)
 
-# Prometheus 메트릭 설정
-metrics = PrometheusMetrics(app)
-metrics.info('app_info', 'Inventory Service', version='1.0.0')
-
-# OpenTelemetry 설정
-resource = Resource(attributes={
-    SERVICE_NAME: "inventory-service"
-})
+# Prometheus 메트릭, OpenTelemetry 트레이스, Flask 계측 설정 (common/bootstrap.py)
+startup = bootstrap(app, "inventory-service")
 
-trace.set_tracer_provider(TracerProvider(resource=resource))
-jaeger_exporter = JaegerExporter(
-    agent_host_name=os.getenv("JAEGER_HOST", "jaeger"),
-    agent_port=int(os.getenv("JAEGER_PORT", "6831")),
-)
-trace.get_tracer_provider().add_span_processor(
-    BatchSpanProcessor(jaeger_exporter)
-)
+# 샤드 구성 (게이트웨이/order-service와 같은 INVENTORY_SHARDS 목록, 이 인스턴스의 샤드 이름)
+# 설정하지 않으면 샤드 하나가 전체 재고를 가짐
+INVENTORY_SHARDS = parse_shards(os.getenv("INVENTORY_SHARDS", ""))
+INVENTORY_SHARD_NAME = os.getenv("INVENTORY_SHARD_NAME", "")
+# 재배치 시 한 번에 옮길 최대 제품 수
+INVENTORY_REBALANCE_BATCH_SIZE = int(os.getenv("INVENTORY_REBALANCE_BATCH_SIZE", "500"))
+if INVENTORY_SHARDS and INVENTORY_SHARD_NAME not in dict(INVENTORY_SHARDS):
+    raise ValueError(f"INVENTORY_SHARD_NAME must be one of the INVENTORY_SHARDS names: {INVENTORY_SHARD_NAME!r}")
 
-# Flask 계측
-FlaskInstrumentor().instrument_app(app)
+def owned(product_id, ring):
+    return ring is None or ring.owner(product_id) == INVENTORY_SHARD_NAME
 
-# 인벤토리 데이터 (데모용 인메모리 저장소)
-inventory = {
+shard_ring = HashRing([name for name, _ in INVENTORY_SHARDS]) if INVENTORY_SHARDS else None
+INITIAL_INVENTORY = {
     "product1": 100,
     "product2": 50,
     "product3": 75
 }
 
+# 인벤토리 데이터 (STORAGE_BACKEND로 저장소 선택, 재고 변경은 저장소에서 원자적으로 수행)
+# 샤드 구성에서는 이 샤드가 소유한 제품만 초기 데이터로 넣음
+inventory = open_store("inventory", seed={
+    product_id: quantity for product_id, quantity in INITIAL_INVENTORY.items() if owned(product_id, shard_ring)
+})
+
+# 멱등 예약 기록 (키: 예약 ID, 값: {"state": "pending"} 또는 {"state": "done", "result": 항목 결과})
+# 예약 ID를 붙인 항목은 처음 한 번만 재고를 차감하고, 같은 ID로 다시 요청하면 기록된 결과를 그대로 반환
+reservations = open_store("inventory_reservations")
+
+# 이 샤드가 받은 재배치 재고 기록 (키: importId), 같은 importId로 다시 보내면 재고를 다시 더하지 않음
+imports = open_store("inventory_imports")
+# 다른 샤드로 보냈지만 적용 여부를 확인하지 못한 재배치 재고 (키: importId, 값: {"target": 샤드 이름, "items": [[제품 ID, 수량]]})
+# 다음 재배치 때 같은 importId로 다시 보냄
+pending_imports = open_store("inventory_pending_imports")
+
+# 재배치 대상 샤드 호출용 커넥션 풀
+upstreams = UpstreamPools()
+
+def shard_client(name, url):
+    """재배치 대상 샤드의 클라이언트 (처음 사용할 때 또는 URL이 바뀌면 생성)"""
+    try:
+        client = upstreams.get(name)
+    except KeyError:
+        client = None
+    if client is None or client.base_url != url:
+        client = upstreams.add(name, url)
+    return client
+
+def request_object():
+    """요청 본문의 JSON 객체 (JSON이 아니거나 객체가 아니면 None)"""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
+def valid_quantity(quantity, min_quantity):
+    # bool은 int의 하위 타입이므로 따로 제외
+    return isinstance(quantity, int) and not isinstance(quantity, bool) and quantity >= min_quantity
+
+def parse_reservation_items(items, min_quantity=1):
+    """예약 요청 항목 검증 후 (productId, quantity) 목록 반환, 잘못된 경우 None"""
+    if not isinstance(items, list) or not items:
+        return None
+    parsed = []
+    for item in items:
+        if not isinstance(item, dict) or not all(key in item for key in ("productId", "quantity")):
+            return None
+        if not isinstance(item["productId"], str) or not valid_quantity(item["quantity"], min_quantity):
+            return None
+        parsed.append((item["productId"], item["quantity"]))
+    return parsed
+
+def parse_reservation_ids(items):
+    """예약 항목의 선택적 reservationId 목록 (없는 항목은 None), 잘못되었거나 중복이면 None
+
+    items는 parse_reservation_items로 검증한 원래 요청 항목입니다.
+    """
+    ids = [item.get("reservationId") for item in items]
+    keyed = [reservation_id for reservation_id in ids if reservation_id is not None]
+    if not all(isinstance(reservation_id, str) and reservation_id for reservation_id in keyed):
+        return None
+    if len(set(keyed)) != len(keyed):
+        return None
+    return ids
+
+class ReservationInProgress(Exception):
+    """같은 예약 ID의 요청이 아직 처리 중인 경우 (호출자는 잠시 뒤 다시 요청)"""
+
+def claim_reservations(reservation_ids):
+    """예약 ID를 처리 중으로 표시하고 이미 처리된 ID의 결과 반환 (처리 중인 ID가 있으면 ReservationInProgress)"""
+    def claim(current):
+        if any(record is not None and record["state"] == "pending" for record in current.values()):
+            return {}, None
+        done = {reservation_id: record["result"] for reservation_id, record in current.items() if record is not None}
+        pending = {reservation_id: {"state": "pending"} for reservation_id, record in current.items() if record is None}
+        return pending, done
+    
+    done = reservations.update(reservation_ids, claim)
+    if done is None:
+        raise ReservationInProgress()
+    return done
+
+def reserve_once(items, reservation_ids, partial):
+    """예약 ID가 있는 항목은 처음 요청에서만 재고를 차감하고, 다시 온 요청에는 기록된 결과를 반환
+
+    반환값: (예약 여부, items 순서의 항목별 결과)
+    """
+    keyed = [reservation_id for reservation_id in reservation_ids if reservation_id is not None]
+    replayed = claim_reservations(keyed) if keyed else {}
+    fresh = [index for index, reservation_id in enumerate(reservation_ids) if reservation_id not in replayed]
+    fresh_items = [items[index] for index in fresh]
+    results = [replayed.get(reservation_id) for reservation_id in reservation_ids]
+    if fresh_items:
+        try:
+            _, fresh_results = inventory.update(
+                [product_id for product_id, _ in fresh_items],
+                lambda current: reserve_items(current, fresh_items, partial)
+            )
+        except Exception:
+            reservations.delete_many([reservation_ids[index] for index in fresh if reservation_ids[index] is not None])
+            raise
+        for index, result in zip(fresh, fresh_results):
+            results[index] = result
+        reservations.put_many(
+            (reservation_ids[index], {"state": "done", "result": results[index]})
+            for index in fresh if reservation_ids[index] is not None
+        )
+    
+    reserved = (any if partial else all)(result["reserved"] for result in results)
+    return reserved, results
+
+def in_progress_response():
+    response = jsonify({"error": "Reservation in progress"})
+    response.status_code = 503
+    response.headers["Retry-After"] = "1"
+    return response
+
+def reservation_result(product_id, requested, reserved, current_stock, reason=None):
+    result = {
+        "productId": product_id,
+        "requested": requested,
+        "reserved": reserved,
+        "currentStock": current_stock or 0
+    }
+    if reason:
+        result["reason"] = reason
+    return result
+
+def reserve_items(current, items, partial):
+    """현재 재고(current)에서 items를 예약 (저장소 update 안에서 원자적으로 호출)
+
+    반환값: (변경할 재고, (예약 여부, 항목별 결과))
+    """
+    stock = dict(current)
+    if partial:
+        results = []
+        for product_id, quantity in items:
+            if stock[product_id] is None:
+                results.append(reservation_result(product_id, quantity, False, None, "Product not found"))
+            elif stock[product_id] >= quantity:
+                stock[product_id] -= quantity
+                results.append(reservation_result(product_id, quantity, True, stock[product_id]))
+            else:
+                results.append(reservation_result(product_id, quantity, False, stock[product_id], "Insufficient inventory"))
+        reserved = any(result["reserved"] for result in results)
+    else:
+        # 같은 제품이 여러 번 나오면 합산해서 확인
+        totals = {}
+        for product_id, quantity in items:
+            totals[product_id] = totals.get(product_id, 0) + quantity
+        reserved = all(
+            stock[product_id] is not None and stock[product_id] >= quantity
+            for product_id, quantity in totals.items()
+        )
+        if reserved:
+            for product_id, quantity in totals.items():
+                stock[product_id] -= quantity
+        results = []
+        for product_id, quantity in items:
+            reason = None
+            if not reserved:
+                if stock[product_id] is None:
+                    reason = "Product not found"
+                elif stock[product_id] < totals[product_id]:
+                    reason = "Insufficient inventory"
+                else:
+                    reason = "Batch not reserved"
+            results.append(reservation_result(product_id, quantity, reserved, stock[product_id], reason))
+
+    changes = {
+        product_id: quantity for product_id, quantity in stock.items()
+        if quantity != current[product_id]
+    }
+    return changes, (reserved, results)
+
+def release_items(current, items):
+    """예약한 재고를 되돌림 (저장소 update 안에서 원자적으로 호출)"""
+    stock = {product_id: quantity or 0 for product_id, quantity in current.items()}
+    for product_id, quantity in items:
+        stock[product_id] += quantity
+    results = [
+        {"productId": product_id, "released": quantity, "currentStock": stock[product_id]}
+        for product_id, quantity in items
+    ]
+    return stock, results
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "UP"})
 
 @app.route('/inventory', methods=['GET'])
 def get_inventory():
+    if "ids" in request.args:
+        return get_inventory_by_ids()
     tracer = trace.get_tracer(__name__)
     with tracer.start_as_current_span("get_all_inventory"):
         logger.info("Fetching all inventory")
-        return jsonify(inventory)
+        return list_response(
+            inventory.items(),
+            lambda item: {"productId": item[0], "quantity": item[1]},
+            legacy=lambda: dict(inventory.items())
+        )
+
+@app.route('/inventory/lookup', methods=['POST'])
+def get_inventory_by_ids():
+    """여러 제품 재고 일괄 조회 (GET /inventory?ids=a,b,c 또는 POST /inventory/lookup), 없는 ID는 missing으로 반환"""
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("get_inventory_by_ids") as span:
+        product_ids = requested_ids()
+        if product_ids is None:
+            logger.error("Invalid product ids")
+        else:
+            span.set_attribute("product.requested", len(product_ids))
+            logger.info("Fetching inventory for %s products", len(product_ids))
+        return lookup_response(
+            inventory, product_ids,
+            lambda product_id, quantity: {"productId": product_id, "quantity": quantity}
+        )
 
 @app.route('/inventory/<product_id>', methods=['GET'])
 def get_product_inventory(product_id):
     tracer = trace.get_tracer(__name__)
     with tracer.start_as_current_span("get_product_inventory") as span:
         span.set_attribute("product.id", product_id)
-        logger.info(f"Fetching inventory for product: {product_id}")
+        logger.info("Fetching inventory for product: %s", product_id)
         
-        if product_id in inventory:
-            return jsonify({"productId": product_id, "quantity": inventory[product_id]})
+        quantity = inventory.get(product_id)
+        if quantity is not None:
+            return jsonify({"productId": product_id, "quantity": quantity})
         else:
-            logger.error(f"Inventory not found for product: {product_id}")
+            logger.error("Inventory not found for product: %s", product_id)
             return jsonify({"error": "Product not found in inventory"}), 404
 
 @app.route('/inventory/<product_id>', methods=['PUT'])
@@ -81,40 +278,269 @@ def update_inventory(product_id):
     with tracer.start_as_current_span("update_inventory") as span:
         span.set_attribute("product.id", product_id)
         
-        data = request.json
-        if not data or "quantity" not in data:
+        data = request_object()
+        if data is None or not valid_quantity(data.get("quantity"), 0):
             logger.error("Invalid inventory update data")
             return jsonify({"error": "Invalid data, quantity required"}), 400
         
-        inventory[product_id] = data["quantity"]
-        logger.info(f"Updated inventory for product {product_id}: {data['quantity']}")
-        return jsonify({"productId": product_id, "quantity": inventory[product_id]})
+        inventory.put(product_id, data["quantity"])
+        logger.info("Updated inventory for product %s: %s", product_id, data['quantity'])
+        return jsonify({"productId": product_id, "quantity": data["quantity"]})
 
 @app.route('/inventory/check', methods=['POST'])
 def check_inventory():
     tracer = trace.get_tracer(__name__)
     with tracer.start_as_current_span("check_inventory"):
-        data = request.json
-        if not data or not all(key in data for key in ("productId", "quantity")):
+        items = parse_reservation_items([request_object()])
+        if not items:
             logger.error("Invalid inventory check data")
             return jsonify({"error": "Invalid data"}), 400
         
-        product_id = data["productId"]
-        requested_quantity = data["quantity"]
+        product_id, requested_quantity = items[0]
         
-        if product_id not in inventory:
-            logger.error(f"Product not found in inventory: {product_id}")
+        current_stock = inventory.get(product_id)
+        if current_stock is None:
+            logger.error("Product not found in inventory: %s", product_id)
             return jsonify({"available": False, "reason": "Product not found"}), 404
         
-        available = inventory[product_id] >= requested_quantity
-        logger.info(f"Inventory check for {product_id}: requested={requested_quantity}, available={available}")
+        available = current_stock >= requested_quantity
+        logger.info("Inventory check for %s: requested=%s, available=%s", product_id, requested_quantity, available)
         
         return jsonify({
             "productId": product_id,
             "requested": requested_quantity,
             "available": available,
-            "currentStock": inventory[product_id]
+            "currentStock": current_stock
         })
 
+@app.route('/inventory/reserve', methods=['POST'])
+def reserve_inventory():
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("reserve_inventory") as span:
+        data = request_object()
+        items = parse_reservation_items([data])
+        reservation_ids = parse_reservation_ids([data]) if items else None
+        if not items or reservation_ids is None:
+            logger.error("Invalid inventory reservation data")
+            return jsonify({"error": "Invalid data"}), 400
+        
+        product_id, quantity = items[0]
+        span.set_attribute("product.id", product_id)
+        span.set_attribute("reservation.quantity", quantity)
+        
+        # 재고 확인과 차감을 저장소에서 원자적으로 수행 (reservationId가 있으면 한 번만)
+        try:
+            reserved, results = reserve_once(items, reservation_ids, partial=False)
+        except ReservationInProgress:
+            return in_progress_response()
+        result = results[0]
+        
+        logger.info("Inventory reservation for %s: requested=%s, reserved=%s", product_id, quantity, reserved)
+        if result.get("reason") == "Product not found":
+            logger.error("Product not found in inventory: %s", product_id)
+            return jsonify(result), 404
+        if not reserved:
+            return jsonify(result), 409
+        return jsonify(result)
+
+@app.route('/inventory/reserve/batch', methods=['POST'])
+def reserve_inventory_batch():
+    """여러 제품 재고 일괄 예약
+
+    기본적으로 전부 예약하거나 전혀 예약하지 않으며(all-or-nothing),
+    "partial": true 이면 가능한 항목만 예약하고 항목별 결과를 반환합니다.
+    """
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("reserve_inventory_batch") as span:
+        data = request_object()
+        items = parse_reservation_items(data.get("items")) if data is not None else None
+        reservation_ids = parse_reservation_ids(data["items"]) if items else None
+        partial = data.get("partial", False) if data is not None else False
+        if not items or reservation_ids is None or not isinstance(partial, bool):
+            logger.error("Invalid inventory batch reservation data")
+            return jsonify({"error": "Invalid data"}), 400
+        
+        span.set_attribute("reservation.items", len(items))
+        span.set_attribute("reservation.partial", partial)
+        
+        try:
+            reserved, results = reserve_once(items, reservation_ids, partial)
+        except ReservationInProgress:
+            return in_progress_response()
+        
+        logger.info("Batch inventory reservation: items=%s, partial=%s, reserved=%s", len(items), partial, reserved)
+        status = 200 if reserved else 409
+        return jsonify({"reserved": reserved, "items": results}), status
+
+@app.route('/inventory/release', methods=['POST'])
+def release_inventory():
+    """예약 취소 (보상 트랜잭션용 재고 복원)"""
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("release_inventory") as span:
+        data = request_object()
+        raw_items = data["items"] if data is not None and "items" in data else [data]
+        items = parse_reservation_items(raw_items)
+        reservation_ids = parse_reservation_ids(raw_items) if items else None
+        if not items or reservation_ids is None:
+            logger.error("Invalid inventory release data")
+            return jsonify({"error": "Invalid data"}), 400
+        
+        span.set_attribute("reservation.items", len(items))
+        # 예약 기록을 먼저 지워 같은 예약 ID로 다시 요청하면 새로 예약되도록 함
+        # (복원 전에 중단되면 재고가 덜 남을 뿐 중복 판매는 생기지 않음)
+        released_ids = [reservation_id for reservation_id in reservation_ids if reservation_id is not None]
+        if released_ids:
+            reservations.delete_many(released_ids)
+        product_ids = [product_id for product_id, _ in items]
+        results = inventory.update(product_ids, lambda current: release_items(current, items))
+        
+        logger.info("Released inventory reservation: items=%s", len(items))
+        return jsonify({"items": results})
+
+def take_items(current):
+    """재배치할 재고를 저장소에서 꺼냄 (저장소 update 안에서 원자적으로 호출, 없는 제품은 제외)"""
+    taken = {product_id: quantity for product_id, quantity in current.items() if quantity is not None}
+    return {product_id: None for product_id in taken}, taken
+
+@app.route('/inventory/import', methods=['POST'])
+def import_inventory():
+    """다른 샤드에서 옮겨 온 재고를 현재 재고에 더함 (재배치 중 이 샤드에서 복원된 예약도 보존)
+
+    importId를 주면 한 번만 적용하고, 이미 적용한 importId는 재고를 바꾸지 않고 "duplicate": true로 응답합니다.
+    """
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("import_inventory") as span:
+        data = request_object()
+        items = parse_reservation_items(data.get("items") if data is not None else None, min_quantity=0)
+        import_id = data.get("importId") if data is not None else None
+        if not items or (import_id is not None and (not isinstance(import_id, str) or not import_id)):
+            logger.error("Invalid inventory import data")
+            return jsonify({"error": "Invalid data"}), 400
+        
+        span.set_attribute("inventory.items", len(items))
+        if import_id is not None:
+            previous = imports.update(
+                [import_id],
+                lambda current: ({} if current[import_id] else {import_id: {"state": "pending"}}, current[import_id])
+            )
+            if previous is not None:
+                if previous["state"] == "pending":
+                    return in_progress_response()
+                logger.info("Skipped already applied inventory import: %s", import_id)
+                return jsonify({"importId": import_id, "duplicate": True, "items": []})
+        
+        product_ids = [product_id for product_id, _ in items]
+        try:
+            results = inventory.update(product_ids, lambda current: release_items(current, items))
+        except Exception:
+            if import_id is not None:
+                imports.delete_many([import_id])
+            raise
+        if import_id is not None:
+            imports.put(import_id, {"state": "done", "items": len(items)})
+        
+        logger.info("Imported inventory: items=%s", len(items))
+        return jsonify({"importId": import_id, "duplicate": False, "items": results})
+
+def send_import(client, import_id, items):
+    """재고를 대상 샤드로 보냄 (같은 importId로 다시 보내도 대상 샤드는 한 번만 적용)"""
+    client.post(
+        "/inventory/import",
+        json={
+            "importId": import_id,
+            "items": [{"productId": product_id, "quantity": quantity} for product_id, quantity in items]
+        }
+    ).raise_for_status()
+
+def rejected_by_target(e):
+    """대상 샤드가 요청을 검증 단계에서 거절해 재고를 적용하지 않았음이 확실한 경우 (4xx 응답)"""
+    response = getattr(e, "response", None)
+    return isinstance(e, requests.exceptions.HTTPError) and response is not None and 400 <= response.status_code < 500
+
+def retry_pending_imports(urls, moved):
+    """이전 재배치에서 적용 여부를 확인하지 못한 재고를 같은 importId로 다시 보냄"""
+    for import_id, pending in list(pending_imports.items()):
+        target = pending["target"]
+        items = [tuple(item) for item in pending["items"]]
+        if target not in urls:
+            continue
+        try:
+            send_import(shard_client(target, urls[target]), import_id, items)
+        except requests.exceptions.RequestException as e:
+            if not rejected_by_target(e):
+                logger.error("Inventory import %s to shard %s still unconfirmed: %s", import_id, target, e)
+                continue
+            # 대상 샤드가 적용하지 않았음을 확인했으므로 이 샤드로 되돌림
+            inventory.update([product_id for product_id, _ in items], lambda current: release_items(current, items))
+        else:
+            moved[target] = moved.get(target, 0) + len(items)
+        pending_imports.delete_many([import_id])
+
+@app.route('/inventory/rebalance', methods=['POST'])
+def rebalance_inventory():
+    """이 샤드가 소유하지 않는 제품의 재고를 소유 샤드로 옮김
+
+    샤드를 추가하거나 제거한 뒤 게이트웨이/order-service의 INVENTORY_SHARDS를 바꾸고 각 샤드에서 호출합니다.
+    본문 {"shards": "이름=URL,..."}로 새 샤드 목록을 지정할 수 있으며(없으면 INVENTORY_SHARDS),
+    목록에 이 샤드가 없으면 모든 재고를 다른 샤드로 옮깁니다 (샤드 제거).
+    재고는 꺼낸 뒤 importId와 함께 대상 샤드에 더합니다. 대상 샤드가 요청을 거절(4xx)하면 다시 되돌리고,
+    응답을 받지 못한 경우처럼 적용 여부를 알 수 없으면 되돌리지 않고 pending_imports에 남겨
+    다음 재배치 때 같은 importId로 다시 보냅니다 (대상 샤드가 이미 적용했으면 중복 적용하지 않음).
+    """
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("rebalance_inventory") as span:
+        data = request.get_json(silent=True) or {}
+        try:
+            shards = parse_shards(data["shards"]) if "shards" in data else INVENTORY_SHARDS
+        except (AttributeError, ValueError) as e:
+            return jsonify({"error": f"Invalid shards: {e}"}), 400
+        if not shards:
+            return jsonify({"error": "No shards configured (INVENTORY_SHARDS)"}), 400
+        
+        ring = HashRing([name for name, _ in shards])
+        urls = dict(shards)
+        foreign = [product_id for product_id, _ in inventory.items() if not owned(product_id, ring)]
+        span.set_attribute("inventory.rebalance.candidates", len(foreign))
+        logger.info("Rebalancing %s products away from shard %s", len(foreign), INVENTORY_SHARD_NAME)
+        
+        moved = {}
+        failed = {}
+        retry_pending_imports(urls, moved)
+        for target, product_ids in ring.group(foreign).items():
+            client = shard_client(target, urls[target])
+            for start in range(0, len(product_ids), INVENTORY_REBALANCE_BATCH_SIZE):
+                batch = product_ids[start:start + INVENTORY_REBALANCE_BATCH_SIZE]
+                taken = inventory.update(batch, take_items)
+                if not taken:
+                    continue
+                items = list(taken.items())
+                import_id = f"{INVENTORY_SHARD_NAME}:{uuid.uuid4().hex}"
+                try:
+                    send_import(client, import_id, items)
+                except requests.exceptions.RequestException as e:
+                    logger.error("Failed to move %s products to shard %s: %s", len(items), target, e)
+                    if rejected_by_target(e):
+                        # 대상 샤드가 적용하지 않았으므로 이 샤드로 되돌림
+                        inventory.update(list(taken), lambda current: release_items(current, items))
+                    else:
+                        # 대상 샤드가 적용했을 수 있으므로 되돌리지 않고 다음 재배치 때 같은 importId로 다시 보냄
+                        pending_imports.put(import_id, {"target": target, "items": [list(item) for item in items]})
+                    failed[target] = str(e)
+                    break
+                moved[target] = moved.get(target, 0) + len(items)
+        
+        pending = len(pending_imports)
+        span.set_attribute("inventory.rebalance.moved", sum(moved.values()))
+        logger.info("Rebalanced shard %s: moved=%s, failed=%s", INVENTORY_SHARD_NAME, moved, list(failed))
+        return jsonify({
+            "shard": INVENTORY_SHARD_NAME,
+            "moved": moved,
+            "failed": failed,
+            "pending": pending,
+            "remaining": len(inventory)
+        }), 200 if not failed and not pending else 502
+
+startup.done()
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=int(os.getenv('PORT', 8082)))
\ No newline at end of file
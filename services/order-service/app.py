@@ -1,163 +1,754 @@
 from flask import Flask, jsonify, request
 import os
 import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import requests
-from prometheus_flask_exporter import PrometheusMetrics
-from opentelemetry import trace
-from opentelemetry.instrumentation.flask import FlaskInstrumentor
-from opentelemetry.instrumentation.requests import RequestsInstrumentor
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.jaeger.thrift import JaegerExporter
-from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from prometheus_client import Counter, Histogram
+from opentelemetry import context, trace
 import logging
+from common.bootstrap import bootstrap
+from common.cache import MISSING, Caches
+from common.listing import list_response
+from common.logs import setup_logging
+from common.outbox import Outbox, RetryLater
+from common.serving import run_after_fork
+from common.sharding import ShardedUpstream, parse_shards
+from common.storage import open_store
+from common.upstream import UpstreamPools
 
-# 로깅 설정
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.StreamHandler()
-    ]
-)
+# 로깅 설정 (JSON 한 줄 형식, 백그라운드 스레드에서 출력)
+setup_logging("order-service")
 logger = logging.getLogger(__name__)
 
 # Flask 앱 생성
 app = Flask(__name__)
 
-# Prometheus 메트릭 설정
-metrics = PrometheusMetrics(app)
-metrics.info('app_info', 'Order Service', version='1.0.0')
+# Prometheus 메트릭, OpenTelemetry 트레이스, Flask/Requests 계측 설정 (common/bootstrap.py)
+startup = bootstrap(app, "order-service", instrument_requests=True)
+
+# 서비스 URL 설정
+PRODUCT_SERVICE_URL = os.getenv("PRODUCT_SERVICE_URL", "http://product-service:8081")
+INVENTORY_SERVICE_URL = os.getenv("INVENTORY_SERVICE_URL", "http://inventory-service:8082")
+# 재고 샤드 목록 ("이름=URL,...", 제품 ID의 일관된 해시로 샤드 선택), 없으면 INVENTORY_SERVICE_URL 하나
+INVENTORY_SHARDS = parse_shards(os.getenv("INVENTORY_SHARDS", "")) or [("inventory-service", INVENTORY_SERVICE_URL)]
+
+# 업스트림별 커넥션 풀 (keep-alive 재사용, 연결/읽기 타임아웃 적용)
+upstreams = UpstreamPools()
+product_service = upstreams.add("product-service", PRODUCT_SERVICE_URL)
+inventory_shards = ShardedUpstream(upstreams, INVENTORY_SHARDS)
 
-# OpenTelemetry 설정
-resource = Resource(attributes={
-    SERVICE_NAME: "order-service"
-})
+# 제품 정보 캐시 (제품 레코드는 생성 후 거의 변경되지 않으므로 주문마다 재조회하지 않음)
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", "10000"))
+PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", "60"))
+caches = Caches()
+product_cache = caches.add("product", maxsize=PRODUCT_CACHE_SIZE, ttl=PRODUCT_CACHE_TTL)
 
-trace.set_tracer_provider(TracerProvider(resource=resource))
-jaeger_exporter = JaegerExporter(
-    agent_host_name=os.getenv("JAEGER_HOST", "jaeger"),
-    agent_port=int(os.getenv("JAEGER_PORT", "6831")),
+# 제품 조회와 재고 확인을 동시에 수행하기 위한 스레드 풀
+ORDER_UPSTREAM_WORKERS = int(os.getenv("ORDER_UPSTREAM_WORKERS", "16"))
+ORDER_UPSTREAM_DEADLINE = float(os.getenv("ORDER_UPSTREAM_DEADLINE", "6.0"))
+upstream_executor = ThreadPoolExecutor(
+    max_workers=ORDER_UPSTREAM_WORKERS, thread_name_prefix="order-upstream"
+)
+
+# 일괄 주문 요청 하나에 포함할 수 있는 최대 항목 수
+ORDER_BATCH_MAX_ITEMS = int(os.getenv("ORDER_BATCH_MAX_ITEMS", "100"))
+
+# 주문 처리 방식
+#   sync   재고 예약까지 마친 뒤 응답 (201, status=CREATED)
+#   async  주문과 재고 예약 이벤트를 기록하고 바로 응답 (202, status=PENDING),
+#          백그라운드 스레드가 예약을 배치로 처리하여 CREATED/REJECTED/FAILED로 갱신
+ORDER_PIPELINE = os.getenv("ORDER_PIPELINE", "sync")
+ORDER_OUTBOX_BATCH_SIZE = int(os.getenv("ORDER_OUTBOX_BATCH_SIZE", "50"))
+ORDER_OUTBOX_BATCH_WAIT = float(os.getenv("ORDER_OUTBOX_BATCH_WAIT", "0.01"))
+ORDER_OUTBOX_MAX_ATTEMPTS = int(os.getenv("ORDER_OUTBOX_MAX_ATTEMPTS", "5"))
+ORDER_OUTBOX_RETRY_BACKOFF = float(os.getenv("ORDER_OUTBOX_RETRY_BACKOFF", "0.2"))
+ORDER_OUTBOX_LEASE = float(os.getenv("ORDER_OUTBOX_LEASE", "60"))
+
+# 주문 레코드 (딕셔너리보다 메모리를 적게 쓰는 튜플 기반 레코드)
+# createdAt이 없던 이전 레코드도 읽을 수 있도록 기본값 None
+Order = namedtuple("Order", [
+    "id", "productId", "productName", "quantity", "unitPrice", "totalPrice", "status", "createdAt"
+], defaults=(None,))
+
+# 주문 비즈니스 메트릭 (mode: single=POST /orders, batch=POST /orders/batch, async=ORDER_PIPELINE=async)
+ORDERS_CREATED = Counter(
+    'orders_created_total', 'Orders created', ['mode']
+)
+ORDER_TOTAL_PRICE = Histogram(
+    'order_total_price', 'Total price of created orders', ['mode'],
+    buckets=(5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
 )
-trace.get_tracer_provider().add_span_processor(
-    BatchSpanProcessor(jaeger_exporter)
+ORDER_QUANTITY = Histogram(
+    'order_quantity', 'Quantity per created order', ['mode'],
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100)
+)
+ORDER_BATCH_SIZE = Histogram(
+    'order_batch_items', 'Items per batch order request',
+    buckets=(1, 2, 5, 10, 25, 50, 100)
 )
 
-# Flask와 Requests 계측
-FlaskInstrumentor().instrument_app(app)
-RequestsInstrumentor().instrument()
+def record_order_metrics(order, mode):
+    ORDERS_CREATED.labels(mode=mode).inc()
+    ORDER_TOTAL_PRICE.labels(mode=mode).observe(order.totalPrice)
+    ORDER_QUANTITY.labels(mode=mode).observe(order.quantity)
 
-# 서비스 URL 설정
-PRODUCT_SERVICE_URL = os.getenv("PRODUCT_SERVICE_URL", "http://product-service:8081")
-INVENTORY_SERVICE_URL = os.getenv("INVENTORY_SERVICE_URL", "http://inventory-service:8082")
+# 주문 데이터 (id로 색인되며 삽입 순서 유지, STORAGE_BACKEND로 저장소 선택)
+# 제품/상태별 조회와 생성 시각 범위 조회를 위한 보조 색인 유지
+orders = open_store(
+    "orders", record_type=Order, indexes=("productId", "status"), range_indexes=("createdAt",)
+)
+
+# 제품별·상태별 주문 집계 (키: "product:<productId>", 값: {상태: [주문 수, 수량, 금액 합계]})
+# 주문을 저장할 때마다 변경분만 반영하므로 /orders/stats는 주문 수와 관계없이 제품 수에 비례
+order_stats = open_store("order_stats")
+STATS_PRODUCT_PREFIX = "product:"
+STATS_BACKFILL_KEY = "meta:backfilled"
 
-# 주문 데이터 (데모용 인메모리 저장소)
-orders = []
+def now_iso():
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+def apply_stats_deltas(deltas):
+    """[(주문, +1 또는 -1)]을 제품별·상태별 집계에 원자적으로 반영"""
+    by_key = {}
+    for order, sign in deltas:
+        totals = by_key.setdefault(f"{STATS_PRODUCT_PREFIX}{order.productId}", {})
+        entry = totals.setdefault(order.status, [0, 0, 0.0])
+        entry[0] += sign
+        entry[1] += sign * order.quantity
+        entry[2] += sign * order.totalPrice
+    
+    def apply(current):
+        changes = {}
+        for key, totals in by_key.items():
+            stats = {status: list(values) for status, values in (current[key] or {}).items()}
+            for status, (count, quantity, revenue) in totals.items():
+                entry = stats.setdefault(status, [0, 0, 0.0])
+                entry[0] += count
+                entry[1] += quantity
+                entry[2] += revenue
+            changes[key] = stats
+        return changes, None
+    
+    order_stats.update(list(by_key), apply)
+
+def save_orders(records, only_new=False):
+    """주문을 저장하고 이전 상태와의 차이만큼 집계 갱신 (only_new이면 아직 없는 주문만 저장)"""
+    def apply(current):
+        changes = {}
+        deltas = []
+        for order in records:
+            previous = current[order.id]
+            if only_new and previous is not None:
+                continue
+            changes[order.id] = order
+            if previous is not None:
+                deltas.append((previous, -1))
+            deltas.append((order, 1))
+        return changes, deltas
+    
+    deltas = orders.update([order.id for order in records], apply)
+    if deltas:
+        apply_stats_deltas(deltas)
+
+def backfill_order_stats():
+    """집계가 없던 때 저장된 주문으로 집계를 한 번만 계산 (여러 워커가 시작해도 한 번만 실행)"""
+    def apply(current):
+        if current[STATS_BACKFILL_KEY] is not None:
+            return {}, 0
+        stats = {}
+        count = 0
+        for order in orders.values():
+            entry = stats.setdefault(f"{STATS_PRODUCT_PREFIX}{order.productId}", {}).setdefault(order.status, [0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += order.quantity
+            entry[2] += order.totalPrice
+            count += 1
+        stats[STATS_BACKFILL_KEY] = {"backfilledAt": now_iso(), "orders": count}
+        return stats, count
+    
+    count = order_stats.update([STATS_BACKFILL_KEY], apply)
+    if count:
+        logger.info("Backfilled order stats from %s existing orders", count)
+
+backfill_order_stats()
 
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "UP"})
 
+def parse_time(value):
+    """ISO 8601 시각을 저장 형식(UTC, 밀리초)으로 변환 (시간대가 없으면 UTC로 간주)"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat(timespec="milliseconds")
+
 @app.route('/orders', methods=['GET'])
 def get_orders():
+    """주문 목록 (?productId=, ?status=, ?from=&to= 생성 시각 범위로 필터링, 보조 색인으로 조회)"""
     tracer = trace.get_tracer(__name__)
-    with tracer.start_as_current_span("get_all_orders"):
-        logger.info("Fetching all orders")
-        return jsonify(orders)
+    with tracer.start_as_current_span("get_all_orders") as span:
+        equals = {field: request.args[field] for field in ("productId", "status") if field in request.args}
+        between = None
+        if "from" in request.args or "to" in request.args:
+            try:
+                low = parse_time(request.args["from"]) if "from" in request.args else None
+                high = parse_time(request.args["to"]) if "to" in request.args else None
+            except ValueError:
+                return jsonify({"error": "Invalid from or to (ISO 8601 expected)"}), 400
+            between = ("createdAt", low, high)
+        
+        if not equals and between is None:
+            logger.info("Fetching all orders")
+            return list_response(orders.values(), Order._asdict)
+        
+        for field, value in equals.items():
+            span.set_attribute(f"order.filter.{field}", value)
+        logger.info("Fetching orders matching %s, created in %s", equals, between and between[1:])
+        return list_response(orders.find(equals, between), Order._asdict)
+
+def stats_entry(stats):
+    """{상태: [주문 수, 수량, 금액]}을 응답 형식으로 변환 (count/quantity/revenue는 CREATED 주문 기준)"""
+    created = stats.get("CREATED", [0, 0, 0.0])
+    return {
+        "count": created[0],
+        "quantity": created[1],
+        "revenue": round(created[2], 2),
+        "byStatus": {status: values[0] for status, values in stats.items() if values[0]},
+    }
+
+@app.route('/orders/stats', methods=['GET'])
+def get_order_stats():
+    """제품별 주문 집계 (?productId=로 한 제품만 조회)"""
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("get_order_stats"):
+        if "productId" in request.args:
+            product_id = request.args["productId"]
+            stats = order_stats.get(STATS_PRODUCT_PREFIX + product_id) or {}
+            return jsonify({"productId": product_id, **stats_entry(stats)})
+        
+        products = []
+        total = {}
+        for key, stats in order_stats.items():
+            if not key.startswith(STATS_PRODUCT_PREFIX):
+                continue
+            products.append({"productId": key[len(STATS_PRODUCT_PREFIX):], **stats_entry(stats)})
+            for status, values in stats.items():
+                entry = total.setdefault(status, [0, 0, 0.0])
+                for index, value in enumerate(values):
+                    entry[index] += value
+        return jsonify({"total": stats_entry(total), "products": products})
 
 @app.route('/orders/<order_id>', methods=['GET'])
 def get_order(order_id):
     tracer = trace.get_tracer(__name__)
     with tracer.start_as_current_span("get_order_by_id") as span:
         span.set_attribute("order.id", order_id)
-        logger.info(f"Fetching order with ID: {order_id}")
+        logger.info("Fetching order with ID: %s", order_id)
         
-        order = next((o for o in orders if o["id"] == order_id), None)
+        order = orders.get(order_id)
         if order:
-            return jsonify(order)
+            return jsonify(order._asdict())
         else:
-            logger.error(f"Order not found: {order_id}")
+            logger.error("Order not found: %s", order_id)
             return jsonify({"error": "Order not found"}), 404
 
+def fetch_product_details(parent_context, product_id):
+    """제품 정보 조회 (워커 스레드에서 create_order 스팬의 자식으로 실행)"""
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("get_product_details", context=parent_context) as product_span:
+        product = product_cache.get(product_id)
+        product_span.set_attribute("product.cache_hit", product is not MISSING)
+        if product is MISSING:
+            logger.info("Fetching product details for ID: %s", product_id)
+            product_response = product_service.get(f"/products/{product_id}")
+            product_response.raise_for_status()
+            product = product_response.json()
+            product_cache.set(product_id, product)
+        product_span.set_attribute("product.price", product["price"])
+        return product
+
+def reserve_inventory(parent_context, product_id, quantity):
+    """재고 예약 (확인과 차감을 제품을 소유한 inventory-service 샤드에서 원자적으로 한 번에 처리)"""
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("reserve_inventory", context=parent_context) as inventory_span:
+        logger.info("Reserving inventory for product: %s, quantity: %s", product_id, quantity)
+        reservation = {
+            "productId": product_id,
+            "quantity": quantity
+        }
+        inventory_service = inventory_shards.client(product_id)
+        inventory_span.set_attribute("inventory.shard", inventory_service.name)
+        inventory_response = inventory_service.post("/inventory/reserve", json=reservation)
+        # 409는 재고 부족으로, 오류가 아닌 예약 실패 결과
+        if inventory_response.status_code != 409:
+            inventory_response.raise_for_status()
+        result = inventory_response.json()
+        inventory_span.set_attribute("inventory.reserved", result["reserved"])
+        return result
+
+def fetch_products_bulk(parent_context, product_ids):
+    """여러 제품 정보 조회 (캐시에 없는 제품만 한 번의 요청으로 조회, 없는 제품은 결과에서 제외)"""
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("get_products_bulk", context=parent_context) as products_span:
+        found = {}
+        uncached = []
+        for product_id in product_ids:
+            product = product_cache.get(product_id)
+            if product is MISSING:
+                uncached.append(product_id)
+            else:
+                found[product_id] = product
+        products_span.set_attribute("product.requested", len(product_ids))
+        products_span.set_attribute("product.cache_hits", len(found))
+        if uncached:
+            logger.info("Fetching details for %s products", len(uncached))
+            # ID에 쉼표가 있어도 깨지지 않도록 쿼리 문자열 대신 본문으로 전달
+            products_response = product_service.post("/products/lookup", json={"ids": uncached})
+            products_response.raise_for_status()
+            for product in products_response.json()["items"]:
+                product_cache.set(product["id"], product)
+                found[product["id"]] = product
+        return found
+
+def reservation_item(product_id, quantity, reservation_id=None):
+    item = {"productId": product_id, "quantity": quantity}
+    if reservation_id is not None:
+        item["reservationId"] = reservation_id
+    return item
+
+def reserve_inventory_batch(parent_context, items, partial, reservation_ids=None):
+    """여러 항목의 재고를 샤드마다 한 번의 요청으로 예약 (항목별 결과는 items 순서와 같음)
+
+    reservation_ids(items와 같은 순서)를 주면 항목마다 예약 ID를 보내므로, 같은 요청을 다시 보내도
+    inventory-service는 이미 처리한 항목의 재고를 다시 차감하지 않습니다.
+
+    샤드 사이에는 트랜잭션이 없으므로 한 샤드라도 오류가 나면 다른 샤드의 예약을 되돌린 뒤 오류를 전달하고,
+    all-or-nothing 요청에서 예약하지 못한 샤드가 있으면 다른 샤드의 예약도 되돌립니다 (보상 트랜잭션).
+    """
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("reserve_inventory_batch", context=parent_context) as inventory_span:
+        logger.info("Reserving inventory for %s items", len(items))
+        # 샤드별 항목 위치 목록
+        groups = inventory_shards.group(range(len(items)), key=lambda index: items[index][0])
+        inventory_span.set_attribute("inventory.shards", len(groups))
+        
+        def reserve(inventory_service, indices):
+            reservation = {
+                "items": [
+                    reservation_item(*items[index], reservation_ids[index] if reservation_ids else None)
+                    for index in indices
+                ],
+                "partial": partial
+            }
+            inventory_response = inventory_service.post("/inventory/reserve/batch", json=reservation)
+            # 409는 예약된 항목이 없다는 결과
+            if inventory_response.status_code != 409:
+                inventory_response.raise_for_status()
+            return inventory_response.json()
+        
+        results, errors = inventory_shards.scatter(reserve, groups)
+        reservations = [None] * len(items)
+        for inventory_service, result in results.items():
+            for index, reservation in zip(groups[inventory_service], result["items"]):
+                reservations[index] = reservation
+        
+        rejected = errors or (not partial and not all(result["reserved"] for result in results.values()))
+        if rejected:
+            released = [
+                index for index, reservation in enumerate(reservations)
+                if reservation is not None and reservation["reserved"]
+            ]
+            if released:
+                release_inventory(
+                    [items[index] for index in released],
+                    [reservation_ids[index] for index in released] if reservation_ids else None
+                )
+        if errors:
+            raise next(iter(errors.values()))
+        if rejected:
+            for (_, quantity), reservation in zip(items, reservations):
+                if reservation["reserved"]:
+                    reservation["reserved"] = False
+                    reservation["reason"] = "Batch not reserved"
+                    reservation["currentStock"] += quantity
+        
+        reserved = any(reservation["reserved"] for reservation in reservations)
+        inventory_span.set_attribute("inventory.reserved", reserved)
+        return {"reserved": reserved, "items": reservations}
+
+def release_inventory(items, reservation_ids=None):
+    """주문 실패 시 예약한 재고 복원 (보상 트랜잭션), items는 (productId, quantity) 목록
+
+    reservation_ids를 주면 inventory-service가 예약 기록도 지우므로 같은 예약 ID로 다시 예약할 수 있습니다.
+    """
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("release_inventory"):
+        logger.info("Releasing inventory reservation for %s items", len(items))
+        
+        def release(inventory_service, shard_items):
+            inventory_service.post(
+                "/inventory/release",
+                json={"items": [reservation_item(*item) for item in shard_items]}
+            ).raise_for_status()
+        
+        keyed = [
+            (product_id, quantity, reservation_ids[index] if reservation_ids else None)
+            for index, (product_id, quantity) in enumerate(items)
+        ]
+        _, errors = inventory_shards.scatter(release, inventory_shards.group(keyed, key=lambda item: item[0]))
+        for inventory_service, e in errors.items():
+            if not isinstance(e, requests.exceptions.RequestException):
+                raise e
+            logger.error("Error releasing inventory on %s: %s", inventory_service.name, e)
+
+def upstream_client_error(e):
+    """업스트림이 400/404로 거절한 요청을 같은 상태 코드의 응답으로 변환 (그 밖의 오류는 None)"""
+    response = getattr(e, "response", None)
+    if not isinstance(e, requests.exceptions.HTTPError) or response is None or response.status_code not in (400, 404):
+        return None
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    message = (body.get("reason") or body.get("error")) if isinstance(body, dict) else None
+    return jsonify({"error": message or response.reason}), response.status_code
+
+def release_abandoned(future, reserved_items):
+    """마감 시간이 지나 포기한 예약 요청이 나중에 성공하면 예약한 재고를 복원
+
+    reserved_items(결과)는 예약 결과에서 (productId, quantity) 목록을 만듭니다.
+    아직 실행되지 않은 요청은 취소하므로 예약 자체가 일어나지 않습니다.
+    """
+    if future.cancel():
+        return
+    
+    def release(done):
+        if done.cancelled() or done.exception() is not None:
+            return
+        items = reserved_items(done.result())
+        if items:
+            logger.warning("Releasing %s reservations completed after the order deadline", len(items))
+            release_inventory(items)
+    
+    future.add_done_callback(release)
+
+def apply_reservations(events):
+    """아웃박스의 주문 이벤트 배치를 재고 예약 한 번으로 처리하고 주문 상태 갱신
+
+    주문 ID를 예약 ID로 보내므로 같은 이벤트를 다시 처리해도(재시도, lease가 지나 다른 워커가 가져간 경우)
+    재고는 한 번만 차감됩니다. 따라서 연결 오류, 응답 시간 초과처럼 요청이 전달되었는지 알 수 없는 오류와
+    회로 차단, 풀 대기 초과, 502/503/504는 모두 RetryLater로 재시도하고, 그 밖의 HTTP 오류는 FAILED로 처리합니다.
+    """
+    pending = [Order(**event.payload) for event in events]
+    order_ids = [order.id for order in pending]
+    try:
+        result = reserve_inventory_batch(
+            context.get_current(), [(order.productId, order.quantity) for order in pending], True, order_ids
+        )
+    except requests.exceptions.HTTPError as e:
+        if e.response is not None and e.response.status_code in (502, 503, 504):
+            raise RetryLater(str(e))
+        logger.error("Inventory reservation failed for %s orders: %s", len(pending), e)
+        mark_orders_failed(events, e)
+        return
+    except requests.exceptions.RequestException as e:
+        # 연결 오류, 시간 초과, CircuitOpen, PoolTimeout (예약 ID로 중복 차감 없이 재시도)
+        raise RetryLater(str(e))
+
+    tracer = trace.get_tracer(__name__)
+    updated = []
+    reserved_items = []
+    reserved_ids = []
+    for event, order, reservation in zip(events, pending, result["items"]):
+        # 주문 요청 트레이스에 이어지는 자식 스팬으로 기록
+        with tracer.start_as_current_span("apply_order_reservation", context=event.context) as span:
+            span.set_attribute("order.id", order.id)
+            span.set_attribute("order.reserved", reservation["reserved"])
+            if reservation["reserved"]:
+                updated.append(order._replace(status="CREATED"))
+                reserved_items.append((order.productId, order.quantity))
+                reserved_ids.append(order.id)
+            else:
+                updated.append(order._replace(status="REJECTED"))
+
+    try:
+        save_orders(updated)
+    except Exception as e:
+        # 주문 상태를 기록하지 못했으므로 예약을 되돌리고 배치 전체를 다시 처리 (보상 트랜잭션)
+        logger.error("Failed to store order results, releasing reservations: %s", e)
+        if reserved_items:
+            release_inventory(reserved_items, reserved_ids)
+        raise RetryLater(str(e))
+
+    for order in updated:
+        if order.status == "CREATED":
+            record_order_metrics(order, "async")
+    logger.info("Applied %s reservations (%s reserved)", len(updated), len(reserved_items))
+
+def mark_orders_failed(events, error):
+    """재고 예약을 처리하지 못한 주문을 FAILED로 갱신"""
+    save_orders([Order(**event.payload)._replace(status="FAILED") for event in events])
+
+order_outbox = None
+if ORDER_PIPELINE == "async":
+    order_outbox = Outbox(
+        "order_reservations",
+        open_store("order_outbox"),
+        apply_reservations,
+        on_give_up=mark_orders_failed,
+        batch_size=ORDER_OUTBOX_BATCH_SIZE,
+        batch_wait=ORDER_OUTBOX_BATCH_WAIT,
+        max_attempts=ORDER_OUTBOX_MAX_ATTEMPTS,
+        retry_backoff=ORDER_OUTBOX_RETRY_BACKOFF,
+        lease=ORDER_OUTBOX_LEASE,
+    )
+    # 처리 스레드는 프리포크 서버에서 워커 fork 이후에 시작
+    run_after_fork(order_outbox.start)
+elif ORDER_PIPELINE != "sync":
+    raise ValueError(f"Unknown ORDER_PIPELINE: {ORDER_PIPELINE}")
+
+def create_order_async(span, product_id, quantity):
+    """주문을 PENDING으로 기록하고 재고 예약 이벤트를 발행한 뒤 바로 응답"""
+    try:
+        product = fetch_product_details(context.get_current(), product_id)
+    except requests.exceptions.RequestException as e:
+        logger.error("Error fetching product: %s", e)
+        return upstream_client_error(e) or (jsonify({"error": f"Product service error: {str(e)}"}), 500)
+    
+    order_id = str(uuid.uuid4())
+    order = Order(
+        id=order_id,
+        productId=product_id,
+        productName=product["name"],
+        quantity=quantity,
+        unitPrice=product["price"],
+        totalPrice=product["price"] * quantity,
+        status="PENDING",
+        createdAt=now_iso()
+    )
+    span.set_attribute("order.id", order_id)
+    
+    # 이벤트가 주문 전체를 담고 있으므로 먼저 기록 (PENDING 주문 기록 전에 중단되어도 처리됨)
+    order_outbox.publish(order_id, order._asdict())
+    # 처리 스레드가 먼저 결과를 기록했으면 PENDING으로 덮어쓰지 않음
+    save_orders([order], only_new=True)
+    logger.info("Accepted order %s for asynchronous reservation", order_id)
+    
+    return jsonify(order._asdict()), 202
+
 @app.route('/orders', methods=['POST'])
 def create_order():
     tracer = trace.get_tracer(__name__)
     with tracer.start_as_current_span("create_order") as span:
-        data = request.json
-        if not data or not all(key in data for key in ("productId", "quantity")):
+        data = request.get_json(silent=True)
+        # 일괄 주문 항목과 같은 규칙으로 검증 (수량은 양의 정수)
+        items = parse_order_items([data])
+        if not items:
             logger.error("Invalid order data")
-            return jsonify({"error": "Invalid order data"}), 400
+            return jsonify({"error": "Invalid order data (string productId and a positive integer quantity required)"}), 400
         
-        product_id = data["productId"]
-        quantity = data["quantity"]
+        [(product_id, quantity)] = items
         
         span.set_attribute("product.id", product_id)
         span.set_attribute("order.quantity", quantity)
         
-        # 1. 제품 정보 조회
-        with tracer.start_as_current_span("get_product_details") as product_span:
-            try:
-                logger.info(f"Fetching product details for ID: {product_id}")
-                product_response = requests.get(f"{PRODUCT_SERVICE_URL}/products/{product_id}")
-                product_response.raise_for_status()
-                product = product_response.json()
-                product_span.set_attribute("product.price", product["price"])
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Error fetching product: {str(e)}")
-                return jsonify({"error": f"Product service error: {str(e)}"}), 500
-        
-        # 2. 재고 확인
-        with tracer.start_as_current_span("check_inventory") as inventory_span:
-            try:
-                logger.info(f"Checking inventory for product: {product_id}, quantity: {quantity}")
-                inventory_check = {
-                    "productId": product_id,
-                    "quantity": quantity
-                }
-                inventory_response = requests.post(f"{INVENTORY_SERVICE_URL}/inventory/check", json=inventory_check)
-                inventory_response.raise_for_status()
-                inventory_result = inventory_response.json()
-                
-                if not inventory_result["available"]:
-                    logger.warning(f"Insufficient inventory for product: {product_id}")
-                    return jsonify({
-                        "error": "Insufficient inventory",
-                        "currentStock": inventory_result["currentStock"],
-                        "requested": quantity
-                    }), 400
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Error checking inventory: {str(e)}")
-                return jsonify({"error": f"Inventory service error: {str(e)}"}), 500
+        if order_outbox is not None:
+            return create_order_async(span, product_id, quantity)
+        
+        # 1, 2. 제품 정보 조회와 재고 예약은 서로 독립적이므로 동시에 요청
+        parent_context = context.get_current()
+        product_future = upstream_executor.submit(
+            fetch_product_details, parent_context, product_id
+        )
+        inventory_future = upstream_executor.submit(
+            reserve_inventory, parent_context, product_id, quantity
+        )
+        
+        try:
+            inventory_result = inventory_future.result(timeout=ORDER_UPSTREAM_DEADLINE)
+        except (requests.exceptions.RequestException, FutureTimeoutError) as e:
+            logger.error("Error reserving inventory: %s", e)
+            if isinstance(e, FutureTimeoutError):
+                # 주문은 만들지 않으므로 늦게 완료된 예약은 되돌림
+                release_abandoned(
+                    inventory_future,
+                    lambda result: [(product_id, quantity)] if result["reserved"] else []
+                )
+            return upstream_client_error(e) or (jsonify({"error": f"Inventory service error: {str(e)}"}), 500)
+        
+        try:
+            product = product_future.result(timeout=ORDER_UPSTREAM_DEADLINE)
+        except (requests.exceptions.RequestException, FutureTimeoutError) as e:
+            logger.error("Error fetching product: %s", e)
+            if inventory_result["reserved"]:
+                release_inventory([(product_id, quantity)])
+            return upstream_client_error(e) or (jsonify({"error": f"Product service error: {str(e)}"}), 500)
+        
+        if not inventory_result["reserved"]:
+            logger.warning("Insufficient inventory for product: %s", product_id)
+            return jsonify({
+                "error": "Insufficient inventory",
+                "currentStock": inventory_result["currentStock"],
+                "requested": quantity
+            }), 400
         
         # 3. 주문 생성
         order_id = str(uuid.uuid4())
-        order = {
-            "id": order_id,
-            "productId": product_id,
-            "productName": product["name"],
-            "quantity": quantity,
-            "unitPrice": product["price"],
-            "totalPrice": product["price"] * quantity,
-            "status": "CREATED"
-        }
+        order = Order(
+            id=order_id,
+            productId=product_id,
+            productName=product["name"],
+            quantity=quantity,
+            unitPrice=product["price"],
+            totalPrice=product["price"] * quantity,
+            status="CREATED",
+            createdAt=now_iso()
+        )
         
-        orders.append(order)
-        logger.info(f"Created new order: {order_id}")
+        save_orders([order])
+        record_order_metrics(order, "single")
+        logger.info("Created new order: %s", order_id)
         
-        # 4. 재고 업데이트
-        with tracer.start_as_current_span("update_inventory"):
-            try:
-                new_quantity = inventory_result["currentStock"] - quantity
-                logger.info(f"Updating inventory for product {product_id} to {new_quantity}")
-                requests.put(
-                    f"{INVENTORY_SERVICE_URL}/inventory/{product_id}", 
-                    json={"quantity": new_quantity}
+        return jsonify(order._asdict()), 201
+
+def parse_order_items(items):
+    """일괄 주문 항목 검증 후 (productId, quantity) 목록 반환, 잘못된 경우 None"""
+    if not isinstance(items, list) or not items or len(items) > ORDER_BATCH_MAX_ITEMS:
+        return None
+    parsed = []
+    for item in items:
+        if not isinstance(item, dict) or not all(key in item for key in ("productId", "quantity")):
+            return None
+        product_id, quantity = item["productId"], item["quantity"]
+        # productId는 샤드 선택 해시와 업스트림 경로에 쓰이므로 비어 있지 않은 문자열만 허용
+        if not isinstance(product_id, str) or not product_id:
+            return None
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+            return None
+        parsed.append((product_id, quantity))
+    return parsed
+
+@app.route('/orders/batch', methods=['POST'])
+def create_orders_batch():
+    """여러 주문 일괄 생성
+
+    서로 다른 제품은 한 번의 일괄 조회로, 재고는 한 번의 일괄 예약으로 처리하므로
+    항목 수와 관계없이 업스트림 호출 수가 일정합니다.
+    기본적으로 전부 생성하거나 전혀 생성하지 않으며(all-or-nothing),
+    "partial": true 이면 가능한 항목만 주문하고 항목별 결과를 반환합니다.
+    """
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("create_orders_batch") as span:
+        data = request.get_json(silent=True)
+        items = parse_order_items(data.get("items")) if isinstance(data, dict) else None
+        partial = data.get("partial", False) if isinstance(data, dict) else False
+        if not items or not isinstance(partial, bool):
+            logger.error("Invalid batch order data")
+            return jsonify({"error": f"Invalid order data (1 to {ORDER_BATCH_MAX_ITEMS} items required)"}), 400
+        
+        ORDER_BATCH_SIZE.observe(len(items))
+        span.set_attribute("order.items", len(items))
+        span.set_attribute("order.partial", partial)
+        
+        # 제품 일괄 조회와 재고 일괄 예약을 동시에 요청
+        parent_context = context.get_current()
+        product_ids = list(dict.fromkeys(product_id for product_id, _ in items))
+        products_future = upstream_executor.submit(fetch_products_bulk, parent_context, product_ids)
+        inventory_future = upstream_executor.submit(reserve_inventory_batch, parent_context, items, partial)
+        
+        try:
+            inventory_result = inventory_future.result(timeout=ORDER_UPSTREAM_DEADLINE)
+        except (requests.exceptions.RequestException, FutureTimeoutError) as e:
+            logger.error("Error reserving inventory: %s", e)
+            if isinstance(e, FutureTimeoutError):
+                release_abandoned(
+                    inventory_future,
+                    lambda result: [
+                        item for item, reservation in zip(items, result["items"]) if reservation["reserved"]
+                    ]
                 )
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Error updating inventory: {str(e)}")
-                # 실제 환경에서는 재고 업데이트 실패 시 보상 트랜잭션이 필요합니다
+            return upstream_client_error(e) or (jsonify({"error": f"Inventory service error: {str(e)}"}), 500)
+        reservations = inventory_result["items"]
+        reserved_items = [
+            (product_id, quantity)
+            for (product_id, quantity), reservation in zip(items, reservations) if reservation["reserved"]
+        ]
+        
+        try:
+            products_found = products_future.result(timeout=ORDER_UPSTREAM_DEADLINE)
+        except (requests.exceptions.RequestException, FutureTimeoutError) as e:
+            logger.error("Error fetching products: %s", e)
+            if reserved_items:
+                release_inventory(reserved_items)
+            return upstream_client_error(e) or (jsonify({"error": f"Product service error: {str(e)}"}), 500)
+        
+        # 재고는 있지만 제품 정보가 없는 항목은 주문할 수 없으므로 실패 처리
+        failures = {}
+        for index, ((product_id, quantity), reservation) in enumerate(zip(items, reservations)):
+            if product_id not in products_found:
+                failures[index] = {"error": "Product not found"}
+            elif not reservation["reserved"]:
+                failures[index] = {
+                    "error": reservation.get("reason", "Insufficient inventory"),
+                    "currentStock": reservation["currentStock"]
+                }
+        if failures and not partial:
+            for index in range(len(items)):
+                failures.setdefault(index, {"error": "Batch not created"})
+        
+        # 주문하지 않는 항목의 예약 복원
+        to_release = [
+            items[index] for index in failures if reservations[index]["reserved"]
+        ]
+        if to_release:
+            release_inventory(to_release)
         
-        return jsonify(order), 201
+        results = []
+        created = []
+        for index, (product_id, quantity) in enumerate(items):
+            if index in failures:
+                results.append({"productId": product_id, "quantity": quantity, "status": "FAILED", **failures[index]})
+                continue
+            product = products_found[product_id]
+            order = Order(
+                id=str(uuid.uuid4()),
+                productId=product_id,
+                productName=product["name"],
+                quantity=quantity,
+                unitPrice=product["price"],
+                totalPrice=product["price"] * quantity,
+                status="CREATED",
+                createdAt=now_iso()
+            )
+            created.append((order.id, order))
+            results.append({"productId": product_id, "quantity": quantity, "status": "CREATED", "order": order._asdict()})
+        
+        save_orders([order for _, order in created])
+        for _, order in created:
+            record_order_metrics(order, "batch")
+        span.set_attribute("order.created", len(created))
+        logger.info("Created %s of %s batch orders", len(created), len(items))
+        
+        status = 201 if created else 400
+        return jsonify({"created": len(created), "failed": len(failures), "items": results}), status
+
+# 제품 캐시 무효화 (product-service가 제품 수정 시 호출)
+@app.route('/cache/products/<product_id>', methods=['DELETE'])
+def invalidate_product_cache(product_id):
+    product_cache.invalidate(product_id)
+    logger.info("Invalidated product cache entry: %s", product_id)
+    return '', 204
+
+@app.route('/cache/products', methods=['DELETE'])
+def clear_product_cache():
+    product_cache.clear()
+    logger.info("Cleared product cache")
+    return '', 204
+
+startup.done()
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=int(os.getenv('PORT', 8083)))
\ No newline at end of file
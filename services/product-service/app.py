@@ -1,56 +1,77 @@
 from flask import Flask, jsonify, request
 import os
 import uuid
-from prometheus_flask_exporter import PrometheusMetrics
+import requests
+from concurrent.futures import ThreadPoolExecutor
 from opentelemetry import trace
-from opentelemetry.instrumentation.flask import FlaskInstrumentor
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.jaeger.thrift import JaegerExporter
-from opentelemetry.sdk.resources import SERVICE_NAME, Resource
 import logging
 import json
+from collections import namedtuple
+from common.bootstrap import bootstrap
+from common.listing import list_response, lookup_response, requested_ids
+from common.logs import setup_logging
+from common.storage import open_store
 
-# 로깅 설정
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.StreamHandler()
-    ]
-)
+# 로깅 설정 (JSON 한 줄 형식, 백그라운드 스레드에서 출력)
+setup_logging("product-service")
 logger = logging.getLogger(__name__)
 
 # Flask 앱 생성
 app = Flask(__name__)
 
-# Prometheus 메트릭 설정
-metrics = PrometheusMetrics(app)
-metrics.info('app_info', 'Product Service', version='1.0.0')
+# Prometheus 메트릭, OpenTelemetry 트레이스, Flask 계측 설정 (common/bootstrap.py)
+startup = bootstrap(app, "product-service")
 
-# OpenTelemetry 설정
-resource = Resource(attributes={
-    SERVICE_NAME: "product-service"
-})
+# 제품 수정 시 캐시 무효화를 알릴 서비스 목록 (쉼표로 구분된 기본 URL)
+PRODUCT_CACHE_INVALIDATE_URLS = [
+    url.strip().rstrip("/")
+    for url in os.getenv("PRODUCT_CACHE_INVALIDATE_URLS", "").split(",")
+    if url.strip()
+]
+PRODUCT_CACHE_INVALIDATE_TIMEOUT = float(os.getenv("PRODUCT_CACHE_INVALIDATE_TIMEOUT", "0.5"))
 
-trace.set_tracer_provider(TracerProvider(resource=resource))
-jaeger_exporter = JaegerExporter(
-    agent_host_name=os.getenv("JAEGER_HOST", "jaeger"),
-    agent_port=int(os.getenv("JAEGER_PORT", "6831")),
-)
-trace.get_tracer_provider().add_span_processor(
-    BatchSpanProcessor(jaeger_exporter)
+# 무효화 요청은 응답 경로 밖에서 보냄 (스레드는 처음 제출할 때 생성되므로 프리포크 워커마다 따로 생김)
+invalidate_executor = ThreadPoolExecutor(
+    max_workers=max(1, len(PRODUCT_CACHE_INVALIDATE_URLS)), thread_name_prefix="cache-invalidate"
 )
 
-# Flask 계측
-FlaskInstrumentor().instrument_app(app)
+# 제품 레코드 (딕셔너리보다 메모리를 적게 쓰는 튜플 기반 레코드)
+Product = namedtuple("Product", ["id", "name", "price"])
 
-# 제품 데이터 (데모용 인메모리 저장소)
-products = [
-    {"id": "product1", "name": "Product 1", "price": 10.99},
-    {"id": "product2", "name": "Product 2", "price": 29.99},
-    {"id": "product3", "name": "Product 3", "price": 5.49}
-]
+# 제품 데이터 (id로 색인되며 삽입 순서 유지, STORAGE_BACKEND로 저장소 선택)
+products = open_store("products", record_type=Product, seed={
+    product.id: product for product in (
+        Product("product1", "Product 1", 10.99),
+        Product("product2", "Product 2", 29.99),
+        Product("product3", "Product 3", 5.49)
+    )
+})
+
+def notify_product_changed(product_id):
+    """제품을 캐시하는 서비스에 무효화 요청을 백그라운드로 보냄 (쓰기 응답을 기다리게 하지 않음)"""
+    for base_url in PRODUCT_CACHE_INVALIDATE_URLS:
+        invalidate_executor.submit(invalidate_product_cache, base_url, product_id)
+
+def invalidate_product_cache(base_url, product_id):
+    """무효화 요청 하나 (실패해도 캐시 TTL이 지나면 갱신됨)"""
+    try:
+        requests.delete(
+            f"{base_url}/cache/products/{product_id}",
+            timeout=PRODUCT_CACHE_INVALIDATE_TIMEOUT
+        )
+    except requests.exceptions.RequestException as e:
+        logger.warning("Failed to invalidate product cache at %s: %s", base_url, e)
+
+def valid_product_fields(data):
+    """제품 필드 검증 (name은 문자열, price는 bool이 아닌 0 이상의 유한한 숫자)"""
+    if "name" in data and not isinstance(data["name"], str):
+        return False
+    if "price" in data:
+        price = data["price"]
+        # bool은 int의 하위 타입이므로 따로 제외
+        if not isinstance(price, (int, float)) or isinstance(price, bool) or not 0 <= price < float("inf"):
+            return False
+    return True
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -58,42 +79,87 @@ def health_check():
 
 @app.route('/products', methods=['GET'])
 def get_products():
+    if "ids" in request.args:
+        return get_products_by_ids()
     tracer = trace.get_tracer(__name__)
     with tracer.start_as_current_span("get_all_products"):
         logger.info("Fetching all products")
-        return jsonify(products)
+        return list_response(products.values(), Product._asdict)
+
+@app.route('/products/lookup', methods=['POST'])
+def get_products_by_ids():
+    """여러 제품 일괄 조회 (GET /products?ids=a,b,c 또는 POST /products/lookup), 없는 ID는 missing으로 반환"""
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("get_products_by_ids") as span:
+        product_ids = requested_ids()
+        if product_ids is None:
+            logger.error("Invalid product ids")
+        else:
+            span.set_attribute("product.requested", len(product_ids))
+            logger.info("Fetching %s products by id", len(product_ids))
+        return lookup_response(products, product_ids, lambda product_id, product: product._asdict())
 
 @app.route('/products/<product_id>', methods=['GET'])
 def get_product(product_id):
     tracer = trace.get_tracer(__name__)
     with tracer.start_as_current_span("get_product_by_id") as span:
         span.set_attribute("product.id", product_id)
-        logger.info(f"Fetching product with ID: {product_id}")
+        logger.info("Fetching product with ID: %s", product_id)
         
-        product = next((p for p in products if p["id"] == product_id), None)
+        product = products.get(product_id)
         if product:
-            return jsonify(product)
+            return jsonify(product._asdict())
         else:
-            logger.error(f"Product not found: {product_id}")
+            logger.error("Product not found: %s", product_id)
             return jsonify({"error": "Product not found"}), 404
 
 @app.route('/products', methods=['POST'])
 def create_product():
     tracer = trace.get_tracer(__name__)
     with tracer.start_as_current_span("create_product"):
-        data = request.json
-        if not data or not all(key in data for key in ("name", "price")):
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not all(key in data for key in ("name", "price")) \
+                or not valid_product_fields(data):
             logger.error("Invalid product data")
             return jsonify({"error": "Invalid product data"}), 400
         
-        product = {
-            "id": str(uuid.uuid4()),
-            "name": data["name"],
-            "price": data["price"]
-        }
-        products.append(product)
-        logger.info(f"Created new product: {product['id']}")
-        return jsonify(product), 201
+        product = Product(
+            id=str(uuid.uuid4()),
+            name=data["name"],
+            price=data["price"]
+        )
+        products.put(product.id, product)
+        # 새 ID는 어느 캐시에도 없으므로 무효화 요청을 보내지 않음
+        logger.info("Created new product: %s", product.id)
+        return jsonify(product._asdict()), 201
+
+@app.route('/products/<product_id>', methods=['PUT'])
+def update_product(product_id):
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("update_product") as span:
+        span.set_attribute("product.id", product_id)
+        
+        product = products.get(product_id)
+        if not product:
+            logger.error("Product not found: %s", product_id)
+            return jsonify({"error": "Product not found"}), 404
+        
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not any(key in data for key in ("name", "price")) \
+                or not valid_product_fields(data):
+            logger.error("Invalid product update data")
+            return jsonify({"error": "Invalid product data"}), 400
+        
+        product = product._replace(
+            name=data.get("name", product.name),
+            price=data.get("price", product.price)
+        )
+        products.put(product_id, product)
+        logger.info("Updated product: %s", product_id)
+        notify_product_changed(product_id)
+        return jsonify(product._asdict())
+
+startup.done()
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=int(os.getenv('PORT', 8081)))
\ No newline at end of file
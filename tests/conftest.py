@@ -0,0 +1,98 @@
+"""테스트 공통 설정
+
+서비스는 services 디렉토리를 PYTHONPATH로 두고 `common.*`을 import하므로 테스트도 같은 경로를 사용합니다.
+서비스 라우트 테스트는 각 서비스의 app.py를 환경 변수와 함께 불러와 Flask 테스트 클라이언트로 호출하고,
+다른 서비스를 호출하는 경로는 불러온 서비스를 로컬 포트로 띄워 URL 환경 변수로 연결합니다.
+"""
+import importlib
+import importlib.util
+import os
+import sys
+import threading
+from unittest import mock
+
+import pytest
+
+SERVICES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "services")
+sys.path.insert(0, SERVICES_DIR)
+
+# common 모듈이 import 시점에 읽는 설정 (트레이스/메트릭 내보내기 끔, 캐시 무효화는 워커 로컬)
+os.environ.update(OTEL_SDK_DISABLED="true", METRICS_ENABLED="false", CACHE_SHARED_DIR="")
+
+from prometheus_client import REGISTRY  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+import common.logs  # noqa: E402
+
+
+class FakeClock:
+    """time 모듈 대신 모듈에 넣어 쓰는 시계 (advance로만 시간이 흐름)"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+_loaded = 0
+
+
+def load_service_module(service, entry="app", **env):
+    """services/<service>/<entry>.py를 새 모듈로 불러옴 (env는 불러오는 동안만 적용)
+
+    같은 서비스를 여러 번 불러올 수 있도록 모듈 이름을 매번 다르게 하고,
+    불러오면서 기본 REGISTRY에 등록된 메트릭은 다음 로드와 이름이 겹치지 않게 해제합니다.
+    """
+    global _loaded
+    _loaded += 1
+    name = f"{service.replace('-', '_')}_{entry}_{_loaded}"
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SERVICES_DIR, service, f"{entry}.py"))
+    module = importlib.util.module_from_spec(spec)
+    before = set(REGISTRY._collector_to_names)
+    # 루트 로거 설정과 리스너 스레드는 서비스마다 다시 만들 필요가 없음
+    with mock.patch.dict(os.environ, {key: str(value) for key, value in env.items()}), \
+            mock.patch.object(common.logs, "setup_logging", lambda service_name: None):
+        spec.loader.exec_module(module)
+    for collector in set(REGISTRY._collector_to_names) - before:
+        REGISTRY.unregister(collector)
+    return module
+
+
+@pytest.fixture
+def load_service():
+    return load_service_module
+
+
+@pytest.fixture
+def serve():
+    """Flask 앱을 로컬 포트에서 띄우고 기본 URL을 반환 (테스트가 끝나면 종료)"""
+    servers = []
+
+    def start(app):
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        # 종료를 기다리는 시간이 짧도록 poll 간격을 줄임
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
@@ -0,0 +1,40 @@
+import pytest
+
+import common.admission
+from common.admission import RateLimiter
+
+
+@pytest.fixture
+def limiter(clock, monkeypatch):
+    monkeypatch.setattr(common.admission, "time", clock)
+    return RateLimiter(max_keys=2)
+
+
+def test_burst_then_rate(limiter, clock):
+    assert all(limiter.allow("k", rate=2, burst=3)[0] for _ in range(3))
+    allowed, retry_after = limiter.allow("k", rate=2, burst=3)
+    assert not allowed
+    assert retry_after == pytest.approx(0.5)
+    clock.advance(0.5)
+    assert limiter.allow("k", rate=2, burst=3)[0]
+    assert not limiter.allow("k", rate=2, burst=3)[0]
+
+
+def test_tokens_do_not_exceed_burst(limiter, clock):
+    limiter.allow("k", rate=10, burst=2)
+    clock.advance(60)
+    assert [limiter.allow("k", rate=10, burst=2)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_keys_have_separate_buckets(limiter):
+    assert limiter.allow("a", rate=1, burst=1)[0]
+    assert not limiter.allow("a", rate=1, burst=1)[0]
+    assert limiter.allow("b", rate=1, burst=1)[0]
+
+
+def test_least_recently_used_keys_are_dropped(limiter):
+    limiter.allow("a", rate=1, burst=1)
+    limiter.allow("b", rate=1, burst=1)
+    limiter.allow("c", rate=1, burst=1)
+    # "a"의 버킷은 제거되었으므로 가득 찬 버킷으로 다시 시작
+    assert limiter.allow("a", rate=1, burst=1)[0]
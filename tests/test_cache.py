@@ -0,0 +1,85 @@
+import pytest
+from prometheus_client import CollectorRegistry
+
+import common.cache
+from common.cache import MISSING, Caches
+
+
+@pytest.fixture
+def caches(clock, monkeypatch):
+    monkeypatch.setattr(common.cache, "time", clock)
+    return Caches(registry=CollectorRegistry())
+
+
+def test_entries_expire_after_ttl(caches, clock):
+    cache = caches.add("ttl", ttl=10, shared_dir="")
+    cache.set("a", 1)
+    clock.advance(9.9)
+    assert cache.get("a") == 1
+    clock.advance(0.2)
+    assert cache.get("a") is MISSING
+
+
+def test_none_is_a_cacheable_value(caches):
+    cache = caches.add("none", shared_dir="")
+    cache.set("a", None)
+    assert cache.get("a") is None
+
+
+def test_least_recently_used_entry_is_evicted(caches):
+    cache = caches.add("lru", maxsize=2, shared_dir="")
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_local_invalidate_removes_only_that_key(caches):
+    cache = caches.add("local", shared_dir="")
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.invalidate("a")
+    assert cache.get("a") is MISSING
+    assert cache.get("b") == 2
+
+
+def test_shared_invalidation_removes_the_key_in_other_workers(tmp_path):
+    # 같은 버전 파일을 쓰는 두 캐시 = 같은 호스트의 두 워커
+    worker1 = Caches(registry=CollectorRegistry()).add("product", shared_dir=str(tmp_path))
+    worker2 = Caches(registry=CollectorRegistry()).add("product", shared_dir=str(tmp_path))
+    worker1.set("a", 1)
+    worker2.set("a", 1)
+    worker2.set("b", 2)
+
+    worker1.invalidate("a")
+
+    assert worker1.get("a") is MISSING
+    assert worker2.get("a") is MISSING
+    assert worker2.get("b") == 2
+    worker2.set("a", 3)
+    assert worker2.get("a") == 3
+
+
+def test_shared_clear_empties_other_workers(tmp_path):
+    worker1 = Caches(registry=CollectorRegistry()).add("product", shared_dir=str(tmp_path))
+    worker2 = Caches(registry=CollectorRegistry()).add("product", shared_dir=str(tmp_path))
+    worker2.set("a", 1)
+    worker2.set("b", 2)
+
+    worker1.clear()
+
+    assert worker2.get("a") is MISSING
+    assert worker2.get("b") is MISSING
+
+
+def test_entries_stored_after_invalidation_stay_valid(tmp_path):
+    first = Caches(registry=CollectorRegistry()).add("product", shared_dir=str(tmp_path))
+    first.invalidate("a")
+    first.clear()
+    # 이미 올라간 버전으로 저장한 항목은 이전 무효화 때문에 버려지지 않음
+    later = Caches(registry=CollectorRegistry()).add("product", shared_dir=str(tmp_path))
+    later.set("a", 1)
+    assert later.get("a") == 1
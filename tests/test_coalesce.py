@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+
+from common.coalesce import SingleFlight
+
+
+def wait_coalesced(group, count):
+    """count개 호출이 진행 중인 호출의 결과를 기다리기 시작할 때까지 대기"""
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        value = REGISTRY.get_sample_value(
+            "singleflight_calls_total", {"group": group.name, "result": "coalesced"}
+        )
+        if value == count:
+            return
+        time.sleep(0.001)
+    raise AssertionError(f"{count} calls did not join the in-flight call")
+
+
+def run_concurrently(group, key, fn, callers):
+    """callers개 스레드가 같은 키로 do()를 호출하고 [(결과, 공유 여부) 또는 예외]를 반환"""
+    results = [None] * callers
+
+    def call(index):
+        try:
+            results[index] = group.do(key, fn)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_concurrent_calls_share_one_execution():
+    group = SingleFlight("test")
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"value": 42}
+
+    leader, leader_result = run_concurrently(group, "k", fn, 1)
+    assert started.wait(5)
+    followers, follower_results = run_concurrently(group, "k", fn, 4)
+    wait_coalesced(group, 4)
+    release.set()
+    for thread in leader + followers:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert leader_result == [({"value": 42}, False)]
+    assert follower_results == [({"value": 42}, True)] * 4
+
+
+def test_exception_is_shared_and_next_call_runs_again():
+    group = SingleFlight("test-error")
+    release = threading.Event()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    leader, leader_result = run_concurrently(group, "k", failing, 1)
+    assert started.wait(5)
+    followers, follower_results = run_concurrently(group, "k", failing, 2)
+    wait_coalesced(group, 2)
+    release.set()
+    for thread in leader + followers:
+        thread.join(5)
+
+    assert all(isinstance(result, ValueError) for result in leader_result + follower_results)
+    assert group.do("k", lambda: "fresh") == ("fresh", False)
+
+
+def test_different_keys_do_not_coalesce():
+    group = SingleFlight("test-keys")
+    assert group.do("a", lambda: 1) == (1, False)
+    assert group.do("b", lambda: 2) == (2, False)
+
+
+def test_leader_exception_propagates():
+    group = SingleFlight("test-raise")
+    with pytest.raises(KeyError):
+        group.do("k", lambda: {}["missing"])
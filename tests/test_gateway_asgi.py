@@ -0,0 +1,36 @@
+import pytest
+from starlette.testclient import TestClient
+
+
+@pytest.fixture
+def product(load_service):
+    return load_service("product-service")
+
+
+@pytest.fixture
+def client(load_service, serve, product):
+    gateway = load_service("gateway-service", entry="asgi", PRODUCT_SERVICE_URL=serve(product.app))
+    with TestClient(gateway.app) as client:
+        yield client
+
+
+def test_product_update_is_forwarded(product, client):
+    response = client.put("/api/products/product1", json={"price": 3})
+    assert response.status_code == 200
+    assert response.json()["price"] == 3
+    assert product.products.get("product1").price == 3
+    assert client.get("/api/products/product1").json()["price"] == 3
+
+
+def test_invalid_product_update_is_passed_through(client):
+    assert client.put("/api/products/product1", json={"price": "free"}).status_code == 400
+
+
+def test_cache_invalidation_requests_are_accepted(client):
+    assert client.delete("/cache/products/product1").status_code == 204
+    assert client.delete("/cache/products").status_code == 204
+
+
+def test_metrics_are_served_on_the_exact_path(client):
+    response = client.get("/actuator/prometheus", follow_redirects=False)
+    assert response.status_code == 200
@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+
+@pytest.fixture
+def product(load_service):
+    return load_service("product-service")
+
+
+@pytest.fixture
+def gateway(load_service, serve, product):
+    return load_service("gateway-service", PRODUCT_SERVICE_URL=serve(product.app), GATEWAY_RATE_LIMIT=0)
+
+
+@pytest.fixture
+def client(gateway):
+    return gateway.app.test_client()
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_product_details_are_cached_until_invalidated(product, client):
+    assert client.get("/api/products/product1").get_json()["price"] == 10.99
+    product.products.put("product1", product.Product("product1", "Product 1", 1.0))
+    assert client.get("/api/products/product1").get_json()["price"] == 10.99
+
+    assert client.delete("/cache/products/product1").status_code == 204
+    assert client.get("/api/products/product1").get_json()["price"] == 1.0
+
+
+def test_product_update_invalidates_the_gateway_cache(product, gateway, client, serve, monkeypatch):
+    monkeypatch.setattr(product, "PRODUCT_CACHE_INVALIDATE_URLS", [serve(gateway.app)])
+    client.get("/api/products/product2")
+    client.get("/api/products/product3")
+
+    # 게이트웨이를 거치지 않은 수정도 product-service의 무효화 요청으로 반영됨
+    product.app.test_client().put("/products/product2", json={"price": 1})
+
+    wait_until(lambda: client.get("/api/products/product2").get_json()["price"] == 1)
+    assert gateway.product_response_cache.get("/products/product3") is not gateway.MISSING
+
+
+@pytest.fixture
+def limited(load_service, serve, product):
+    gateway = load_service(
+        "gateway-service", PRODUCT_SERVICE_URL=serve(product.app), GATEWAY_RATE_LIMIT=1, GATEWAY_RATE_BURST=1,
+        GATEWAY_TRUSTED_PROXIES="10.0.0.0/8", GATEWAY_RATE_LIMIT_ROUTES="/api/products/<product_id>=1:2",
+    )
+    return gateway.app.test_client()
+
+
+def get(client, path, remote_addr="192.0.2.1", **headers):
+    return client.get(path, environ_base={"REMOTE_ADDR": remote_addr}, headers=headers)
+
+
+def test_rate_limit_is_per_client_address(limited):
+    assert get(limited, "/api/products").status_code == 200
+    response = get(limited, "/api/products")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert get(limited, "/api/products", remote_addr="192.0.2.2").status_code == 200
+    assert get(limited, "/health").status_code == 200
+
+
+def test_client_headers_from_untrusted_addresses_are_ignored(limited):
+    get(limited, "/api/products", **{"X-Client-Id": "a"})
+    assert get(limited, "/api/products", **{"X-Client-Id": "b", "X-Forwarded-For": "198.51.100.9"}).status_code == 429
+
+
+def test_trusted_proxies_forward_the_client_identity(limited):
+    assert get(limited, "/api/products", "10.0.0.1", **{"X-Forwarded-For": "198.51.100.1, 10.0.0.2"}).status_code == 200
+    assert get(limited, "/api/products", "10.0.0.1", **{"X-Forwarded-For": "198.51.100.2"}).status_code == 200
+    assert get(limited, "/api/products", "10.0.0.3", **{"X-Forwarded-For": "198.51.100.1"}).status_code == 429
+    assert get(limited, "/api/products", "10.0.0.1", **{"X-Client-Id": "app-1"}).status_code == 200
+    assert get(limited, "/api/products", "10.0.0.1", **{"X-Client-Id": "app-1"}).status_code == 429
+
+
+def test_route_rate_limits_override_the_default(limited):
+    assert [get(limited, "/api/products/product1").status_code for _ in range(3)] == [200, 200, 429]
+
+
+def test_etag_answers_matching_conditional_get_with_304(client):
+    first = client.get("/api/products")
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    response = client.get("/api/products", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.get_data() == b""
+    assert client.get("/api/products", headers={"If-None-Match": 'W/"other"'}).status_code == 200
+
+
+def test_etag_changes_with_the_content(product, client):
+    etag = client.get("/api/products/product1").headers["ETag"]
+    product.products.put("product1", product.Product("product1", "Changed", 1.0))
+    client.delete("/cache/products/product1")
+    assert client.get("/api/products/product1", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_large_responses_are_gzipped_when_accepted(load_service, serve, product):
+    import gzip
+    import json
+
+    gateway = load_service("gateway-service", PRODUCT_SERVICE_URL=serve(product.app), GATEWAY_RATE_LIMIT=0,
+                           GATEWAY_GZIP_MIN_SIZE=100)
+    client = gateway.app.test_client()
+    response = client.get("/api/products", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert len(json.loads(gzip.decompress(response.get_data()))) == 3
+    assert "Content-Encoding" not in client.get("/api/products").headers
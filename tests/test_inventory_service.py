@@ -0,0 +1,138 @@
+import pytest
+
+
+@pytest.fixture
+def inventory(load_service):
+    return load_service("inventory-service", INVENTORY_SHARDS="", INVENTORY_SHARD_NAME="")
+
+
+@pytest.fixture
+def client(inventory):
+    return inventory.app.test_client()
+
+
+def test_reserve_decrements_stock(client):
+    response = client.post("/inventory/reserve", json={"productId": "product2", "quantity": 20})
+    assert response.status_code == 200
+    assert response.get_json() == {"productId": "product2", "requested": 20, "reserved": True, "currentStock": 30}
+    assert client.get("/inventory/product2").get_json()["quantity"] == 30
+
+
+def test_reserve_more_than_stock_conflicts_without_change(client):
+    response = client.post("/inventory/reserve", json={"productId": "product2", "quantity": 51})
+    assert response.status_code == 409
+    assert response.get_json()["reason"] == "Insufficient inventory"
+    assert client.get("/inventory/product2").get_json()["quantity"] == 50
+
+
+def test_reserve_unknown_product(client):
+    response = client.post("/inventory/reserve", json={"productId": "nope", "quantity": 1})
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("body", [
+    None, [], {"productId": "product1"}, {"productId": 1, "quantity": 1},
+    {"productId": "product1", "quantity": 0}, {"productId": "product1", "quantity": True},
+])
+def test_reserve_rejects_invalid_body(client, body):
+    assert client.post("/inventory/reserve", json=body).status_code == 400
+
+
+def test_batch_reservation_is_all_or_nothing(client):
+    response = client.post("/inventory/reserve/batch", json={"items": [
+        {"productId": "product1", "quantity": 10}, {"productId": "product2", "quantity": 60},
+    ]})
+    assert response.status_code == 409
+    body = response.get_json()
+    assert body["reserved"] is False
+    assert [item["reason"] for item in body["items"]] == ["Batch not reserved", "Insufficient inventory"]
+    assert client.get("/inventory/product1").get_json()["quantity"] == 100
+
+
+def test_batch_reservation_sums_repeated_products(client):
+    items = [{"productId": "product2", "quantity": 30}, {"productId": "product2", "quantity": 30}]
+    assert client.post("/inventory/reserve/batch", json={"items": items}).status_code == 409
+    items[1]["quantity"] = 20
+    assert client.post("/inventory/reserve/batch", json={"items": items}).status_code == 200
+    assert client.get("/inventory/product2").get_json()["quantity"] == 0
+
+
+def test_partial_batch_reserves_what_it_can(client):
+    response = client.post("/inventory/reserve/batch", json={"partial": True, "items": [
+        {"productId": "product1", "quantity": 10}, {"productId": "nope", "quantity": 1},
+    ]})
+    assert response.status_code == 200
+    assert [item["reserved"] for item in response.get_json()["items"]] == [True, False]
+    assert client.get("/inventory/product1").get_json()["quantity"] == 90
+
+
+@pytest.mark.parametrize("body", [{}, {"items": []}, {"items": [{"productId": "product1", "quantity": 1}], "partial": "yes"}])
+def test_batch_rejects_invalid_body(client, body):
+    assert client.post("/inventory/reserve/batch", json=body).status_code == 400
+
+
+def test_release_restores_reserved_stock(client):
+    client.post("/inventory/reserve", json={"productId": "product3", "quantity": 25})
+    response = client.post("/inventory/release", json={"items": [{"productId": "product3", "quantity": 25}]})
+    assert response.status_code == 200
+    assert response.get_json()["items"] == [{"productId": "product3", "released": 25, "currentStock": 75}]
+
+
+def test_inventory_is_listed_by_cursor(client):
+    first = client.get("/inventory", query_string={"limit": 2}).get_json()
+    assert first["items"] == [{"productId": "product1", "quantity": 100}, {"productId": "product2", "quantity": 50}]
+    second = client.get("/inventory", query_string={"limit": 2, "cursor": first["nextCursor"]}).get_json()
+    assert second == {"items": [{"productId": "product3", "quantity": 75}], "nextCursor": None}
+
+
+def test_inventory_without_parameters_keeps_the_legacy_map(client):
+    assert client.get("/inventory").get_json() == {"product1": 100, "product2": 50, "product3": 75}
+
+
+def test_lookup_returns_quantities_and_missing(client):
+    body = client.post("/inventory/lookup", json={"ids": ["product2", "nope"]}).get_json()
+    assert body == {"items": [{"productId": "product2", "quantity": 50}], "missing": ["nope"]}
+    assert client.get("/inventory", query_string={"ids": "product2,nope"}).get_json() == body
+
+
+@pytest.mark.parametrize("body", [None, {}, {"ids": []}, {"ids": [None]}])
+def test_lookup_rejects_invalid_body(client, body):
+    assert client.post("/inventory/lookup", json=body).status_code == 400
+
+
+def test_reservation_id_reserves_only_once(client):
+    body = {"partial": True, "items": [
+        {"productId": "product1", "quantity": 10, "reservationId": "order-1"},
+        {"productId": "product1", "quantity": 5},
+    ]}
+    first = client.post("/inventory/reserve/batch", json=body).get_json()
+    body["items"] = body["items"][:1]
+    again = client.post("/inventory/reserve/batch", json=body).get_json()
+    assert again["items"] == first["items"][:1]
+    assert client.get("/inventory/product1").get_json()["quantity"] == 85
+    single = {"productId": "product2", "quantity": 1, "reservationId": "order-2"}
+    assert client.post("/inventory/reserve", json=single).status_code == 200
+    assert client.post("/inventory/reserve", json=single).status_code == 200
+    assert client.get("/inventory/product2").get_json()["quantity"] == 49
+
+
+def test_release_with_reservation_id_allows_reserving_again(client):
+    item = {"productId": "product3", "quantity": 5, "reservationId": "order-1"}
+    client.post("/inventory/reserve/batch", json={"items": [item]})
+    client.post("/inventory/release", json={"items": [item]})
+    assert client.get("/inventory/product3").get_json()["quantity"] == 75
+    client.post("/inventory/reserve/batch", json={"items": [item]})
+    assert client.get("/inventory/product3").get_json()["quantity"] == 70
+
+
+def test_reservation_in_progress_is_retried_later(inventory, client):
+    inventory.reservations.put("order-1", {"state": "pending"})
+    response = client.post("/inventory/reserve", json={"productId": "product1", "quantity": 1, "reservationId": "order-1"})
+    assert response.status_code == 503
+    assert client.get("/inventory/product1").get_json()["quantity"] == 100
+
+
+@pytest.mark.parametrize("reservation_ids", [[""], [1], ["a", "a"]])
+def test_invalid_or_repeated_reservation_ids_are_rejected(client, reservation_ids):
+    items = [{"productId": "product1", "quantity": 1, "reservationId": rid} for rid in reservation_ids]
+    assert client.post("/inventory/reserve/batch", json={"items": items}).status_code == 400
@@ -0,0 +1,130 @@
+import pytest
+import requests
+
+SHARD_NAMES = "inv-a=http://inv-a,inv-b=http://inv-b"
+STOCK = {"product1": 100, "product2": 50, "product3": 75}
+
+
+def load_shard(load_service, name, shards=SHARD_NAMES):
+    return load_service("inventory-service", INVENTORY_SHARDS=shards, INVENTORY_SHARD_NAME=name)
+
+
+@pytest.fixture
+def shards(load_service, serve):
+    a, b = load_shard(load_service, "inv-a"), load_shard(load_service, "inv-b")
+    return {"inv-a": (a, serve(a.app)), "inv-b": (b, serve(b.app))}
+
+
+@pytest.fixture
+def gateway(load_service, shards):
+    urls = ",".join(f"{name}={url}" for name, (_, url) in shards.items())
+    return load_service("gateway-service", INVENTORY_SHARDS=urls, GATEWAY_RATE_LIMIT=0).app.test_client()
+
+
+def test_each_shard_seeds_only_the_products_it_owns(shards):
+    assert dict(shards["inv-a"][0].inventory.items()) == {"product1": 100, "product3": 75}
+    assert dict(shards["inv-b"][0].inventory.items()) == {"product2": 50}
+
+
+def test_gateway_merges_the_full_inventory(gateway):
+    assert gateway.get("/api/inventory").get_json() == STOCK
+
+
+def test_gateway_pages_across_shards(gateway):
+    seen = {}
+    cursor = None
+    while True:
+        body = gateway.get("/api/inventory", query_string={"limit": 1, **({"cursor": cursor} if cursor else {})}).get_json()
+        seen.update((item["productId"], item["quantity"]) for item in body["items"])
+        cursor = body["nextCursor"]
+        if cursor is None:
+            break
+    assert seen == STOCK
+
+
+def test_gateway_streams_all_shards_as_ndjson(gateway):
+    lines = gateway.get("/api/inventory", query_string={"format": "ndjson"}).get_data(as_text=True).splitlines()
+    assert len(lines) == 3
+
+
+def test_gateway_lookup_keeps_request_order_across_shards(gateway):
+    body = gateway.post("/api/inventory/lookup", json={"ids": ["product2", "nope", "product1"]}).get_json()
+    assert [item["productId"] for item in body["items"]] == ["product2", "product1"]
+    assert body["missing"] == ["nope"]
+
+
+def test_gateway_routes_single_products_to_their_shard(gateway, shards):
+    assert gateway.put("/api/inventory/product2", json={"quantity": 7}).status_code == 200
+    assert shards["inv-b"][0].inventory.get("product2") == 7
+
+
+@pytest.fixture
+def single(load_service, shards):
+    """샤드를 추가하기 전처럼 모든 재고를 가진 inv-a"""
+    return load_shard(load_service, "inv-a", shards="inv-a=http://inv-a")
+
+
+def rebalance(single, shards):
+    urls = ",".join(f"{name}={url}" for name, (_, url) in shards.items())
+    return single.app.test_client().post("/inventory/rebalance", json={"shards": urls})
+
+
+def test_rebalance_moves_products_to_their_new_owner(single, shards):
+    target = shards["inv-b"][0]
+    target.inventory.delete_many(["product2"])
+    response = rebalance(single, shards)
+    assert response.status_code == 200
+    assert response.get_json()["moved"] == {"inv-b": 1}
+    assert target.inventory.get("product2") == 50
+    assert "product2" not in single.inventory
+
+
+def test_import_id_is_applied_once(shards):
+    client = shards["inv-b"][0].app.test_client()
+    body = {"importId": "inv-a:1", "items": [{"productId": "product2", "quantity": 5}]}
+    assert client.post("/inventory/import", json=body).get_json()["duplicate"] is False
+    assert client.post("/inventory/import", json=body).get_json()["duplicate"] is True
+    assert shards["inv-b"][0].inventory.get("product2") == 55
+
+
+def test_unconfirmed_import_is_resent_instead_of_restored(single, shards, monkeypatch):
+    target = shards["inv-b"][0]
+    target.inventory.delete_many(["product2"])
+    original = single.shard_client
+
+    class LostResponse:
+        """대상 샤드가 적용한 뒤 응답을 잃어버린 경우"""
+
+        def __init__(self, client):
+            self.client = client
+
+        def post(self, path, **kwargs):
+            self.client.post(path, **kwargs)
+            raise requests.exceptions.ReadTimeout("response lost")
+
+    monkeypatch.setattr(single, "shard_client", lambda name, url: LostResponse(original(name, url)))
+    response = rebalance(single, shards)
+    assert response.status_code == 502
+    assert response.get_json()["pending"] == 1
+    assert "product2" not in single.inventory
+    assert target.inventory.get("product2") == 50
+
+    monkeypatch.setattr(single, "shard_client", original)
+    response = rebalance(single, shards)
+    assert response.status_code == 200
+    assert response.get_json()["pending"] == 0
+    assert target.inventory.get("product2") == 50
+    assert "product2" not in single.inventory
+
+
+def test_rejected_import_is_restored_locally(single, shards, monkeypatch):
+    def reject(*args, **kwargs):
+        response = requests.Response()
+        response.status_code = 400
+        raise requests.exceptions.HTTPError("400 Client Error", response=response)
+
+    monkeypatch.setattr(single, "send_import", reject)
+    response = rebalance(single, shards)
+    assert response.status_code == 502
+    assert response.get_json()["pending"] == 0
+    assert single.inventory.get("product2") == 50
@@ -0,0 +1,75 @@
+import pytest
+from flask import Flask
+
+from common.listing import NDJSON_MIMETYPE, NEXT_CURSOR_HEADER, list_response
+from common.storage import MemoryStore
+
+
+@pytest.fixture
+def store():
+    return MemoryStore("items", seed={f"k{i}": {"id": f"k{i}"} for i in range(10)})
+
+
+@pytest.fixture
+def client(store):
+    app = Flask(__name__)
+
+    @app.route("/items")
+    def items():
+        return list_response(store.values(), lambda record: record)
+
+    @app.route("/plain")
+    def plain():
+        return list_response([{"id": f"p{i}"} for i in range(5)], lambda record: record)
+
+    return app.test_client()
+
+
+def ids(body):
+    return [item["id"] for item in body["items"]]
+
+
+def test_without_parameters_returns_the_full_list(client):
+    assert len(client.get("/items").get_json()) == 10
+
+
+def test_cursor_walks_all_pages(client):
+    seen = []
+    cursor = None
+    while True:
+        query = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/items", query_string=query)
+        body = response.get_json()
+        seen += ids(body)
+        assert response.headers.get(NEXT_CURSOR_HEADER) == body["nextCursor"]
+        cursor = body["nextCursor"]
+        if cursor is None:
+            break
+    assert seen == [f"k{i}" for i in range(10)]
+
+
+def test_cursor_is_not_shifted_by_deletes_and_inserts(client, store):
+    first = client.get("/items", query_string={"limit": 4}).get_json()
+    store.delete_many(["k0", "k1"])
+    store.put("new", {"id": "new"})
+    second = client.get("/items", query_string={"limit": 4, "cursor": first["nextCursor"]}).get_json()
+    assert ids(first) == ["k0", "k1", "k2", "k3"]
+    assert ids(second) == ["k4", "k5", "k6", "k7"]
+
+
+def test_ndjson_without_limit_streams_rest(client):
+    cursor = client.get("/items", query_string={"limit": 8}).get_json()["nextCursor"]
+    response = client.get("/items", query_string={"format": "ndjson", "cursor": cursor})
+    assert response.mimetype == NDJSON_MIMETYPE
+    assert response.get_data(as_text=True).splitlines() == ['{"id": "k8"}', '{"id": "k9"}']
+
+
+def test_plain_iterable_uses_positions(client):
+    body = client.get("/plain", query_string={"limit": 2, "cursor": 2}).get_json()
+    assert ids(body) == ["p2", "p3"]
+    assert body["nextCursor"] == "4"
+
+
+@pytest.mark.parametrize("query", [{"cursor": "abc"}, {"cursor": -1}, {"limit": 0}, {"limit": "x"}])
+def test_invalid_cursor_or_limit(client, query):
+    assert client.get("/items", query_string=query).status_code == 400
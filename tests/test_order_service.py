@@ -0,0 +1,196 @@
+import pytest
+
+
+@pytest.fixture
+def order(load_service):
+    return load_service("order-service")
+
+
+@pytest.fixture
+def client(order):
+    return order.app.test_client()
+
+
+def add_orders(order, count, status="CREATED"):
+    order.save_orders([
+        order.Order(f"o{i}", f"product{i % 3 + 1}", "P", 1, 1.0, 1.0, status, f"2026-01-01T00:00:{i:02d}.000+00:00")
+        for i in range(count)
+    ])
+
+
+def test_orders_are_listed_by_cursor(order, client):
+    add_orders(order, 5)
+    seen = []
+    cursor = None
+    while True:
+        body = client.get("/orders", query_string={"limit": 2, **({"cursor": cursor} if cursor else {})}).get_json()
+        seen += [item["id"] for item in body["items"]]
+        cursor = body["nextCursor"]
+        if cursor is None:
+            break
+    assert seen == [f"o{i}" for i in range(5)]
+
+
+def test_orders_without_parameters_keep_the_full_list(order, client):
+    add_orders(order, 3)
+    assert len(client.get("/orders").get_json()) == 3
+
+
+def test_cache_routes_invalidate_product_details(order, client):
+    order.product_cache.set("product1", {"id": "product1", "price": 1})
+    order.product_cache.set("product2", {"id": "product2", "price": 2})
+    assert client.delete("/cache/products/product1").status_code == 204
+    assert order.product_cache.get("product1") is order.MISSING
+    assert order.product_cache.get("product2") == {"id": "product2", "price": 2}
+    assert client.delete("/cache/products").status_code == 204
+    assert order.product_cache.get("product2") is order.MISSING
+
+
+@pytest.fixture
+def upstreams(load_service, serve):
+    product = load_service("product-service")
+    inventory = load_service("inventory-service", INVENTORY_SHARDS="", INVENTORY_SHARD_NAME="")
+    return product, inventory, {"PRODUCT_SERVICE_URL": serve(product.app), "INVENTORY_SERVICE_URL": serve(inventory.app)}
+
+
+@pytest.fixture
+def connected(load_service, upstreams):
+    return load_service("order-service", **upstreams[2]).app.test_client()
+
+
+def stock(upstreams, product_id):
+    return upstreams[1].inventory.get(product_id)
+
+
+def test_batch_creates_all_orders(connected, upstreams):
+    response = connected.post("/orders/batch", json={"items": [
+        {"productId": "product1", "quantity": 2}, {"productId": "product2", "quantity": 3},
+    ]})
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body["created"] == 2
+    assert [item["order"]["totalPrice"] for item in body["items"]] == [2 * 10.99, 3 * 29.99]
+    assert (stock(upstreams, "product1"), stock(upstreams, "product2")) == (98, 47)
+
+
+def test_batch_is_all_or_nothing_by_default(connected, upstreams):
+    response = connected.post("/orders/batch", json={"items": [
+        {"productId": "product1", "quantity": 2}, {"productId": "product2", "quantity": 51},
+    ]})
+    assert response.status_code == 400
+    assert [item["status"] for item in response.get_json()["items"]] == ["FAILED", "FAILED"]
+    assert (stock(upstreams, "product1"), stock(upstreams, "product2")) == (100, 50)
+
+
+def test_partial_batch_creates_what_it_can(connected, upstreams):
+    response = connected.post("/orders/batch", json={"partial": True, "items": [
+        {"productId": "product1", "quantity": 2}, {"productId": "nope", "quantity": 1},
+    ]})
+    assert response.status_code == 201
+    assert response.get_json()["created"] == 1
+    assert stock(upstreams, "product1") == 98
+
+
+def test_batch_looks_up_ids_containing_commas(connected, upstreams):
+    product, inventory, _ = upstreams
+    product.products.put("a,b", product.Product("a,b", "Comma", 2.0))
+    inventory.inventory.put("a,b", 5)
+    response = connected.post("/orders/batch", json={"items": [{"productId": "a,b", "quantity": 1}]})
+    assert response.status_code == 201
+    assert inventory.inventory.get("a,b") == 4
+
+
+@pytest.mark.parametrize("body", [
+    None, [], {}, {"items": []}, {"items": [{"productId": "product1"}]},
+    {"items": [{"productId": "product1", "quantity": 1}], "partial": "yes"},
+])
+def test_batch_rejects_invalid_body(connected, body):
+    assert connected.post("/orders/batch", json=body).status_code == 400
+
+
+def test_batch_passes_upstream_client_errors_through(load_service, serve, upstreams):
+    from flask import Flask, jsonify
+
+    inventory = Flask("inventory-stub")
+
+    @inventory.post("/inventory/reserve/batch")
+    def reject():
+        return jsonify({"error": "Invalid data"}), 400
+
+    client = load_service(
+        "order-service", PRODUCT_SERVICE_URL=upstreams[2]["PRODUCT_SERVICE_URL"], INVENTORY_SERVICE_URL=serve(inventory)
+    ).app.test_client()
+    response = client.post("/orders/batch", json={"items": [{"productId": "product1", "quantity": 1}]})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid data"}
+
+
+@pytest.fixture
+def async_order(load_service, upstreams):
+    # 프리포크 서버처럼 불러와 처리 스레드를 시작하지 않음 (이벤트는 테스트가 직접 처리)
+    return load_service("order-service", ORDER_PIPELINE="async", WSGI_PREFORK="1", **upstreams[2])
+
+
+def accept(async_order, quantity=2):
+    """PENDING 주문을 기록하고 처리 스레드 대신 테스트가 처리할 이벤트를 반환"""
+    async_order.order_outbox.owner = "test"
+    response = async_order.app.test_client().post("/orders", json={"productId": "product1", "quantity": quantity})
+    assert response.status_code == 202
+    event = async_order.order_outbox._queue.get_nowait()
+    return response.get_json()["id"], event
+
+
+def test_async_reservation_is_applied_once_when_processed_twice(async_order, upstreams):
+    order_id, event = accept(async_order)
+    async_order.apply_reservations([event])
+    async_order.apply_reservations([event])  # 같은 이벤트를 다른 워커가 다시 처리한 경우
+    assert async_order.orders.get(order_id).status == "CREATED"
+    assert stock(upstreams, "product1") == 98
+
+
+def test_async_reservation_retries_when_the_outcome_is_unknown(async_order, upstreams, monkeypatch):
+    import requests
+
+    order_id, event = accept(async_order)
+    original = async_order.inventory_shards.clients["inventory-service"].post
+
+    def lost_response(path, **kwargs):
+        original(path, **kwargs)
+        raise requests.exceptions.ReadTimeout("response lost")
+
+    monkeypatch.setattr(async_order.inventory_shards.clients["inventory-service"], "post", lost_response)
+    with pytest.raises(async_order.RetryLater):
+        async_order.apply_reservations([event])
+    monkeypatch.undo()
+    async_order.apply_reservations([event])
+    assert async_order.orders.get(order_id).status == "CREATED"
+    assert stock(upstreams, "product1") == 98
+
+
+def test_orders_are_filtered_by_indexed_fields(order, client):
+    add_orders(order, 6)
+    order.save_orders([order.orders.get("o1")._replace(status="FAILED")])
+    body = client.get("/orders", query_string={"productId": "product2", "limit": 10}).get_json()
+    assert [item["id"] for item in body["items"]] == ["o1", "o4"]
+    assert [item["id"] for item in client.get("/orders", query_string={"status": "FAILED"}).get_json()] == ["o1"]
+    ranged = client.get("/orders", query_string={"from": "2026-01-01T00:00:02Z", "to": "2026-01-01T09:00:04+09:00"})
+    assert [item["id"] for item in ranged.get_json()] == ["o2", "o3"]
+
+
+def test_invalid_time_filter(client):
+    assert client.get("/orders", query_string={"from": "yesterday"}).status_code == 400
+
+
+def test_stats_follow_status_changes(order, client):
+    add_orders(order, 3)
+    order.save_orders([order.orders.get("o0")._replace(status="FAILED")])
+    stats = client.get("/orders/stats", query_string={"productId": "product1"}).get_json()
+    assert stats == {"productId": "product1", "count": 0, "quantity": 0, "revenue": 0, "byStatus": {"FAILED": 1}}
+    assert client.get("/orders/stats").get_json()["total"]["count"] == 2
+
+
+@pytest.mark.parametrize("product_id", [5, "", None, ["product1"], {"id": "product1"}])
+def test_orders_reject_non_string_product_ids(client, product_id):
+    assert client.post("/orders", json={"productId": product_id, "quantity": 1}).status_code == 400
+    batch = {"items": [{"productId": "product1", "quantity": 1}, {"productId": product_id, "quantity": 1}]}
+    assert client.post("/orders/batch", json=batch).status_code == 400
@@ -0,0 +1,155 @@
+import pytest
+from prometheus_client import CollectorRegistry
+
+import common.outbox
+from common.outbox import Outbox, RetryLater
+from common.storage import MemoryStore
+
+
+@pytest.fixture
+def store():
+    return MemoryStore("outbox")
+
+
+def make_outbox(store, handler, **kwargs):
+    outbox = Outbox("test", store, handler, registry=CollectorRegistry(), retry_backoff=0, **kwargs)
+    outbox.owner = "me"
+    return outbox
+
+
+def drain(outbox):
+    """큐에 쌓인 이벤트를 꺼내 한 배치로 반환"""
+    batch = []
+    while not outbox._queue.empty():
+        batch.append(outbox._queue.get_nowait())
+    return batch
+
+
+def test_publish_claims_event_and_processing_deletes_it(store):
+    handled = []
+    outbox = make_outbox(store, handled.extend)
+    outbox.publish("e1", {"orderId": "o1"})
+
+    assert store.get("e1")["claimedBy"] == "me"
+    batch = drain(outbox)
+    outbox._process(batch)
+    outbox._done(batch)
+
+    assert [event.payload for event in handled] == [{"orderId": "o1"}]
+    assert "e1" not in store
+
+
+def test_recover_claims_only_expired_events_not_in_flight(store, clock, monkeypatch):
+    monkeypatch.setattr(common.outbox, "time", clock)
+    outbox = make_outbox(store, lambda batch: None, lease=60)
+    outbox.publish("mine", {"n": 1})  # 이 프로세스가 처리 중인 이벤트
+    record = {"payload": {"n": 2}, "trace": {}, "publishedAt": clock.now, "claimedBy": "me", "claimedAt": clock.now}
+    store.put("own-stale", record)  # 같은 owner가 남긴 이벤트 (이전 실행)
+    store.put("other-stale", {**record, "claimedBy": "other"})
+    store.put("fresh", {**record, "claimedAt": clock.now + 59})
+    drain(outbox)
+
+    clock.advance(61)
+    outbox._recover()
+
+    recovered = drain(outbox)
+    assert sorted(event.id for event in recovered) == ["other-stale", "own-stale"]
+    assert all(store.get(event.id)["claimedBy"] == "me" for event in recovered)
+    assert all(store.get(event.id)["claimedAt"] == clock.now for event in recovered)
+
+
+def test_recover_skips_events_claimed_in_the_meantime(store, clock, monkeypatch):
+    monkeypatch.setattr(common.outbox, "time", clock)
+    outbox = make_outbox(store, lambda batch: None, lease=60)
+    store.put("e1", {"payload": {}, "trace": {}, "publishedAt": clock.now, "claimedBy": "x", "claimedAt": clock.now})
+    clock.advance(61)
+    original_update = store.update
+
+    def claimed_by_another_process(keys, fn):
+        store.put("e1", {**store.get("e1"), "claimedBy": "y", "claimedAt": clock.now})
+        return original_update(keys, fn)
+
+    monkeypatch.setattr(store, "update", claimed_by_another_process)
+    outbox._recover()
+
+    assert drain(outbox) == []
+    assert store.get("e1")["claimedBy"] == "y"
+
+
+def test_retry_later_then_success(store):
+    attempts = []
+
+    def handler(batch):
+        attempts.append(len(batch))
+        if len(attempts) < 3:
+            raise RetryLater("not yet")
+
+    outbox = make_outbox(store, handler, max_attempts=5)
+    outbox.publish("e1", {})
+    outbox._process(drain(outbox))
+
+    assert attempts == [1, 1, 1]
+    assert "e1" not in store
+
+
+@pytest.mark.parametrize("error", [RetryLater("still down"), ValueError("bug")])
+def test_gives_up_after_max_attempts(store, error):
+    attempts = []
+    given_up = []
+
+    def handler(batch):
+        attempts.append(1)
+        raise error
+
+    outbox = make_outbox(store, handler, max_attempts=3,
+                         on_give_up=lambda batch, e: given_up.append(([event.id for event in batch], e)))
+    outbox.publish("e1", {})
+    outbox.publish("e2", {})
+    outbox._process(drain(outbox))
+
+    assert len(attempts) == 3
+    assert given_up == [(["e1", "e2"], error)]
+    assert len(store) == 0
+
+
+def test_processing_renews_the_claim(store, clock, monkeypatch):
+    monkeypatch.setattr(common.outbox, "time", clock)
+    seen = []
+    outbox = make_outbox(store, lambda batch: seen.append(store.get(batch[0].id)["claimedAt"]), lease=60)
+    outbox.publish("e1", {})
+    clock.advance(59)
+    outbox._process(drain(outbox))
+    assert seen == [clock.now]
+
+
+def test_events_claimed_by_another_process_are_skipped(store, clock, monkeypatch):
+    monkeypatch.setattr(common.outbox, "time", clock)
+    handled = []
+    outbox = make_outbox(store, lambda batch: handled.extend(event.id for event in batch), lease=60)
+    outbox.publish("mine", {})
+    outbox.publish("taken", {})
+    batch = drain(outbox)
+    # 처리가 밀린 사이 lease가 지나 다른 프로세스가 가져감
+    store.put("taken", {**store.get("taken"), "claimedBy": "other", "claimedAt": clock.now + 61})
+
+    outbox._process(batch)
+
+    assert handled == ["mine"]
+    assert "mine" not in store
+    assert store.get("taken")["claimedBy"] == "other"
+
+
+def test_claim_lost_between_attempts_stops_retrying(store):
+    attempts = []
+
+    def handler(batch):
+        attempts.append([event.id for event in batch])
+        store.put("e1", {**store.get("e1"), "claimedBy": "other"})
+        raise RetryLater("down")
+
+    outbox = make_outbox(store, handler, max_attempts=5)
+    outbox.publish("e1", {})
+    outbox._process(drain(outbox))
+
+    assert attempts == [["e1"]]
+    assert store.get("e1")["claimedBy"] == "other"
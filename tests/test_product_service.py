@@ -0,0 +1,71 @@
+import pytest
+
+
+@pytest.fixture
+def product(load_service):
+    return load_service("product-service")
+
+
+@pytest.fixture
+def client(product):
+    return product.app.test_client()
+
+
+def test_products_are_listed_by_cursor(client):
+    first = client.get("/products", query_string={"limit": 2}).get_json()
+    assert [item["id"] for item in first["items"]] == ["product1", "product2"]
+    second = client.get("/products", query_string={"limit": 2, "cursor": first["nextCursor"]}).get_json()
+    assert [item["id"] for item in second["items"]] == ["product3"]
+    assert second["nextCursor"] is None
+
+
+def test_products_without_parameters_keep_the_full_list(client):
+    assert [item["id"] for item in client.get("/products").get_json()] == ["product1", "product2", "product3"]
+
+
+def test_products_stream_as_ndjson(client):
+    response = client.get("/products", query_string={"format": "ndjson"})
+    assert response.mimetype == "application/x-ndjson"
+    assert len(response.get_data(as_text=True).splitlines()) == 3
+
+
+@pytest.mark.parametrize("body", [
+    ["name"], "name", {}, {"name": 1}, {"price": "free"}, {"price": True}, {"price": -1}, {"price": None},
+])
+def test_update_rejects_invalid_body(client, body):
+    response = client.put("/products/product1", json=body)
+    assert response.status_code == 400
+    assert client.get("/products/product1").get_json()["price"] == 10.99
+
+
+def test_update_changes_only_given_fields(client):
+    response = client.put("/products/product1", json={"price": 12})
+    assert response.get_json() == {"id": "product1", "name": "Product 1", "price": 12}
+
+
+def test_create_rejects_invalid_price(client):
+    assert client.post("/products", json={"name": "x", "price": "free"}).status_code == 400
+
+
+def test_only_updates_notify_cache_invalidation(product, client, monkeypatch):
+    notified = []
+    monkeypatch.setattr(product, "notify_product_changed", notified.append)
+    created = client.post("/products", json={"name": "New", "price": 1}).get_json()
+    client.put(f"/products/{created['id']}", json={"name": "Renamed"})
+    assert notified == [created["id"]]
+
+
+@pytest.mark.parametrize("request_kwargs", [
+    {"method": "GET", "query_string": {"ids": "product3,nope,product1"}},
+    {"method": "POST", "path": "/products/lookup", "json": {"ids": ["product3", "nope", "product1"]}},
+])
+def test_lookup_returns_found_in_request_order_and_missing(client, request_kwargs):
+    kwargs = dict(request_kwargs)
+    body = client.open(kwargs.pop("path", "/products"), **kwargs).get_json()
+    assert [item["id"] for item in body["items"]] == ["product3", "product1"]
+    assert body["missing"] == ["nope"]
+
+
+@pytest.mark.parametrize("body", [None, {}, {"ids": []}, {"ids": "product1"}, {"ids": [1]}])
+def test_lookup_rejects_invalid_body(client, body):
+    assert client.post("/products/lookup", json=body).status_code == 400
@@ -0,0 +1,94 @@
+import pytest
+from flask import Flask, request
+from prometheus_client import CollectorRegistry
+
+import common.resilience
+import common.upstream
+from common.resilience import CircuitOpen, RetryBudget
+from common.upstream import UpstreamPools
+
+
+@pytest.fixture(autouse=True)
+def fake_time(clock, monkeypatch):
+    monkeypatch.setattr(common.resilience, "time", clock)
+
+
+def test_budget_starts_full_and_runs_out():
+    budget = RetryBudget(ratio=0.2, min_per_second=1)
+    assert budget.max_tokens == 10
+    assert [budget.withdraw() for _ in range(11)] == [True] * 10 + [False]
+
+
+def test_requests_deposit_a_fraction_of_a_retry():
+    budget = RetryBudget(ratio=0.25, min_per_second=0.1)
+    while budget.withdraw():
+        pass
+    for _ in range(3):
+        budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+
+
+def test_budget_refills_over_time(clock):
+    budget = RetryBudget(ratio=0.1, min_per_second=2)
+    while budget.withdraw():
+        pass
+    clock.advance(0.5)
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    clock.advance(3600)
+    assert sum(budget.withdraw() for _ in range(100)) == budget.max_tokens
+
+
+@pytest.fixture
+def pools():
+    return UpstreamPools(registry=CollectorRegistry(), max_retries=2, breaker_failure_threshold=3,
+                         breaker_reset_timeout=10)
+
+
+@pytest.fixture
+def flaky(serve):
+    """처음 failures번은 503을 반환하는 업스트림"""
+    app = Flask("flaky")
+    app.config["failures"] = 0
+    calls = []
+
+    @app.route("/", methods=["GET", "POST"])
+    def index():
+        calls.append(request.method)
+        if len(calls) <= app.config["failures"]:
+            return "", 503
+        return "ok"
+
+    return app, calls, serve(app)
+
+
+def test_circuit_opens_after_consecutive_failures_then_probes(pools, clock):
+    breaker = pools.add("svc", "http://unused").breaker
+    for _ in range(3):
+        breaker.allow()
+        breaker.record_failure()
+    with pytest.raises(CircuitOpen):
+        breaker.allow()
+    clock.advance(10)
+    breaker.allow()  # half-open 시험 호출
+    with pytest.raises(CircuitOpen):
+        breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_idempotent_requests_are_retried_on_503(pools, flaky, monkeypatch):
+    monkeypatch.setattr(common.upstream, "UPSTREAM_RETRY_BACKOFF", 0)
+    app, calls, url = flaky
+    app.config["failures"] = 2
+    assert pools.add("svc", url).get("/").status_code == 200
+    assert calls == ["GET"] * 3
+
+
+def test_non_idempotent_requests_are_sent_once(pools, flaky):
+    app, calls, url = flaky
+    app.config["failures"] = 1
+    assert pools.add("svc", url).post("/").status_code == 503
+    assert calls == ["POST"]
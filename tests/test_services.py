@@ -0,0 +1,26 @@
+import pytest
+
+SERVICES = ["product-service", "inventory-service", "order-service", "gateway-service"]
+
+
+@pytest.mark.parametrize("service", SERVICES)
+def test_service_loads_and_reports_health(load_service, service):
+    client = load_service(service).app.test_client()
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "UP"
+
+
+def test_same_service_can_be_loaded_twice(load_service):
+    first = load_service("inventory-service", INVENTORY_SHARDS="")
+    second = load_service("inventory-service", INVENTORY_SHARDS="")
+    first.inventory.put("product1", 0)
+    assert second.app.test_client().get("/inventory/product1").get_json()["quantity"] == 100
+
+
+def test_served_service_is_reachable_from_another_service(load_service, serve):
+    product_url = serve(load_service("product-service").app)
+    inventory_url = serve(load_service("inventory-service").app)
+    order = load_service("order-service", PRODUCT_SERVICE_URL=product_url, INVENTORY_SERVICE_URL=inventory_url)
+    response = order.app.test_client().post("/orders", json={"productId": "product1", "quantity": 1})
+    assert response.status_code == 201, response.get_json()
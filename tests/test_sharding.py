@@ -0,0 +1,72 @@
+import pytest
+
+from common.sharding import HashRing, parse_shard_cursor, parse_shards, shard_cursor
+
+KEYS = [f"product{i}" for i in range(5000)]
+
+
+def test_owner_is_stable_across_instances_and_name_order():
+    first = HashRing(["a", "b", "c"])
+    second = HashRing(["c", "a", "b"])
+    assert [first.owner(key) for key in KEYS] == [second.owner(key) for key in KEYS]
+
+
+def test_keys_spread_over_all_shards():
+    ring = HashRing(["a", "b", "c", "d"])
+    counts = {}
+    for key in KEYS:
+        owner = ring.owner(key)
+        counts[owner] = counts.get(owner, 0) + 1
+    assert set(counts) == {"a", "b", "c", "d"}
+    assert min(counts.values()) > len(KEYS) / 4 * 0.7
+
+
+def test_adding_a_shard_only_moves_keys_to_the_new_shard():
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+    moved = [key for key in KEYS if before.owner(key) != after.owner(key)]
+    assert all(after.owner(key) == "d" for key in moved)
+    # 새 샤드가 약 1/4을 가져감
+    assert 0.15 < len(moved) / len(KEYS) < 0.35
+
+
+def test_removing_a_shard_only_moves_its_keys():
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "c"])
+    for key in KEYS:
+        if before.owner(key) != "b":
+            assert after.owner(key) == before.owner(key)
+
+
+def test_group_keeps_input_order_within_a_shard():
+    ring = HashRing(["a", "b"])
+    items = [{"id": key} for key in KEYS[:50]]
+    groups = ring.group(items, key=lambda item: item["id"])
+    assert sum(len(group) for group in groups.values()) == len(items)
+    for name, group in groups.items():
+        assert all(ring.owner(item["id"]) == name for item in group)
+        assert group == [item for item in items if ring.owner(item["id"]) == name]
+
+
+def test_empty_ring_is_rejected():
+    with pytest.raises(ValueError):
+        HashRing([])
+
+
+def test_parse_shards_names_and_defaults():
+    assert parse_shards("a=http://x:1/, http://y:2,") == [("a", "http://x:1"), ("y:2", "http://y:2")]
+    assert parse_shards("") == []
+    with pytest.raises(ValueError):
+        parse_shards("a=http://x:1,a=http://y:2")
+
+
+def test_shard_cursor_round_trip():
+    names = ["inv-a", "inv-b"]
+    assert parse_shard_cursor(None, names) == (0, 0)
+    assert parse_shard_cursor(shard_cursor("inv-b", 42), names) == (1, 42)
+
+
+@pytest.mark.parametrize("cursor", ["inv-c:1", "inv-a:-1", "inv-a:x", "7"])
+def test_invalid_shard_cursor(cursor):
+    with pytest.raises(ValueError):
+        parse_shard_cursor(cursor, ["inv-a", "inv-b"])
@@ -0,0 +1,147 @@
+import json
+import threading
+from collections import namedtuple
+from operator import attrgetter
+
+import pytest
+
+from common.storage import MemoryStore, SQLiteStore
+
+Order = namedtuple("Order", ["id", "status", "createdAt"])
+FIELDS = ("status", "createdAt")
+
+
+def memory_store(tmp_path):
+    return MemoryStore("orders", getters={field: attrgetter(field) for field in FIELDS},
+                       indexes=("status",), range_indexes=("createdAt",))
+
+
+def sqlite_store(tmp_path):
+    return SQLiteStore(
+        "orders", path=str(tmp_path / "orders.db"),
+        decode=lambda text: Order(*json.loads(text)),
+        json_paths={field: f"$[{Order._fields.index(field)}]" for field in FIELDS},
+        indexes=("status",), range_indexes=("createdAt",),
+    )
+
+
+@pytest.fixture(params=[memory_store, sqlite_store], ids=["memory", "sqlite"])
+def store(request, tmp_path):
+    return request.param(tmp_path)
+
+
+def fill(store):
+    """createdAt이 삽입 순서와 다르게 섞이고, 수정·삭제 후 다시 넣은 주문이 있는 데이터"""
+    store.put_many(
+        (f"o{i}", Order(f"o{i}", "CREATED" if i % 2 else "FAILED", f"2026-01-{28 - i % 27:02d}"))
+        for i in range(60)
+    )
+    store.put("o3", Order("o3", "FAILED", "2026-01-05"))  # 수정은 순서를 바꾸지 않음
+    store.delete_many(["o4"])
+    store.put("o4", Order("o4", "CREATED", "2026-01-10"))  # 삭제 후 다시 넣으면 맨 뒤
+
+
+QUERIES = [
+    ({"status": "CREATED"}, None),
+    (None, ("createdAt", "2026-01-05", "2026-01-20")),
+    ({"status": "FAILED"}, ("createdAt", None, "2026-01-15")),
+    (None, ("createdAt", "2026-01-20", None)),
+]
+
+
+@pytest.mark.parametrize("equals, between", QUERIES)
+def test_find_returns_matches_in_insertion_order(store, equals, between):
+    fill(store)
+    expected = [
+        order.id for order in store.values()
+        if all(getattr(order, field) == value for field, value in (equals or {}).items())
+        and (between is None or (
+            (between[1] is None or order.createdAt >= between[1])
+            and (between[2] is None or order.createdAt < between[2])
+        ))
+    ]
+    assert [order.id for order in store.find(equals, between)] == expected
+    assert expected
+
+
+@pytest.mark.parametrize("equals, between", QUERIES)
+def test_find_matches_across_backends(tmp_path, equals, between):
+    memory, sqlite = memory_store(tmp_path), sqlite_store(tmp_path)
+    fill(memory)
+    fill(sqlite)
+    assert [o.id for o in memory.find(equals, between)] == [o.id for o in sqlite.find(equals, between)]
+
+
+def test_values_keep_insertion_order(store):
+    fill(store)
+    ids = [order.id for order in store.values()]
+    assert ids[:5] == ["o0", "o1", "o2", "o3", "o5"]
+    assert ids[-1] == "o4"
+    assert len(ids) == len(store) == 60
+
+
+def test_keyset_pages_survive_deletes_and_inserts(store):
+    fill(store)
+    seen = []
+    after = 0
+    while True:
+        page = store.items().page(after, 7)
+        seen += [key for _, (key, _) in page]
+        if len(page) < 7:
+            break
+        after = page[-1][0]
+        store.delete_many([seen[0]])  # 이미 받은 레코드 삭제
+        store.put(f"new{after}", Order(f"new{after}", "CREATED", "2026-02-01"))
+    assert len(seen) == len(set(seen))
+    assert seen[:3] == ["o0", "o1", "o2"]
+    assert seen[-1].startswith("new")
+
+
+def test_unbounded_page_is_lazy_and_complete(store):
+    fill(store)
+    first = store.values().page(0, 10)
+    rest = store.values().page(first[-1][0], None)
+    assert not isinstance(rest, list)
+    assert [o.id for _, o in first] + [o.id for _, o in rest] == [o.id for o in store.values()]
+
+
+def test_update_applies_changes_and_deletes_atomically(store):
+    fill(store)
+
+    def move(current):
+        return {"o1": None, "o2": current["o2"]._replace(status="SHIPPED")}, sorted(current)
+
+    assert store.update(["o2", "o1"], move) == ["o1", "o2"]
+    assert "o1" not in store
+    assert store.get("o2").status == "SHIPPED"
+    assert [o.id for o in store.find({"status": "SHIPPED"})] == ["o2"]
+
+
+def test_memory_update_is_atomic_across_striped_locks():
+    store = MemoryStore("counters", seed={f"k{i}": 0 for i in range(20)}, lock_stripes=4)
+
+    def work(extra):
+        for _ in range(500):
+            store.update(["k1", "k2", extra], lambda current: ({k: v + 1 for k, v in current.items()}, None))
+
+    threads = [threading.Thread(target=work, args=(f"k{i}",)) for i in range(3, 11)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.get("k1") == store.get("k2") == 8 * 500
+    assert len(store._locks) == 4
+
+
+def test_find_pages_by_keyset(store):
+    fill(store)
+    query = store.find({"status": "CREATED"})
+    pages = []
+    after = 0
+    while True:
+        page = query.page(after, 4)
+        pages += [order.id for _, order in page]
+        if len(page) < 4:
+            break
+        after = page[-1][0]
+    assert pages == [order.id for order in query]